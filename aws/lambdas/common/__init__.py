@@ -1,18 +1,52 @@
-"""Commons"""
-try:
-    from lambda_helpers import LambdaDecorator  # type: ignore
-    from exceptions import LambdaException  # type: ignore
-    from cognito import Cognito  # type: ignore
-    from s3 import S3  # type: ignore
-except ImportError:
+"""Commons
+
+Exports are imported on first use (PEP 562), so a handler only pays at cold
+start for the modules it actually uses.
+"""
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
     from .lambda_helpers import LambdaDecorator
     from .exceptions import LambdaException
     from .cognito import Cognito
     from .s3 import S3
+    from .clients import get_client
+    from .codec import codec
+
+# The module of each export
+_EXPORTS: dict[str, str] = {
+    "LambdaDecorator": "lambda_helpers",
+    "LambdaException": "exceptions",
+    "Cognito": "cognito",
+    "S3": "s3",
+    "get_client": "clients",
+    "codec": "codec",
+}
 
 __all__ = [
     "LambdaDecorator",
     "LambdaException",
     "Cognito",
     "S3",
+    "get_client",
+    "codec",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    """Import an export on first use"""
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    try:
+        module = import_module(_EXPORTS[name])
+    except ImportError:
+        module = import_module(f".{_EXPORTS[name]}", __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    """List the exports"""
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,133 @@
+"""Archives downloaded from S3, kept in /tmp across warm invocations."""
+from collections import OrderedDict
+from contextlib import suppress
+from hashlib import sha256
+from os import environ, makedirs, remove, replace
+from os.path import join
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from typing import IO, Union
+
+DEFAULT_MAX_BYTES: int = 256 * 1024 * 1024
+CHUNK_SIZE: int = 1024 * 1024
+
+
+def _copy(source: IO[bytes], target: IO[bytes]) -> None:
+    """Copy a file by chunks."""
+    while chunk := source.read(CHUNK_SIZE):
+        target.write(chunk)
+
+
+class ArchiveCache:
+    """LRU cache of objects on the local disk, bounded by their total size.
+
+    Each object is stored with its ETag, so it can be revalidated with
+    `IfNoneMatch` instead of being downloaded again.
+    """
+
+    directory: str
+    max_bytes: int
+    size: int
+    _entries: "OrderedDict[str, tuple[str, int]]"
+    _lock: Lock
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        """Initialize the cache.
+
+        Args:
+            directory (str): Where to store the objects, like `/tmp/s3`.
+            max_bytes (int): The maximum total size of the objects.
+        """
+        makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def _path(self, name: str) -> str:
+        """Get the path of an object."""
+        return join(self.directory, name)
+
+    @staticmethod
+    def name(bucket: str, key: str) -> str:
+        """Get the file name of an object."""
+        return sha256(f"{bucket}/{key}".encode("utf-8")).hexdigest()
+
+    def etag(self, bucket: str, key: str) -> Union[str, None]:
+        """Get the ETag of a cached object, None if it is not cached."""
+        with self._lock:
+            entry = self._entries.get(self.name(bucket, key))
+        return entry[0] if entry is not None else None
+
+    def read(self, bucket: str, key: str, target: IO[bytes]) -> bool:
+        """Copy a cached object to a file.
+
+        Returns:
+            bool: Whether the object was cached.
+        """
+        name = self.name(bucket, key)
+        with self._lock:
+            if name not in self._entries:
+                return False
+            self._entries.move_to_end(name)
+            with open(self._path(name), "rb") as handle:
+                _copy(handle, target)
+        return True
+
+    def store(self, bucket: str, key: str, etag: str, source: IO[bytes]) -> None:
+        """Cache an object, read from the start of a file.
+
+        Args:
+            bucket (str): The bucket.
+            key (str): The key.
+            etag (str): The ETag of the object.
+            source (IO[bytes]): The content, rewound afterwards.
+        """
+        name = self.name(bucket, key)
+        source.seek(0)
+        with NamedTemporaryFile(dir=self.directory, delete=False) as handle:
+            _copy(source, handle)
+            size = handle.tell()
+        source.seek(0)
+        if size > self.max_bytes:
+            remove(handle.name)
+            self.discard(bucket, key)
+            return
+        with self._lock:
+            replace(handle.name, self._path(name))
+            if name in self._entries:
+                self.size -= self._entries.pop(name)[1]
+            self._entries[name] = (etag, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def discard(self, bucket: str, key: str) -> None:
+        """Forget an object."""
+        name = self.name(bucket, key)
+        with self._lock:
+            if name in self._entries:
+                self._remove(name)
+
+    def _remove(self, name: str) -> None:
+        """Remove an object, holding the lock."""
+        self.size -= self._entries.pop(name)[1]
+        with suppress(FileNotFoundError):
+            remove(self._path(name))
+
+
+_caches: dict[str, ArchiveCache] = {}
+
+
+def archive_cache() -> Union[ArchiveCache, None]:
+    """Get the archive cache of the container, None unless `S3_CACHE_DIR` is set."""
+    directory = environ.get("S3_CACHE_DIR", "").strip()
+    if directory == "":
+        return None
+    if directory not in _caches:
+        _caches[directory] = ArchiveCache(
+            directory,
+            int(environ.get("S3_CACHE_MAX_BYTES", str(DEFAULT_MAX_BYTES))),
+        )
+    return _caches[directory]
@@ -0,0 +1,87 @@
+"""AWS clients shared by the invocations of a warm container."""
+from functools import cache
+from os import environ
+from contextlib import suppress
+from threading import Lock
+from typing import Any, Union
+
+# The environment variable holding the endpoint of each service
+ENDPOINT_VARIABLES: dict[str, str] = {
+    "cognito-idp": "COGNITO_ENDPOINT_URL",
+    "dynamodb": "DYNAMO_ENDPOINT_URL",
+    "s3": "S3_ENDPOINT_URL",
+    "ses": "SES_ENDPOINT_URL",
+}
+DEFAULT_MAX_POOL_CONNECTIONS: int = 10
+
+_clients: dict[tuple[str, Union[str, None]], Any] = {}
+_lock: Lock = Lock()
+
+
+@cache
+def normalize_environment() -> None:
+    """Clean up the environment, once per process.
+
+    Empty settings are dropped, and endpoints on localhost point at Localstack
+    when running there.
+    """
+    for key in (
+        "AWS_DEFAULT_REGION",
+        "AWS_ACCESS_KEY_ID",
+        "AWS_SECRET_ACCESS_KEY",
+        *ENDPOINT_VARIABLES.values(),
+    ):
+        with suppress(KeyError):
+            if environ[key].strip() == "":
+                del environ[key]
+    if len(environ.get("LOCALSTACK_HOSTNAME", "").strip()) > 0:
+        # Lambdas on Localstack run on docker, so localhost is something else
+        # We need the name of localstack
+        for key in ENDPOINT_VARIABLES.values():
+            with suppress(KeyError):
+                environ[key] = str(
+                    environ[key]
+                    .replace("127.0.0.1", environ["LOCALSTACK_HOSTNAME"])
+                    .replace("localhost", environ["LOCALSTACK_HOSTNAME"])
+                )
+
+
+def get_client(service: str) -> Any:
+    """Get the client of a service, created once per endpoint and container.
+
+    Clients keep their connections alive, so warm invocations skip the
+    connection and TLS setup.
+
+    Args:
+        service (str): The service name, like `s3`.
+
+    Returns:
+        Any: The boto3 client.
+    """
+    # boto3 takes long to import, so only handlers using a client pay for it
+    # pylint: disable=import-outside-toplevel
+    from boto3 import client
+    from botocore.config import Config
+
+    normalize_environment()
+    endpoint = environ.get(ENDPOINT_VARIABLES.get(service, ""), None)
+    key = (service, endpoint)
+    with _lock:
+        if key not in _clients:
+            _clients[key] = client(
+                service,
+                region_name=environ.get("AWS_DEFAULT_REGION", None),
+                aws_access_key_id=environ.get("AWS_ACCESS_KEY_ID", None),
+                aws_secret_access_key=environ.get("AWS_SECRET_ACCESS_KEY", None),
+                endpoint_url=endpoint,
+                config=Config(
+                    max_pool_connections=int(
+                        environ.get(
+                            "AWS_MAX_POOL_CONNECTIONS",
+                            str(DEFAULT_MAX_POOL_CONNECTIONS),
+                        )
+                    ),
+                    tcp_keepalive=True,
+                ),
+            )
+        return _clients[key]
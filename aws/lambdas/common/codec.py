@@ -0,0 +1,54 @@
+"""JSON codec, orjson when available."""
+from contextlib import suppress
+from json import dumps as json_dumps, loads as json_loads
+from os import environ
+from typing import Any, Callable, Union
+
+Encoder = Callable[[Any], str]
+Decoder = Callable[[Union[str, bytes]], Any]
+
+# The codecs by name, more can be registered
+CODECS: dict[str, tuple[Encoder, Decoder]] = {"json": (json_dumps, json_loads)}
+
+with suppress(ImportError):
+    import orjson
+
+    def _orjson_dumps(value: Any) -> str:
+        """Encode with orjson."""
+        return orjson.dumps(value).decode("utf-8")
+
+    CODECS["orjson"] = (_orjson_dumps, orjson.loads)
+
+
+class JsonCodec:
+    """Encode and decode JSON with the configured library.
+
+    Example:
+    ```python
+    from common import codec
+    codec.loads(codec.dumps({"a": 1}))
+    ```
+    """
+
+    name: str
+    dumps: Encoder
+    loads: Decoder
+
+    def __init__(self, name: Union[str, None] = None) -> None:
+        """Initialize the codec.
+
+        Args:
+            name (str): The codec, by default `JSON_CODEC` or orjson if installed.
+
+        Raises:
+            ValueError: If the codec is unknown.
+        """
+        if name is None:
+            name = environ.get("JSON_CODEC", "orjson" if "orjson" in CODECS else "json")
+        if name not in CODECS:
+            raise ValueError(f"Unknown JSON codec: {name}")
+        self.name = name
+        self.dumps, self.loads = CODECS[name]
+
+
+codec: JsonCodec = JsonCodec()
@@ -1,26 +1,71 @@
 """Common utilities for Cognito."""
 from os import environ
 from contextlib import suppress
-from boto3 import client
+from typing import Union
+
+try:
+    from .clients import get_client
+    from .tokens import JWKS, TokenCache, local_verification_available, verify_token
+except ImportError:
+    from clients import get_client  # type: ignore
+    from tokens import (  # type: ignore
+        JWKS,
+        TokenCache,
+        local_verification_available,
+        verify_token,
+    )
 
 with suppress(ImportError):
     from boto3_type_annotations.cognito_idp import Client as CognitoClient
 
+# Shared by the invocations of a warm container
+token_cache: TokenCache = TokenCache()
+_key_sets: dict[str, JWKS] = {}
+
+
+def user_pool_issuer() -> Union[str, None]:
+    """Get the issuer of the access tokens, None if it cannot be known.
+
+    Tokens of a local Cognito are issued for the URL the client used, which
+    may not be the one of the lambda, so the issuer is not checked unless set.
+    """
+    if "COGNITO_ISSUER" in environ:
+        return environ["COGNITO_ISSUER"]
+    pool_id = environ.get("COGNITO_USER_POOL_ID")
+    if pool_id is None or "COGNITO_ENDPOINT_URL" in environ:
+        return None
+    region = environ.get("AWS_DEFAULT_REGION", pool_id.split("_", 1)[0])
+    return f"https://cognito-idp.{region}.amazonaws.com/{pool_id}"
+
+
+def user_pool_keys() -> JWKS:
+    """Get the cached public keys of the user pool."""
+    url = environ.get("COGNITO_JWKS_URL")
+    if url is None:
+        base = user_pool_issuer()
+        if base is None:
+            endpoint = environ.get("COGNITO_ENDPOINT_URL", "").rstrip("/")
+            base = f"{endpoint}/{environ.get('COGNITO_USER_POOL_ID', '')}"
+        url = f"{base}/.well-known/jwks.json"
+    if url not in _key_sets:
+        _key_sets[url] = JWKS(url)
+    return _key_sets[url]
+
 
 class Cognito:
     """Cognito class."""
 
     client: "CognitoClient"
+    verify_locally: bool
 
     def __init__(self) -> None:
         """Initialize the Cognito class."""
-        self.client = client(
-            "cognito-idp",
-            region_name=environ.get("AWS_DEFAULT_REGION", None),
-            aws_access_key_id=environ.get("AWS_ACCESS_KEY_ID", None),
-            aws_secret_access_key=environ.get("AWS_SECRET_ACCESS_KEY", None),
-            endpoint_url=environ.get("COGNITO_ENDPOINT_URL", None),
+        # Without PyJWT, tokens are verified by Cognito
+        self.verify_locally = (
+            environ.get("COGNITO_VERIFY_LOCALLY", "0") == "1"
+            and local_verification_available()
         )
+        self.client = get_client("cognito-idp")
 
     def register(self, email: str, password: str, data: dict[str, str]) -> None:
         """Register a new user.
@@ -64,14 +109,48 @@ class Cognito:
     def get_user_from_token(self, token: str) -> tuple[str, str]:
         """Get the Cognito user from the token.
 
+        Verified tokens are cached until they expire. With local verification,
+        tokens are checked against the keys of the user pool before Cognito is
+        asked for the email.
+
         Args:
             token (str): The token.
 
         Returns:
-            str: The Cognito user.
+            tuple[str, str]: The email and sub of the user.
         """
         if token.startswith("Bearer "):
             token = token.replace("Bearer ", "")
+        user = token_cache.get(token)
+        if user is None:
+            if self.verify_locally:
+                user = self._verify_token(token)
+            else:
+                user = self._get_user(token)
+            token_cache.put(token, user)
+        return user
+
+    def _verify_token(self, token: str) -> tuple[str, str]:
+        """Verify the token locally, then get the email of its user.
+
+        Access tokens carry no email, and their `username` is the sub when
+        users sign in with their email, so the email comes from `GetUser`.
+        Forged and expired tokens are rejected without calling Cognito, and
+        the user is cached with the token, so each token costs one call.
+        """
+        claims = verify_token(
+            token,
+            user_pool_keys(),
+            user_pool_issuer(),
+            environ.get("COGNITO_CLIENT_ID", None),
+        )
+        email, sub = self._get_user(token)
+        if sub != claims.get("sub"):
+            raise KeyError("The sub of the user is not the one of the token")
+        return email, sub
+
+    def _get_user(self, token: str) -> tuple[str, str]:
+        """Verify the token with Cognito."""
         # Verify the authorization token
         response = self.client.get_user(AccessToken=token)
 
@@ -1,10 +1,12 @@
 """Lambda helpers."""
-from json import dumps, loads
 from contextlib import suppress
+from functools import cached_property
+from importlib import import_module
 from logging import getLogger, Logger
 from base64 import b64decode
 from os import environ
-from typing import Callable, Union
+from types import ModuleType
+from typing import TYPE_CHECKING, Any, Callable, Union, cast
 from traceback import format_exception
 
 with suppress(ImportError):
@@ -17,13 +19,22 @@ with suppress(ImportError):
     from aws_lambda_typing.events import APIGatewayProxyEventV1, APIGatewayProxyEventV2
 
 try:
-    from .cognito import Cognito
+    from .clients import normalize_environment
+    from .codec import codec
     from .exceptions import LambdaException
-    from .s3 import S3
 except ImportError:
-    from cognito import Cognito  # type: ignore
+    from clients import normalize_environment  # type: ignore
+    from codec import codec  # type: ignore
     from exceptions import LambdaException  # type: ignore
-    from s3 import S3  # type: ignore
+
+if TYPE_CHECKING:
+    from .cognito import Cognito
+    from .s3 import S3
+
+
+def _common(name: str) -> ModuleType:
+    """Import a module of common on first use, to keep cold starts short."""
+    return import_module(f"{__package__}.{name}" if __package__ else name)
 
 
 def return_body(
@@ -53,7 +64,7 @@ def return_body(
     if payload is None:
         payload = ""
     if not isinstance(payload, str):
-        payload = dumps(payload)
+        payload = codec.dumps(payload)
     return {
         "statusCode": status_code,
         "headers": response_headers,
@@ -62,7 +73,11 @@ def return_body(
 
 
 class LambdaDecorator:
-    """Lambda decorator."""
+    """Lambda decorator.
+
+    A decorator is built for each invocation, so the values derived from the
+    event are computed once, on first access.
+    """
 
     _context: "Context"
     _event: "Union[APIGatewayProxyEventV1, APIGatewayProxyEventV2]"
@@ -81,49 +96,24 @@ class LambdaDecorator:
         no_auth: bool = False,
     ) -> None:
         """Initialize the Lambda decorator."""
-        for key in (
-            "AWS_DEFAULT_REGION",
-            "AWS_ACCESS_KEY_ID",
-            "AWS_SECRET_ACCESS_KEY",
-            "COGNITO_ENDPOINT_URL",
-            "DYNAMO_ENDPOINT_URL",
-            "S3_ENDPOINT_URL",
-            "SES_ENDPOINT_URL",
-        ):
-            with suppress(KeyError):
-                if environ[key].strip() == "":
-                    del environ[key]
-        if len(environ.get("LOCALSTACK_HOSTNAME", "").strip()) > 0:
-            # Lambdas on Localstack run on docker, so localhost is something else
-            # We need the name of localstack
-            for key in (
-                "COGNITO_ENDPOINT_URL",
-                "DYNAMO_ENDPOINT_URL",
-                "S3_ENDPOINT_URL",
-                "SES_ENDPOINT_URL",
-            ):
-                with suppress(KeyError):
-                    environ[key] = str(
-                        environ[key]
-                        .replace("127.0.0.1", environ["LOCALSTACK_HOSTNAME"])
-                        .replace("localhost", environ["LOCALSTACK_HOSTNAME"])
-                    )
-
+        normalize_environment()
         self._context = context
         self._event = event
         self._email = None
         self._sub = None
         self._no_auth = no_auth
         self._use_cognito = environ.get("USE_COGNITO", "1") == "1"
-        self._cognito = Cognito() if self._use_cognito else None
+        self._cognito = None
         self._additional_headers = {}
         self._logger = getLogger(context.function_name)
 
     @property
     def cognito(self) -> "Cognito":
-        """Get the Cognito."""
+        """Get the Cognito, created on first use."""
         if self._cognito is None:
-            raise LambdaException("Cognito not set", 500)
+            if not self._use_cognito:
+                raise LambdaException("Cognito not set", 500)
+            self._cognito = cast("Cognito", _common("cognito").Cognito())
         return self._cognito
 
     @property
@@ -168,25 +158,45 @@ class LambdaDecorator:
             raise LambdaException("Sub not set", 500)
         return self._sub
 
-    @property
-    def body(self) -> dict[str, object]:
+    @cached_property
+    def body(self) -> dict[str, Any]:
         """Get the body."""
         if "body" not in self.event:
             return {}
         if self.event["body"] is None:
             return {}
-        return loads(self.event["body"])  # type: ignore
-
-    @property
+        if self.event.get("isBase64Encoded", False):
+            return codec.loads(b64decode(self.event["body"]))  # type: ignore
+        return codec.loads(self.event["body"])  # type: ignore
+
+    @cached_property
+    def raw_body(self) -> bytes:
+        """Get the raw body, decoded if base64 encoded."""
+        body = self.event.get("body")
+        if body is None:
+            return b""
+        if self.event.get("isBase64Encoded", False):
+            return b64decode(body)
+        return str(body).encode("utf-8")
+
+    @cached_property
     def headers(self) -> dict[str, str]:
         """Get the headers with lowercased keys."""
         return {
             key.lower().strip(): value for key, value in self.event["headers"].items()
         }
 
-    @property
+    @cached_property
     def file(self) -> Union[bytes, None]:
-        """Get the file or None if none is present."""
+        """Get the file or None if none is present.
+
+        Binary uploads are returned as they are, JSON bodies are expected to
+        have a base64 encoded `file` key.
+        """
+        if self.event.get("isBase64Encoded", False) and not self.headers.get(
+            "content-type", ""
+        ).startswith("application/json"):
+            return self.raw_body
         body = self.body
         if "file" not in body:
             return None
@@ -212,7 +222,7 @@ class LambdaDecorator:
             return self.event["requestContext"]["httpMethod"].strip().upper()  # type: ignore
         return self.event["requestContext"]["http"]["method"].strip().upper()  # type: ignore
 
-    @property
+    @cached_property
     def path_params(self) -> dict[str, str]:
         """Get the path parameters with lowercased keys."""
         return (
@@ -224,7 +234,7 @@ class LambdaDecorator:
             else {}
         )
 
-    @property
+    @cached_property
     def query_params(self) -> dict[str, str]:
         """Get the query parameters with lowercased keys."""
         return (
@@ -259,9 +269,9 @@ class LambdaDecorator:
         """Raise an HTTP error."""
         raise LambdaException(message, status_code)
 
-    def s3(self, key: str) -> "S3":
+    def s3(self, key: str, read_only: bool = False) -> "S3":
         """Get the S3 object."""
-        return S3(key)
+        return cast("S3", _common("s3").S3(key, read_only=read_only))
 
     def login(self, email: str, password: str) -> str:
         """Login."""
@@ -279,32 +289,47 @@ class LambdaDecorator:
         if auto_validate:
             self.cognito.confirm_user(email)
 
+    @staticmethod
+    def authorizer_claims(
+        event: "Union[APIGatewayProxyEventV1, APIGatewayProxyEventV2]",
+    ) -> Union[tuple[str, str], None]:
+        """Get the user email and sub from the authorizer claims of the event.
+
+        Returns:
+            Union[tuple[str, str], None]: The email and sub, None if the gateway
+                passed no claims.
+        """
+        try:
+            authorizer: Any = event["requestContext"]["authorizer"]
+            if not isinstance(authorizer, dict):
+                return None
+            claims = authorizer.get("claims") or authorizer["jwt"]["claims"]
+            return str(claims["email"]), str(claims["sub"])
+        except (KeyError, TypeError):
+            return None
+
     def get_user(
         self,
         event: "Union[APIGatewayProxyEventV1, APIGatewayProxyEventV2]",
     ) -> tuple[str, str]:
-        """Get the user email and sub from the event."""
-        if self._use_cognito and self._cognito is not None:
-            try:
-                auth_header = event["headers"].get("authorization")
-                if auth_header is None:
-                    event["headers"].get("Authorization")
-                if auth_header is None:
-                    raise LambdaException("Unauthorized", 403)
-                email, sub = self._cognito.get_user_from_token(auth_header)
-                return email, sub
-            except Exception as err:
-                raise LambdaException("Unauthorized", 403) from err
+        """Get the user email and sub from the event.
+
+        The claims of an authorizer are used when the gateway passed them, so
+        authorized requests cost no Cognito call. Otherwise the token is
+        checked with Cognito, unless `USE_COGNITO=0`.
+        """
+        user = self.authorizer_claims(event)
+        if user is not None:
+            return user
+        if not self._use_cognito:
+            raise LambdaException("Unauthorized", 403)
         try:
-            authorizer = event["requestContext"]["authorizer"]
-            if authorizer is None:
+            headers = event["headers"] or {}
+            auth_header = headers.get("authorization", headers.get("Authorization"))
+            if auth_header is None:
                 raise LambdaException("Unauthorized", 403)
-            if isinstance(authorizer, dict) and "claims" in authorizer:
-                return authorizer["claims"]["email"], authorizer["claims"]["sub"]  # type: ignore
-            email = authorizer["jwt"]["claims"]["email"]
-            sub = authorizer["jwt"]["claims"]["sub"]
-            return email, sub
-        except KeyError as err:
+            return self.cognito.get_user_from_token(auth_header)
+        except Exception as err:
             raise LambdaException("Unauthorized", 403) from err
 
     def __call__(
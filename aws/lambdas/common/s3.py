@@ -1,14 +1,226 @@
 """Common utilities for S3."""
-from io import BytesIO, StringIO
+from copy import copy
+from io import BufferedIOBase, BytesIO, StringIO
 from os import environ
 from contextlib import suppress
-from typing import Union, cast, Literal, overload
-from zipfile import ZipFile
-from boto3 import client
+from tempfile import TemporaryFile
+from typing import IO, TYPE_CHECKING, Union, cast, Literal, overload
+from zipfile import ZIP_STORED, ZipFile, ZipInfo
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+
+try:
+    from .archive_cache import archive_cache
+    from .clients import get_client
+except ImportError:
+    from archive_cache import archive_cache  # type: ignore
+    from clients import get_client  # type: ignore
 
 with suppress(ImportError):
     from boto3_type_annotations.s3 import Client as S3Client
 
+if TYPE_CHECKING:
+    from _typeshed import ReadableBuffer, WriteableBuffer
+
+# Size and offsets of the fixed part of a zip local file header
+LOCAL_HEADER_SIZE: int = 30
+LOCAL_HEADER_NAME_LENGTH: slice = slice(26, 28)
+LOCAL_HEADER_EXTRA_LENGTH: slice = slice(28, 30)
+# General purpose flag of members followed by a data descriptor
+DATA_DESCRIPTOR_FLAG: int = 0x08
+COPY_CHUNK_SIZE: int = 1024 * 1024
+NOT_MODIFIED: int = 304
+# Archives above this size spill from memory to /tmp
+DEFAULT_SPOOL_MAX_BYTES: int = 16 * 1024 * 1024
+DEFAULT_MULTIPART_THRESHOLD: int = 8 * 1024 * 1024
+DEFAULT_MULTIPART_CONCURRENCY: int = 4
+# Members already compressed, stored as they are unless told otherwise
+COMPRESSED_EXTENSIONS: tuple[str, ...] = (
+    ".7z",
+    ".br",
+    ".bz2",
+    ".gif",
+    ".gz",
+    ".jpeg",
+    ".jpg",
+    ".mp3",
+    ".mp4",
+    ".pdf",
+    ".png",
+    ".webp",
+    ".xz",
+    ".zip",
+)
+
+
+class SpooledFile(BufferedIOBase):
+    """A file kept in memory until it is too big, then spilled to disk.
+
+    `SpooledTemporaryFile` has no `seekable()` before Python 3.11, which
+    `ZipFile` needs, and the lambdas run on Python 3.9.
+    """
+
+    max_size: int
+    _file: IO[bytes]
+
+    def __init__(self, max_size: int) -> None:
+        """Initialize an empty file, in memory.
+
+        Args:
+            max_size (int): The size above which the file moves to disk.
+        """
+        super().__init__()
+        self.max_size = max_size
+        self._file = BytesIO()
+
+    @property
+    def rolled(self) -> bool:
+        """Whether the file moved to disk."""
+        return not isinstance(self._file, BytesIO)
+
+    def _rollover(self) -> None:
+        """Move the file to disk, keeping its position."""
+        memory = cast(BytesIO, self._file)
+        disk = TemporaryFile()  # pylint: disable=consider-using-with
+        disk.write(memory.getbuffer())
+        disk.seek(memory.tell())
+        memory.close()
+        self._file = cast(IO[bytes], disk)
+
+    def write(self, buffer: "ReadableBuffer") -> int:
+        """Write, moving to disk first when the file would be too big."""
+        size = memoryview(buffer).nbytes
+        if not self.rolled and self._file.tell() + size > self.max_size:
+            self._rollover()
+        return self._file.write(buffer)
+
+    def read(self, size: Union[int, None] = -1) -> bytes:
+        """Read up to size bytes, all by default."""
+        return self._file.read(-1 if size is None else size)
+
+    def read1(self, size: int = -1) -> bytes:
+        """Read up to size bytes."""
+        return self.read(size)
+
+    def readinto(self, buffer: "WriteableBuffer") -> int:
+        """Read into a buffer."""
+        view = memoryview(buffer).cast("B")
+        data = self._file.read(len(view))
+        view[: len(data)] = data
+        return len(data)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        """Move to a position."""
+        return self._file.seek(offset, whence)
+
+    def tell(self) -> int:
+        """Get the position."""
+        return self._file.tell()
+
+    def truncate(self, size: Union[int, None] = None) -> int:
+        """Resize the file, to the position by default."""
+        return self._file.truncate(size)
+
+    def flush(self) -> None:
+        """Flush the file."""
+        if not self.closed:
+            self._file.flush()
+
+    def readable(self) -> bool:
+        """Files are readable."""
+        return True
+
+    def writable(self) -> bool:
+        """Files are writable."""
+        return True
+
+    def seekable(self) -> bool:
+        """Files are seekable, for `ZipFile`."""
+        return True
+
+    def close(self) -> None:
+        """Close the file, removing it from disk."""
+        super().close()
+        self._file.close()
+
+
+def spooled_file() -> IO[bytes]:
+    """Create a file kept in memory until it is too big, then spilled to disk."""
+    return cast(
+        IO[bytes],
+        SpooledFile(
+            int(environ.get("S3_SPOOL_MAX_BYTES", str(DEFAULT_SPOOL_MAX_BYTES)))
+        ),
+    )
+
+
+def transfer_config() -> TransferConfig:
+    """Get the settings of the transfers, multipart and parallel above a size."""
+    threshold = int(
+        environ.get("S3_MULTIPART_THRESHOLD", str(DEFAULT_MULTIPART_THRESHOLD))
+    )
+    return TransferConfig(
+        multipart_threshold=threshold,
+        multipart_chunksize=threshold,
+        max_concurrency=int(
+            environ.get("S3_MULTIPART_CONCURRENCY", str(DEFAULT_MULTIPART_CONCURRENCY))
+        ),
+    )
+
+
+def copy_member(source: ZipFile, target: ZipFile, info: ZipInfo) -> None:
+    """Copy a member to another archive as it is, without recompressing it.
+
+    Args:
+        source (ZipFile): The archive holding the member.
+        target (ZipFile): The archive being written.
+        info (ZipInfo): The member.
+    """
+    # pylint: disable=protected-access
+    source_fp = cast(IO[bytes], source.fp)
+    target_fp = cast(IO[bytes], target.fp)
+    source_fp.seek(info.header_offset)
+    header = source_fp.read(LOCAL_HEADER_SIZE)
+    source_fp.seek(
+        int.from_bytes(header[LOCAL_HEADER_NAME_LENGTH], "little")
+        + int.from_bytes(header[LOCAL_HEADER_EXTRA_LENGTH], "little"),
+        1,
+    )
+    member = copy(info)
+    # Sizes and CRC are known, so they go in the header, not in a descriptor
+    member.flag_bits &= ~DATA_DESCRIPTOR_FLAG
+    member.header_offset = target_fp.tell()
+    target_fp.write(member.FileHeader())
+    remaining = info.compress_size
+    while remaining > 0:
+        chunk = source_fp.read(min(COPY_CHUNK_SIZE, remaining))
+        if not chunk:
+            raise EOFError(f"Truncated member: {info.filename}")
+        target_fp.write(chunk)
+        remaining -= len(chunk)
+    target.filelist.append(member)
+    target.NameToInfo[member.filename] = member
+    target.start_dir = target_fp.tell()
+    target._didModify = True  # type: ignore
+
+
+class _Member:
+    """A member written to the archive."""
+
+    __slots__ = ("data", "compress_type", "compresslevel")
+
+    data: bytes
+    compress_type: int
+    compresslevel: Union[int, None]
+
+    def __init__(
+        self, data: bytes, compress_type: int, compresslevel: Union[int, None]
+    ) -> None:
+        """Initialize the member."""
+        self.data = data
+        self.compress_type = compress_type
+        self.compresslevel = compresslevel
+
 
 class S3:
     """Common utilities for S3.
@@ -19,69 +231,148 @@ class S3:
         with s3.read("test.txt") as f:
             print(f.read())
     ```
+
+    Members are only decompressed when read, and the archive is only uploaded
+    again when something was written. New members are appended to the archive,
+    and replacing members copies the others as they are, so only the written
+    members are ever compressed.
     """
 
     s3: "S3Client"
     key: str
-    _buffer: BytesIO
-    _files: list[tuple[str, BytesIO]]
+    read_only: bool
+    compression: int
+    _buffer: IO[bytes]
+    _archive: Union[ZipFile, None]
+    _files: dict[str, _Member]
+    _dirty: bool
 
-    def __init__(self, key: str, bucket_name: Union[str, None] = None) -> None:
+    def __init__(
+        self,
+        key: str,
+        bucket_name: Union[str, None] = None,
+        read_only: bool = False,
+        compression: int = ZIP_STORED,
+    ) -> None:
         """Initialize the S3 object.
 
         Args:
             bucket_name (str): The name of the bucket.
+            read_only (bool): Whether writing is forbidden, so the archive is
+                never uploaded.
+            compression (int): The default compression of the written members,
+                like `ZIP_DEFLATED`.
         """
         self.key = key
         if bucket_name is None:
             bucket_name = environ.get("S3_BUCKET_NAME", "test-s3-bucket")
         self.bucket_name = bucket_name
-        self._buffer = BytesIO()
-        self._files = []
-        self.s3 = client(
-            "s3",
-            region_name=environ.get("AWS_DEFAULT_REGION", None),
-            aws_access_key_id=environ.get("AWS_ACCESS_KEY_ID", None),
-            aws_secret_access_key=environ.get("AWS_SECRET_ACCESS_KEY", None),
-            endpoint_url=environ.get("S3_ENDPOINT_URL", None),
-        )
+        self.read_only = read_only
+        self.compression = compression
+        self._buffer = spooled_file()
+        self._archive = None
+        self._files = {}
+        self._dirty = False
+        self.s3 = get_client("s3")
 
     def download(self) -> None:
-        """Download a file from S3."""
-        self._buffer = BytesIO()
-        value: bytes = cast(
-            BytesIO,
-            self.s3.get_object(
+        """Download a file from S3, streaming it to a spooled file.
+
+        With an archive cache, a cached file is only revalidated against its
+        ETag, and copied from the local disk when it did not change.
+        """
+        self.close()
+        self._buffer = spooled_file()
+        cache = archive_cache()
+        if cache is None:
+            self.s3.download_fileobj(
                 Bucket=self.bucket_name,
                 Key=self.key,
-            )["Body"],
-        ).read()
-        self._buffer.write(value)
+                Fileobj=self._buffer,
+                Config=transfer_config(),
+            )
+        else:
+            etag = cache.etag(self.bucket_name, self.key)
+            try:
+                response = self.s3.get_object(
+                    Bucket=self.bucket_name,
+                    Key=self.key,
+                    **({"IfNoneMatch": etag} if etag is not None else {}),
+                )
+            except ClientError as err:
+                status = err.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+                if status != NOT_MODIFIED or not cache.read(
+                    self.bucket_name, self.key, self._buffer
+                ):
+                    raise
+            else:
+                for chunk in response["Body"].iter_chunks(COPY_CHUNK_SIZE):
+                    self._buffer.write(chunk)
+                cache.store(self.bucket_name, self.key, response["ETag"], self._buffer)
+        self._buffer.seek(0)
 
     def unzip(self) -> None:
-        """Unzip a file from S3."""
-        with ZipFile(self._buffer, "r") as zip_obj:
-            for filename in zip_obj.namelist():
-                self._files.append((filename, BytesIO(zip_obj.read(filename))))
+        """Index the members of the archive, without decompressing them."""
+        self._archive = ZipFile(self._buffer, "r")
 
     def upload(self) -> None:
-        """Upload a file to S3."""
-        self.s3.put_object(
-            Bucket=self.bucket_name, Key=self.key, Body=self._buffer.getvalue()
+        """Upload a file to S3, in parallel parts when it is big."""
+        self._buffer.seek(0)
+        self.s3.upload_fileobj(
+            Fileobj=self._buffer,
+            Bucket=self.bucket_name,
+            Key=self.key,
+            Config=transfer_config(),
         )
+        cache = archive_cache()
+        if cache is not None:
+            cache.discard(self.bucket_name, self.key)
+            etag = self.s3.head_object(Bucket=self.bucket_name, Key=self.key)["ETag"]
+            cache.store(self.bucket_name, self.key, etag, self._buffer)
 
     def zip(self) -> None:
-        """Zip a file."""
-        buffer = BytesIO()
-        with ZipFile(
-            buffer,
-            "w",
-        ) as zip_obj:
-            for filename, file_buffer in self._files:
-                zip_obj.writestr(filename, file_buffer.getvalue())
-
-        self._buffer = BytesIO()
-        self._buffer.write(buffer.getvalue())
+        """Zip the files.
+
+        New members are appended to the archive, with a new central directory.
+        When members are replaced, the archive is streamed to a new spooled file
+        where the other members are copied as they are.
+        """
+        if self._archive is not None and not any(
+            filename in self._archive.NameToInfo for filename in self._files
+        ):
+            self._archive.close()
+            self._archive = None
+            with ZipFile(self._buffer, "a") as zip_obj:
+                self._write_members(zip_obj)
+            self._buffer.seek(0)
+            return
+        buffer = spooled_file()
+        with ZipFile(buffer, "w") as zip_obj:
+            if self._archive is not None:
+                for info in self._archive.infolist():
+                    if info.filename not in self._files:
+                        copy_member(self._archive, zip_obj, info)
+            self._write_members(zip_obj)
+        self.close()
+        self._buffer = buffer
+        self._buffer.seek(0)
+
+    def _write_members(self, zip_obj: ZipFile) -> None:
+        """Write the written members to an archive."""
+        for filename, member in self._files.items():
+            zip_obj.writestr(
+                filename,
+                member.data,
+                compress_type=member.compress_type,
+                compresslevel=member.compresslevel,
+            )
+
+    def close(self) -> None:
+        """Close the archive and release its file."""
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+        self._buffer.close()
 
     def __enter__(self) -> "S3":
         """Enter the context."""
@@ -92,19 +383,44 @@ class S3:
 
     # pylint: disable=unused-argument
     def __exit__(self, exc_type, exc_value, traceback) -> None:  # type: ignore
-        """Exit the context."""
-        self.zip()
-        self.upload()
+        """Exit the context, uploading the archive if something was written."""
+        if self._dirty and not self.read_only:
+            self.zip()
+            self.upload()
+            self._dirty = False
+        self.close()
+
+    def write(
+        self,
+        filename: str,
+        data: Union[str, bytes],
+        compress_type: Union[int, None] = None,
+        compresslevel: Union[int, None] = None,
+    ) -> None:
+        """Write a file to the zip file
+
+        Args:
+            filename (str): The name of the member.
+            data (Union[str, bytes]): The content.
+            compress_type (int): The compression of the member, by default the
+                one of the archive, or stored for already compressed files.
+            compresslevel (int): The compression level of the member.
 
-    def write(self, filename: str, data: Union[str, bytes]) -> None:
-        """Write a file to the zip file"""
+        Raises:
+            PermissionError: If the archive is read only.
+        """
+        if self.read_only:
+            raise PermissionError(f"{self.key} is read only")
         if not isinstance(data, bytes):
             data = data.encode("utf-8")
-        for i, file in enumerate(self._files):
-            if file[0] == filename:
-                self._files[i] = (filename, BytesIO(data))
-                return
-        self._files.append((filename, BytesIO(data)))
+        if compress_type is None:
+            compress_type = (
+                ZIP_STORED
+                if filename.lower().endswith(COMPRESSED_EXTENSIONS)
+                else self.compression
+            )
+        self._dirty = True
+        self._files[filename] = _Member(data, compress_type, compresslevel)
 
     @overload
     def read(self, filename: str, encoding: Literal["utf-8"]) -> StringIO:
@@ -120,19 +436,25 @@ class S3:
         encoding: Union[Literal["utf-8"], None] = None,
     ) -> Union[BytesIO, StringIO]:
         """Read a file from the zip file"""
-        for file in self._files:
-            if file[0] == filename:
-                if encoding:
-                    return StringIO(file[1].read().decode(encoding))
-                return file[1]
-        raise FileNotFoundError
+        member = self._files.get(filename)
+        if member is not None:
+            data = member.data
+        elif self._archive is None:
+            raise FileNotFoundError
+        else:
+            try:
+                data = self._archive.read(filename)
+            except KeyError as err:
+                raise FileNotFoundError from err
+        if encoding:
+            return StringIO(data.decode(encoding))
+        return BytesIO(data)
 
     def file_exists(self, filename: str) -> bool:
         """Check if a file exists in the zip file"""
-        for file in self._files:
-            if file[0] == filename:
-                return True
-        return False
+        return filename in self._files or (
+            self._archive is not None and filename in self._archive.NameToInfo
+        )
 
     @property
     def exists(self) -> bool:
@@ -147,4 +469,7 @@ class S3:
     @property
     def empty(self) -> bool:
         """Check if the file is empty."""
-        return len(self._buffer.getvalue()) == 0
+        if self._buffer.closed:
+            return True
+        self._buffer.seek(0, 2)
+        return self._buffer.tell() == 0
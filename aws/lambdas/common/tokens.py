@@ -0,0 +1,221 @@
+"""Access tokens: a cache of verified tokens and local JWT validation."""
+from base64 import urlsafe_b64decode
+from collections import OrderedDict
+from hashlib import sha256
+from json import loads
+from os import environ
+from threading import Lock
+from time import time
+from typing import Any, Union
+
+try:
+    from .exceptions import LambdaException
+except ImportError:
+    from exceptions import LambdaException  # type: ignore
+
+try:
+    import jwt
+
+    JWT_AVAILABLE = True
+except ImportError:  # The `jwt` extra
+    JWT_AVAILABLE = False
+
+DEFAULT_CACHE_SIZE: int = 1024
+DEFAULT_CACHE_TTL: int = 300
+JWKS_TIMEOUT: int = 5
+# Unknown key ids refresh the JWKS at most this often, in seconds
+JWKS_REFRESH_INTERVAL: int = 60
+# Tolerated clock skew when checking the expiry, in seconds
+LEEWAY: int = 5
+
+
+def _b64decode(value: str) -> bytes:
+    """Decode unpadded base64url."""
+    return urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+def token_claims(token: str) -> dict[str, object]:
+    """Get the claims of a JWT, without verifying it.
+
+    Args:
+        token (str): The token.
+
+    Returns:
+        dict[str, object]: The claims, empty if the token is not a JWT.
+    """
+    try:
+        claims = loads(_b64decode(token.split(".")[1]))
+    except (IndexError, ValueError):
+        return {}
+    return claims if isinstance(claims, dict) else {}
+
+
+def local_verification_available() -> bool:
+    """Check if PyJWT is installed, to verify tokens without Cognito."""
+    return JWT_AVAILABLE
+
+
+class TokenCache:
+    """LRU cache of the users of verified tokens, keyed by a hash of the token.
+
+    Entries expire after the TTL, and never after the token itself.
+    """
+
+    max_size: int
+    ttl: float
+    _entries: "OrderedDict[str, tuple[float, tuple[str, str]]]"
+    _lock: Lock
+
+    def __init__(
+        self, max_size: Union[int, None] = None, ttl: Union[float, None] = None
+    ) -> None:
+        """Initialize the cache.
+
+        Args:
+            max_size (int): The maximum number of tokens, 0 to disable the cache.
+            ttl (float): How long a token is trusted without verifying it again,
+                in seconds.
+        """
+        if max_size is None:
+            max_size = int(
+                environ.get("COGNITO_TOKEN_CACHE_SIZE", str(DEFAULT_CACHE_SIZE))
+            )
+        if ttl is None:
+            ttl = float(environ.get("COGNITO_TOKEN_CACHE_TTL", str(DEFAULT_CACHE_TTL)))
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def key(token: str) -> str:
+        """Hash a token, so the cache never holds usable credentials."""
+        return sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Union[tuple[str, str], None]:
+        """Get the email and sub of a token, if cached and not expired."""
+        key = self.key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, token: str, user: tuple[str, str]) -> None:
+        """Cache the email and sub of a verified token."""
+        if self.max_size <= 0:
+            return
+        expires_at = time() + self.ttl
+        exp = token_claims(token).get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, float(exp))
+        if expires_at <= time():
+            return
+        key = self.key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, user)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+class JWKS:
+    """The public keys of a user pool, fetched once and kept for the container."""
+
+    url: str
+    _keys: dict[str, Any]
+    _fetched_at: float
+    _lock: Lock
+
+    def __init__(self, url: str) -> None:
+        """Initialize the key set.
+
+        Args:
+            url (str): The URL of the `jwks.json` document.
+        """
+        self.url = url
+        self._keys = {}
+        self._fetched_at = 0.0
+        self._lock = Lock()
+
+    def _fetch(self) -> None:
+        """Fetch the RSA keys."""
+        # Only needed on a cold start with local verification
+        from urllib.request import urlopen  # pylint: disable=import-outside-toplevel
+
+        with urlopen(self.url, timeout=JWKS_TIMEOUT) as response:  # nosec B310
+            document = loads(response.read())
+        self._keys = {
+            key["kid"]: jwt.PyJWK(key, "RS256").key
+            for key in document.get("keys", [])
+            if key.get("kty") == "RSA"
+        }
+        self._fetched_at = time()
+
+    def get(self, kid: str) -> Any:
+        """Get a key, refreshing the key set when the key is unknown.
+
+        Raises:
+            LambdaException: If the key is unknown.
+        """
+        with self._lock:
+            if kid not in self._keys and (
+                time() - self._fetched_at >= JWKS_REFRESH_INTERVAL
+            ):
+                self._fetch()
+            key = self._keys.get(kid)
+        if key is None:
+            raise LambdaException("Unknown signing key", 403)
+        return key
+
+
+def verify_token(
+    token: str, jwks: JWKS, issuer: Union[str, None], client_id: Union[str, None]
+) -> dict[str, object]:
+    """Verify a Cognito access token locally, with PyJWT.
+
+    Args:
+        token (str): The access token.
+        jwks (JWKS): The keys of the user pool.
+        issuer (str): The expected issuer, None to skip the check.
+        client_id (str): The expected app client, None to skip the check.
+
+    Returns:
+        dict[str, object]: The claims.
+
+    Raises:
+        LambdaException: If the token is not valid.
+    """
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.InvalidTokenError as err:
+        raise LambdaException("Malformed token", 403) from err
+    if header.get("alg") != "RS256":
+        raise LambdaException("Unsupported token algorithm", 403)
+    key = jwks.get(str(header.get("kid")))
+    try:
+        claims: dict[str, object] = jwt.decode(
+            token,
+            key,
+            algorithms=["RS256"],
+            issuer=issuer,
+            leeway=LEEWAY,
+            options={"require": ["exp"], "verify_aud": False},
+        )
+    except jwt.ExpiredSignatureError as err:
+        raise LambdaException("Token expired", 403) from err
+    except jwt.InvalidIssuerError as err:
+        raise LambdaException("Invalid token issuer", 403) from err
+    except jwt.InvalidSignatureError as err:
+        raise LambdaException("Invalid token signature", 403) from err
+    except jwt.InvalidTokenError as err:
+        raise LambdaException("Invalid token", 403) from err
+    if claims.get("token_use") != "access":
+        raise LambdaException("Not an access token", 403)
+    if client_id is not None and claims.get("client_id") != client_id:
+        raise LambdaException("Invalid token client", 403)
+    return claims
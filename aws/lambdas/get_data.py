@@ -1,6 +1,5 @@
 """Get the data."""
-from json import loads
-from common import LambdaDecorator
+from common import LambdaDecorator, codec
 
 
 def lambda_handler(event, context) -> list[object]:  # type: ignore
@@ -12,10 +11,10 @@ def lambda_handler(event, context) -> list[object]:  # type: ignore
         """Inner function."""
         if helper.http_method != "GET":
             helper.http_error(405, "Method not allowed")
-        with helper.s3(f"{helper.sub}.zip") as s3:
+        with helper.s3(f"{helper.sub}.zip", read_only=True) as s3:
             if s3.file_exists("data.json"):
                 with s3.read("data.json", encoding="utf-8") as f:
-                    return loads(f.read())
+                    return codec.loads(f.read())
             helper.http_error(404, "Not found")
 
     return inner_function()  # type: ignore
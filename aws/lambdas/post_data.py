@@ -1,6 +1,5 @@
 """Post the data."""
-from json import dumps
-from common import LambdaDecorator
+from common import LambdaDecorator, codec
 
 
 def lambda_handler(event, context) -> list[object]:  # type: ignore
@@ -13,6 +12,6 @@ def lambda_handler(event, context) -> list[object]:  # type: ignore
         if helper.http_method not in ("POST", "PUT"):
             helper.http_error(405, "Method not allowed")
         with helper.s3(f"{helper.sub}.zip") as s3:
-            s3.write("data.json", dumps(helper.body).encode("utf-8"))
+            s3.write("data.json", codec.dumps(helper.body))
 
     return inner_function()  # type: ignore
@@ -7,7 +7,7 @@ def lambda_handler(event, context) -> str:  # type: ignore
 
     helper = LambdaDecorator(event, context, no_auth=True)
 
-    @helper  # type: ignore
+    @helper
     def inner_function() -> str:
         """Inner function."""
         email = helper.body["email"].lower()
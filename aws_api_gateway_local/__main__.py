@@ -9,7 +9,63 @@ parser.add_argument(
     default=9000,
     help="The port to listen on",
 )
+parser.add_argument(
+    "--max-concurrency",
+    type=int,
+    default=None,
+    help="The maximum number of concurrent lambda invocations",
+)
+parser.add_argument(
+    "--lambdas-path",
+    type=str,
+    default=None,
+    help="The directory of the lambdas run by inprocess routes",
+)
+parser.add_argument(
+    "--workers",
+    type=int,
+    default=1,
+    help="The number of worker processes",
+)
+parser.add_argument(
+    "--reload",
+    action="store_true",
+    help="Restart the gateway when its code changes",
+)
+parser.add_argument(
+    "--record",
+    type=str,
+    default=None,
+    help="Append every lambda invocation to this JSONL file (.gz to compress)",
+)
+parser.add_argument(
+    "--replay",
+    type=str,
+    default=None,
+    help="Serve the responses recorded in this file instead of invoking lambdas",
+)
+parser.add_argument(
+    "--replay-latency",
+    action="store_true",
+    help="Wait as long as the recorded invocations took when replaying",
+)
+
+# The options forwarded to the gateway through the environment
+ENVIRONMENT: dict[str, str] = {
+    "max_concurrency": "GATEWAY_MAX_CONCURRENCY",
+    "lambdas_path": "LAMBDAS_PATH",
+    "record": "GATEWAY_RECORD",
+    "replay": "GATEWAY_REPLAY",
+    "replay_latency": "GATEWAY_REPLAY_LATENCY",
+}
 
 if __name__ == "__main__":
     args = parser.parse_args()
-    run(port=args.port)
+    settings: dict[str, str] = {}
+    for option, variable in ENVIRONMENT.items():
+        value = getattr(args, option)
+        if value is True:
+            settings[variable] = "1"
+        elif value is not None and value is not False:
+            settings[variable] = str(value)
+    run(port=args.port, workers=args.workers, reload=args.reload, settings=settings)
@@ -0,0 +1,184 @@
+"""Cognito user pool authorizer, with API Gateway style result caching"""
+from asyncio import get_running_loop
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from hashlib import sha256
+from os import environ
+from time import monotonic
+from typing import Any
+from boto3 import client
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from fastapi import Request
+from .exceptions import GatewayException
+from .metrics import Counter
+
+with suppress(ImportError):
+    from boto3_type_annotations.cognito_idp import Client as CognitoClient
+
+DEFAULT_TTL: int = 300
+DEFAULT_MAX_ENTRIES: int = 10000
+MAX_WORKERS: int = 8
+# Errors of GetUser meaning the token itself is bad, not Cognito
+REJECTED_TOKEN_ERRORS: tuple[str, ...] = (
+    "NotAuthorizedException",
+    "UserNotFoundException",
+    "UserNotConfirmedException",
+    "PasswordResetRequiredException",
+)
+
+
+class UnauthorizedException(GatewayException):
+    """The request has no token."""
+
+    def __init__(self, message: str = "Unauthorized") -> None:
+        """Initialize the exception."""
+        super().__init__(message, 401, "UnauthorizedException")
+
+
+class AccessDeniedException(GatewayException):
+    """The token of the request was rejected."""
+
+    def __init__(self, message: str = "Forbidden") -> None:
+        """Initialize the exception."""
+        super().__init__(message, 403, "AccessDeniedException")
+
+
+class AuthorizerPolicy:
+    """The authorizer settings of a route."""
+
+    header: str
+    ttl: float
+
+    def __init__(self, settings: dict[str, Any] | str | bool) -> None:
+        """Initialize the policy from the `authorizer` key of a route.
+
+        Args:
+            settings (dict[str, Any] | str | bool): `"CognitoUserPool"` or `true`
+                for the defaults, or the `header` holding the token and the
+                `ttl` of the results in seconds, 0 to disable caching.
+        """
+        if not isinstance(settings, dict):
+            settings = {}
+        self.header = str(settings.get("header", "Authorization")).lower()
+        self.ttl = float(settings.get("ttl", DEFAULT_TTL))
+
+
+class CognitoAuthorizer:
+    """Validate bearer tokens with the user pool, once per token and TTL.
+
+    Both the claims of valid tokens and the rejection of bad ones are cached,
+    so neither costs a Cognito round trip until the result expires.
+    """
+
+    max_entries: int
+    hits: int
+    misses: int
+    _client: "CognitoClient | None"
+    _executor: ThreadPoolExecutor
+    _results: "OrderedDict[str, tuple[float, dict[str, str] | None]]"
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        """Initialize the authorizer.
+
+        Args:
+            max_entries (int): The maximum number of cached results.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._client = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=MAX_WORKERS, thread_name_prefix="authorizer"
+        )
+        self._results = OrderedDict()
+
+    @property
+    def client(self) -> "CognitoClient":
+        """Get the Cognito client, created on the first authorization."""
+        if self._client is None:
+            self._client = client(
+                "cognito-idp",
+                region_name=environ.get("AWS_DEFAULT_REGION", None),
+                aws_access_key_id=environ.get("AWS_ACCESS_KEY_ID", None),
+                aws_secret_access_key=environ.get("AWS_SECRET_ACCESS_KEY", None),
+                endpoint_url=environ.get("COGNITO_ENDPOINT_URL", None),
+                config=Config(max_pool_connections=MAX_WORKERS, tcp_keepalive=True),
+            )
+        return self._client
+
+    async def authorize(
+        self, policy: AuthorizerPolicy, request: Request
+    ) -> dict[str, str]:
+        """Authorize a request.
+
+        Args:
+            policy (AuthorizerPolicy): The authorizer settings of the route.
+            request (Request): The request.
+
+        Returns:
+            dict[str, str]: The claims of the user.
+
+        Raises:
+            UnauthorizedException: If the request has no token.
+            AccessDeniedException: If the token is rejected.
+        """
+        token = request.headers.get(policy.header, "").strip()
+        scheme, _, credentials = token.partition(" ")
+        if scheme.lower() == "bearer":
+            token = credentials.strip()
+        if token == "":
+            raise UnauthorizedException()
+        key = sha256(token.encode("utf-8")).hexdigest()
+        cached = self._results.get(key)
+        if cached is not None and cached[0] > monotonic():
+            self._results.move_to_end(key)
+            self.hits += 1
+            claims = cached[1]
+        else:
+            self.misses += 1
+            claims = await get_running_loop().run_in_executor(
+                self._executor, self._get_claims, token
+            )
+            self._store(key, claims, policy.ttl)
+        if claims is None:
+            raise AccessDeniedException()
+        return claims
+
+    def _get_claims(self, token: str) -> dict[str, str] | None:
+        """Get the claims of a token from Cognito, None if it is rejected."""
+        try:
+            response = self.client.get_user(AccessToken=token)
+        except ClientError as err:
+            if err.response.get("Error", {}).get("Code") in REJECTED_TOKEN_ERRORS:
+                return None
+            raise
+        claims = {val["Name"]: val["Value"] for val in response["UserAttributes"]}
+        claims["cognito:username"] = response["Username"]
+        return claims
+
+    def _store(self, key: str, claims: dict[str, str] | None, ttl: float) -> None:
+        """Cache the result of an authorization."""
+        if ttl <= 0:
+            return
+        self._results[key] = (monotonic() + ttl, claims)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    def close(self) -> None:
+        """Stop the executor."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def render_metrics(self) -> list[str]:
+        """Render the authorizer counters in the Prometheus text format."""
+        lines: list[str] = []
+        for name, description, value in (
+            ("hits", "Authorizations served from the cache.", self.hits),
+            ("misses", "Authorizations asked to Cognito.", self.misses),
+        ):
+            counter = Counter(f"gateway_authorizer_cache_{name}_total", description, ())
+            counter.inc((), value)
+            lines.extend(counter.render())
+        return lines
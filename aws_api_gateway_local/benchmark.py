@@ -0,0 +1,328 @@
+"""Benchmark the gateway against a stub lambda.
+
+Example:
+```bash
+python -m aws_api_gateway_local.benchmark --requests ./benchmarks/requests.jsonl \\
+    --concurrency 32 --duration 10 --output baseline.json
+python -m aws_api_gateway_local.benchmark --baseline baseline.json
+```
+"""
+import sys
+from argparse import ArgumentParser, Namespace
+from asyncio import gather, run, sleep
+from json import dumps, loads
+from os import environ
+from random import choices
+from time import perf_counter
+from typing import Any, Awaitable, Callable, cast
+from urllib.parse import urlencode
+from .gateway import Gateway
+from .routing import Route
+from . import create_app
+
+ASGIApp = Callable[
+    [
+        dict[str, Any],
+        Callable[[], Awaitable[dict[str, Any]]],
+        Callable[[dict[str, Any]], Awaitable[None]],
+    ],
+    Awaitable[None],
+]
+PERCENTILES: tuple[int, ...] = (50, 95, 99)
+SERVER_ERROR: int = 500
+
+
+class StubIntegration:
+    """A lambda that echoes the request body, or sleeps and answers nothing."""
+
+    delay: float
+
+    def __init__(self, delay: float = 0.0) -> None:
+        """Initialize the stub.
+
+        Args:
+            delay (float): Seconds to sleep before answering, 0 to echo.
+        """
+        self.delay = delay
+
+    async def invoke(self, route: Route, event: dict[str, Any]) -> dict[str, Any]:
+        """Answer like a lambda would."""
+        if self.delay > 0:
+            await sleep(self.delay)
+            return {"statusCode": 204, "headers": {}, "body": None}
+        return {
+            "statusCode": 200,
+            "headers": {"Content-Type": "application/json"},
+            "body": event["body"],
+            "isBase64Encoded": event["isBase64Encoded"],
+        }
+
+    def close(self) -> None:
+        """Nothing to release."""
+
+
+class BenchmarkRequest:
+    """A request of the mix."""
+
+    name: str
+    method: str
+    path: str
+    query: str
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+    weight: float
+
+    def __init__(self, definition: dict[str, Any]) -> None:
+        """Initialize the request from a line of the requests file.
+
+        Args:
+            definition (dict[str, Any]): The `method`, `path`, `query`, `headers`,
+                `body` and `weight` of the request. Bodies that are not strings
+                are sent as JSON.
+        """
+        self.method = str(definition.get("method", "GET")).upper()
+        self.path = str(definition["path"])
+        self.name = str(definition.get("name", f"{self.method} {self.path}"))
+        self.query = urlencode(definition.get("query", {}), doseq=True)
+        headers: dict[str, str] = {
+            key.lower(): str(value)
+            for key, value in definition.get("headers", {}).items()
+        }
+        body = definition.get("body")
+        if body is None:
+            self.body = b""
+        elif isinstance(body, str):
+            self.body = body.encode("utf-8")
+        else:
+            self.body = dumps(body).encode("utf-8")
+            headers.setdefault("content-type", "application/json")
+        headers["content-length"] = str(len(self.body))
+        self.headers = [
+            (key.encode("latin-1"), value.encode("latin-1"))
+            for key, value in headers.items()
+        ]
+        self.weight = float(definition.get("weight", 1))
+
+
+async def send_request(app: ASGIApp, request: BenchmarkRequest) -> int:
+    """Send a request straight to the ASGI app, without any network.
+
+    Returns:
+        int: The status code.
+    """
+    scope: dict[str, Any] = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": request.method,
+        "scheme": "http",
+        "path": request.path,
+        "raw_path": request.path.encode("utf-8"),
+        "query_string": request.query.encode("latin-1"),
+        "root_path": "",
+        "headers": request.headers,
+        "client": ("127.0.0.1", 0),
+        "server": ("127.0.0.1", 9000),
+    }
+    sent = False
+    status = 0
+
+    async def receive() -> dict[str, Any]:
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": request.body, "more_body": False}
+
+    async def send(message: dict[str, Any]) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = int(message["status"])
+
+    await app(scope, receive, send)
+    return status
+
+
+def percentile(values: list[float], rank: int) -> float:
+    """Get a percentile of sorted values, by nearest rank."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, round(rank / 100 * len(values)) - 1))]
+
+
+async def benchmark(
+    app: ASGIApp,
+    requests: list[BenchmarkRequest],
+    concurrency: int,
+    duration: float,
+) -> dict[str, Any]:
+    """Drive the app with the request mix.
+
+    Args:
+        app (ASGIApp): The gateway app.
+        requests (list[BenchmarkRequest]): The request mix.
+        concurrency (int): The number of concurrent clients.
+        duration (float): How long to run, in seconds.
+
+    Returns:
+        dict[str, Any]: The report, with req/s and latency percentiles per route.
+    """
+    latencies: dict[str, list[float]] = {request.name: [] for request in requests}
+    errors: dict[str, int] = {request.name: 0 for request in requests}
+    weights = [request.weight for request in requests]
+    started = perf_counter()
+    deadline = started + duration
+
+    async def client() -> None:
+        while perf_counter() < deadline:
+            request = choices(requests, weights)[0]
+            sent_at = perf_counter()
+            status = await send_request(app, request)
+            latencies[request.name].append(perf_counter() - sent_at)
+            if status >= SERVER_ERROR or status == 0:
+                errors[request.name] += 1
+
+    await gather(*[client() for _ in range(concurrency)])
+    elapsed = perf_counter() - started
+    report: dict[str, Any] = {
+        "concurrency": concurrency,
+        "duration": round(elapsed, 3),
+        "routes": {},
+    }
+    everything: list[float] = []
+    for name, values in latencies.items():
+        everything.extend(values)
+        report["routes"][name] = summary(sorted(values), errors[name], elapsed)
+    report["total"] = summary(sorted(everything), sum(errors.values()), elapsed)
+    return report
+
+
+def summary(values: list[float], errors: int, elapsed: float) -> dict[str, float]:
+    """Summarize sorted latencies."""
+    result: dict[str, float] = {
+        "requests": len(values),
+        "errors": errors,
+        "rps": round(len(values) / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+    for rank in PERCENTILES:
+        result[f"p{rank}_ms"] = round(percentile(values, rank) * 1000, 3)
+    return result
+
+
+def compare(
+    report: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """Compare a report to a baseline.
+
+    Args:
+        report (dict[str, Any]): The report of this run.
+        baseline (dict[str, Any]): The stored report.
+        tolerance (float): The relative change allowed, like 0.1 for 10%.
+
+    Returns:
+        list[str]: The regressions found.
+    """
+    regressions: list[str] = []
+    current_routes = {**report["routes"], "total": report["total"]}
+    baseline_routes = {**baseline["routes"], "total": baseline["total"]}
+    for name, previous in baseline_routes.items():
+        current = current_routes.get(name)
+        if current is None:
+            continue
+        if current["rps"] < previous["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: {previous['rps']} -> {current['rps']} req/s")
+        for rank in PERCENTILES:
+            key = f"p{rank}_ms"
+            if current[key] > previous[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {previous[key]} -> {current[key]}")
+    return regressions
+
+
+parser: ArgumentParser = ArgumentParser(description="Benchmark the gateway")
+parser.add_argument(
+    "--requests",
+    type=str,
+    default="./benchmarks/requests.jsonl",
+    help="The JSONL file with the request mix",
+)
+parser.add_argument(
+    "--routes",
+    type=str,
+    default=None,
+    help="The routes file of the gateway",
+)
+parser.add_argument(
+    "--concurrency",
+    type=int,
+    default=16,
+    help="The number of concurrent clients",
+)
+parser.add_argument(
+    "--duration",
+    type=float,
+    default=10.0,
+    help="How long to run, in seconds",
+)
+parser.add_argument(
+    "--delay",
+    type=float,
+    default=0.0,
+    help="Seconds the stub lambda sleeps, 0 to echo the body",
+)
+parser.add_argument(
+    "--output",
+    type=str,
+    default=None,
+    help="Where to write the JSON report, instead of the standard output",
+)
+parser.add_argument(
+    "--baseline",
+    type=str,
+    default=None,
+    help="A stored report to compare against",
+)
+parser.add_argument(
+    "--tolerance",
+    type=float,
+    default=0.1,
+    help="The relative change allowed before flagging a regression",
+)
+
+
+def main(args: Namespace) -> int:
+    """Run the benchmark.
+
+    Returns:
+        int: 1 if there are regressions against the baseline, otherwise 0.
+    """
+    if args.routes is not None:
+        environ["GATEWAY_ROUTES"] = args.routes
+    environ.setdefault("GATEWAY_ACCESS_LOG_SAMPLE_RATE", "0")
+    with open(args.requests, "r", encoding="utf-8") as handle:
+        requests = [
+            BenchmarkRequest(loads(line)) for line in handle if line.strip() != ""
+        ]
+    gateway = Gateway(StubIntegration(args.delay))
+    app = cast(ASGIApp, create_app(gateway))
+    gateway.start()
+    try:
+        report = run(benchmark(app, requests, args.concurrency, args.duration))
+    finally:
+        gateway.close()
+    output = dumps(report, indent=2)
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(output)
+    else:
+        print(output)
+    if args.baseline is None:
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as handle:
+        regressions = compare(report, loads(handle.read()), args.tolerance)
+    for regression in regressions:
+        print("Regression", regression, file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,81 @@
+"""Request and response bodies"""
+from base64 import b64decode, b64encode
+from fnmatch import fnmatch
+from os import environ
+from typing import Any
+from fastapi import Request
+from .exceptions import GatewayException
+
+# API Gateway rejects payloads above 10 MB
+DEFAULT_MAX_PAYLOAD_BYTES: int = 10 * 1024 * 1024
+
+
+class RequestTooLongException(GatewayException):
+    """The request payload is above the limit."""
+
+    def __init__(self, message: str = "Request Too Long") -> None:
+        """Initialize the exception."""
+        super().__init__(message, 413, "RequestTooLongException")
+
+
+def binary_media_types() -> list[str]:
+    """Get the binary media types, like `image/*`, from the environment"""
+    return [
+        val.strip().lower()
+        for val in environ.get("GATEWAY_BINARY_MEDIA_TYPES", "").split(",")
+        if val.strip() != ""
+    ]
+
+
+def max_payload_bytes() -> int:
+    """Get the maximum request payload size from the environment"""
+    return int(environ.get("GATEWAY_MAX_PAYLOAD_BYTES", DEFAULT_MAX_PAYLOAD_BYTES))
+
+
+async def read_body(request: Request, max_bytes: int) -> bytes:
+    """Read the raw request body, failing as soon as it is above the limit.
+
+    Raises:
+        RequestTooLongException: If the body is above the limit.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit():
+        if int(content_length) > max_bytes:
+            raise RequestTooLongException()
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_bytes:
+            raise RequestTooLongException()
+    return bytes(body)
+
+
+def encode_body(
+    body: bytes, content_type: str | None, media_types: list[str]
+) -> tuple[str | None, bool]:
+    """Encode a request body for the event.
+
+    Bodies of binary media types, or that are not valid UTF-8, are base64 encoded.
+
+    Returns:
+        tuple[str | None, bool]: The body and whether it is base64 encoded.
+    """
+    if len(body) == 0:
+        return None, False
+    media_type = (content_type or "").split(";", 1)[0].strip().lower()
+    if not any(fnmatch(media_type, pattern) for pattern in media_types):
+        try:
+            return body.decode("utf-8"), False
+        except UnicodeDecodeError:
+            pass
+    return b64encode(body).decode("ascii"), True
+
+
+def decode_body(response: dict[str, Any]) -> bytes:
+    """Decode the body of a lambda response, base64 encoded or not."""
+    body = response.get("body")
+    if body is None:
+        return b""
+    if response.get("isBase64Encoded", False):
+        return b64decode(body)
+    return str(body).encode("utf-8")
@@ -0,0 +1,201 @@
+"""API Gateway stage response cache"""
+from collections import OrderedDict
+from contextlib import suppress
+from time import monotonic
+from typing import Any
+from fastapi import Request, Response
+from .metrics import Counter, Gauge
+
+DEFAULT_TTL: int = 300
+DEFAULT_MAX_ENTRIES: int = 1000
+DEFAULT_MAX_BYTES: int = 64 * 1024 * 1024
+CACHEABLE_STATUS: range = range(200, 300)
+
+
+class CachePolicy:
+    """The cache settings of a route."""
+
+    ttl: float
+    query: list[str]
+    headers: list[str]
+
+    def __init__(
+        self, settings: dict[str, Any] | bool, token_header: str | None = None
+    ) -> None:
+        """Initialize the policy from the `cache` key of a route.
+
+        Args:
+            settings (dict[str, Any] | bool): `true` for the defaults, or the
+                `ttl` in seconds and the `query` parameters and `headers` that
+                are part of the cache key.
+            token_header (str | None): The token header of the authorizer of
+                the route, part of the key by default, so that users do not
+                get the cached responses of each other.
+        """
+        if not isinstance(settings, dict):
+            settings = {}
+        self.ttl = float(settings.get("ttl", DEFAULT_TTL))
+        self.query = list(settings.get("query", []))
+        default_headers = [token_header] if token_header is not None else []
+        self.headers = [val.lower() for val in settings.get("headers", default_headers)]
+
+
+class _Entry:
+    """A cached response."""
+
+    __slots__ = ("status_code", "headers", "body", "expires")
+
+    status_code: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+    expires: float
+
+    def __init__(self, response: Response, expires: float) -> None:
+        """Initialize the entry."""
+        self.status_code = response.status_code
+        self.headers = list(response.raw_headers)
+        self.body = bytes(response.body)
+        self.expires = expires
+
+    @property
+    def size(self) -> int:
+        """Get the approximate size of the entry, in bytes."""
+        return len(self.body) + sum(len(key) + len(val) for key, val in self.headers)
+
+    def response(self) -> Response:
+        """Build a response from the entry."""
+        response = Response(self.body, status_code=self.status_code)
+        response.raw_headers = list(self.headers)
+        return response
+
+
+class ResponseCache:
+    """LRU response cache bounded in entries and bytes.
+
+    Only successful GET responses of routes with a cache policy are stored.
+    A request with `Cache-Control: max-age=0` skips the lookup and refreshes
+    the entry.
+    """
+
+    max_entries: int
+    max_bytes: int
+    size: int
+    hits: int
+    misses: int
+    evictions: int
+    _entries: "OrderedDict[str, _Entry]"
+
+    def __init__(
+        self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES
+    ) -> None:
+        """Initialize the cache.
+
+        Args:
+            max_entries (int): The maximum number of entries.
+            max_bytes (int): The maximum total size of the entries.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key(policy: CachePolicy, resource: str, request: Request) -> str:
+        """Build the cache key of a request.
+
+        Args:
+            policy (CachePolicy): The cache policy of the route.
+            resource (str): The resource of the route.
+            request (Request): The request.
+
+        Returns:
+            str: The cache key.
+        """
+        parts = [resource, request.url.path]
+        for name in policy.query:
+            parts.append(f"{name}={','.join(request.query_params.getlist(name))}")
+        for name in policy.headers:
+            parts.append(f"{name}:{request.headers.get(name, '')}")
+        return "\n".join(parts)
+
+    @staticmethod
+    def cacheable(request: Request) -> bool:
+        """Check if the response to a request can be cached."""
+        return request.method == "GET"
+
+    @staticmethod
+    def invalidates(request: Request) -> bool:
+        """Check if the request asks to refresh the cached response.
+
+        It does with the `max-age=0` directive of its `Cache-Control`.
+        """
+        for directive in request.headers.get("cache-control", "").split(","):
+            name, _, value = directive.partition("=")
+            if name.strip().lower() != "max-age":
+                continue
+            with suppress(ValueError):
+                return int(value.strip().strip('"')) == 0
+        return False
+
+    def get(self, key: str) -> Response | None:
+        """Get the cached response for a key.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            Response | None: The response, or None on a miss.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry.expires <= monotonic():
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.response()
+
+    def put(self, key: str, response: Response, ttl: float) -> None:
+        """Store a response if it was successful.
+
+        Args:
+            key (str): The cache key.
+            response (Response): The response.
+            ttl (float): The time to live, in seconds.
+        """
+        if response.status_code not in CACHEABLE_STATUS or ttl <= 0:
+            return
+        entry = _Entry(response, monotonic() + ttl)
+        if entry.size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self.size += entry.size
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        """Remove an entry."""
+        self.size -= self._entries.pop(key).size
+
+    def render_metrics(self) -> list[str]:
+        """Render the cache counters in the Prometheus text format."""
+        lines: list[str] = []
+        for name, description, value in (
+            ("hits", "Responses served from the cache.", self.hits),
+            ("misses", "Cacheable requests not found in the cache.", self.misses),
+            ("evictions", "Entries evicted to respect the cache size.", self.evictions),
+        ):
+            counter = Counter(f"gateway_cache_{name}_total", description, ())
+            counter.inc((), value)
+            lines.extend(counter.render())
+        gauge = Gauge("gateway_cache_bytes", "Size of the cached responses.", ())
+        gauge.set((), self.size)
+        lines.extend(gauge.render())
+        return lines
@@ -0,0 +1,116 @@
+"""Single-flight coalescing of identical concurrent requests"""
+from asyncio import Task, create_task, shield
+from typing import Any, Callable, Coroutine
+from fastapi import Request
+from .metrics import Counter
+
+COALESCED_METHODS: tuple[str, ...] = ("GET", "HEAD")
+DEFAULT_HEADERS: tuple[str, ...] = ("authorization",)
+
+
+class CoalescePolicy:
+    """The coalescing settings of a route."""
+
+    headers: list[str]
+
+    def __init__(self, settings: dict[str, Any] | bool) -> None:
+        """Initialize the policy from the `coalesce` key of a route.
+
+        Args:
+            settings (dict[str, Any] | bool): `true` for the defaults, or the
+                `headers` that are part of the key besides the method, the path
+                and the query (default `Authorization`).
+        """
+        if not isinstance(settings, dict):
+            settings = {}
+        self.headers = [
+            val.lower() for val in settings.get("headers", list(DEFAULT_HEADERS))
+        ]
+
+
+class Coalescer:
+    """Share one invocation between the identical requests arriving meanwhile.
+
+    The invocation runs in its own task, so the requests waiting for it are not
+    cancelled with the one that started it.
+    """
+
+    leaders: int
+    followers: int
+    _in_flight: dict[str, "Task[dict[str, Any]]"]
+
+    def __init__(self) -> None:
+        """Initialize the coalescer."""
+        self.leaders = 0
+        self.followers = 0
+        self._in_flight = {}
+
+    @staticmethod
+    def key(policy: CoalescePolicy, request: Request) -> str:
+        """Build the coalescing key of a request.
+
+        Args:
+            policy (CoalescePolicy): The coalescing policy of the route.
+            request (Request): The request.
+
+        Returns:
+            str: The key.
+        """
+        parts = [
+            request.method,
+            request.url.path,
+            "&".join(
+                f"{name}={value}"
+                for name, value in sorted(request.query_params.multi_items())
+            ),
+        ]
+        for name in policy.headers:
+            parts.append(f"{name}:{request.headers.get(name, '')}")
+        return "\n".join(parts)
+
+    @staticmethod
+    def coalescable(request: Request) -> bool:
+        """Check if identical requests can share the response, without a body."""
+        return request.method in COALESCED_METHODS
+
+    async def run(
+        self, key: str, invoke: Callable[[], Coroutine[Any, Any, dict[str, Any]]]
+    ) -> dict[str, Any]:
+        """Join the invocation in flight for a key, or start it.
+
+        Args:
+            key (str): The coalescing key.
+            invoke (Callable[[], Coroutine[Any, Any, dict[str, Any]]]): Starts
+                the invocation.
+
+        Returns:
+            dict[str, Any]: The lambda response, shared by the requests.
+        """
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.followers += 1
+        else:
+            self.leaders += 1
+            task = create_task(invoke())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._done(key, done))
+        return await shield(task)
+
+    def _done(self, key: str, task: "Task[dict[str, Any]]") -> None:
+        """Let the next request for the key start a new invocation."""
+        self._in_flight.pop(key, None)
+        # Retrieve the exception, in case every waiting request was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def render_metrics(self) -> list[str]:
+        """Render the coalescing counters in the Prometheus text format."""
+        lines: list[str] = []
+        for name, description, value in (
+            ("invocations", "Invocations shared by coalesced requests.", self.leaders),
+            ("requests", "Requests served by another invocation.", self.followers),
+        ):
+            counter = Counter(f"gateway_coalesced_{name}_total", description, ())
+            counter.inc((), value)
+            lines.extend(counter.render())
+        return lines
@@ -0,0 +1,52 @@
+"""JSON codec, orjson when available"""
+from contextlib import suppress
+from json import dumps as json_dumps, loads as json_loads
+from os import environ
+from typing import Any, Callable
+
+Encoder = Callable[[Any], bytes]
+Decoder = Callable[[bytes | str], Any]
+
+
+def _json_dumps(value: Any) -> bytes:
+    """Encode with the standard library."""
+    return json_dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+# The codecs by name, more can be registered
+CODECS: dict[str, tuple[Encoder, Decoder]] = {"json": (_json_dumps, json_loads)}
+
+with suppress(ImportError):
+    import orjson
+
+    CODECS["orjson"] = (orjson.dumps, orjson.loads)
+
+
+class JsonCodec:
+    """Encode and decode JSON with the configured library."""
+
+    name: str
+    dumps: Encoder
+    loads: Decoder
+
+    def __init__(self, name: str | None = None) -> None:
+        """Initialize the codec.
+
+        Args:
+            name (str): The codec, by default `GATEWAY_JSON_CODEC` or orjson if
+                installed.
+
+        Raises:
+            ValueError: If the codec is unknown.
+        """
+        if name is None:
+            name = environ.get(
+                "GATEWAY_JSON_CODEC", "orjson" if "orjson" in CODECS else "json"
+            )
+        if name not in CODECS:
+            raise ValueError(f"Unknown JSON codec: {name}")
+        self.name = name
+        self.dumps, self.loads = CODECS[name]
+
+
+codec: JsonCodec = JsonCodec()
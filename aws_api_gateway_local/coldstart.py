@@ -0,0 +1,267 @@
+"""Profile the cold starts of the lambda handlers.
+
+Each handler is imported and invoked in fresh interpreters, reporting the import
+time, the first invocation time and the time of a warm invocation.
+
+Example:
+```bash
+python -m aws_api_gateway_local.coldstart --runs 5 --output coldstart.json
+```
+"""
+import sys
+from argparse import ArgumentParser, Namespace
+from json import dumps, loads
+from os import environ
+from statistics import median
+from subprocess import run  # nosec B404
+from typing import Any
+from .inprocess import lambdas_directory
+
+# Profiled by default, as none of them changes the backend
+HANDLERS: tuple[str, ...] = ("get_data", "login")
+# Profiled only with an event of --events, as they write to Cognito or S3
+MUTATING_HANDLERS: tuple[str, ...] = ("post_data", "register")
+TIMINGS: tuple[str, ...] = ("import_ms", "first_invocation_ms", "warm_invocation_ms")
+PROBE_TIMEOUT: int = 60
+# The localstack of docker-compose.yml
+LOCAL_ENDPOINT: str = "http://127.0.0.1:4566"
+# Defaults of the probe environment, so the clients reach the local endpoint
+PROBE_ENVIRONMENT: dict[str, str] = {
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "AWS_ACCESS_KEY_ID": "test",
+    "AWS_SECRET_ACCESS_KEY": "test",
+    "AWS_MAX_ATTEMPTS": "1",
+    "COGNITO_ENDPOINT_URL": LOCAL_ENDPOINT,
+    "S3_ENDPOINT_URL": LOCAL_ENDPOINT,
+}
+# The user of the authorized default events, as passed by an authorizer
+CLAIMS: dict[str, str] = {
+    "email": "coldstart@example.com",
+    "sub": "00000000-0000-0000-0000-000000000000",
+}
+CREDENTIALS: dict[str, str] = {"email": CLAIMS["email"], "password": "Coldstart1!"}
+# The method and body of the default event of each handler
+DEFAULT_REQUESTS: dict[str, tuple[str, Any]] = {
+    "get_data": ("GET", None),
+    "login": ("POST", CREDENTIALS),
+}
+AUTHORIZED_HANDLERS: tuple[str, ...] = ("get_data",)
+
+# Run in a fresh interpreter, so nothing but the handler is imported
+PROBE: str = """
+import sys
+from importlib import import_module
+from json import dumps, loads
+from time import perf_counter
+
+lambdas_path, name, event = sys.argv[1], sys.argv[2], loads(sys.argv[3])
+sys.path.insert(0, lambdas_path)
+
+
+class Context:
+    function_name = name
+    function_version = "$LATEST"
+    invoked_function_arn = f"arn:aws:lambda:us-east-1:000000000000:function:{name}"
+    memory_limit_in_mb = 128
+    aws_request_id = "coldstart"
+    log_group_name = f"/aws/lambda/{name}"
+    log_stream_name = "coldstart"
+
+    def get_remaining_time_in_millis(self):
+        return 3000
+
+
+def packages(modules):
+    return sorted(
+        {
+            module.split(".")[0]
+            for module in modules
+            if module.split(".")[0] not in sys.stdlib_module_names
+        }
+    )
+
+
+before = set(sys.modules)
+start = perf_counter()
+handler = import_module(name).lambda_handler
+imported = perf_counter()
+after_import = set(sys.modules)
+response = handler(event, Context())
+invoked = perf_counter()
+handler(event, Context())
+warm = perf_counter()
+print(
+    dumps(
+        {
+            "import_ms": (imported - start) * 1000,
+            "first_invocation_ms": (invoked - imported) * 1000,
+            "warm_invocation_ms": (warm - invoked) * 1000,
+            "status": response.get("statusCode"),
+            "imported": packages(after_import - before),
+            "imported_on_invocation": packages(set(sys.modules) - after_import),
+        }
+    )
+)
+"""
+
+
+def default_event(name: str) -> dict[str, Any]:
+    """Build the default event of a handler.
+
+    Known handlers get a request taking their real path: `get_data` is
+    authorized by the claims of a user, so it reaches S3, and `login` gets
+    credentials, so it reaches Cognito. Other handlers get an anonymous GET.
+    """
+    method, body = DEFAULT_REQUESTS.get(name, ("GET", None))
+    event: dict[str, Any] = {
+        "resource": f"/{name}",
+        "path": f"/{name}",
+        "httpMethod": method,
+        "headers": {"Content-Type": "application/json"} if body is not None else {},
+        "multiValueHeaders": {},
+        "queryStringParameters": None,
+        "multiValueQueryStringParameters": None,
+        "pathParameters": None,
+        "stageVariables": None,
+        "requestContext": {"httpMethod": method, "path": f"/{name}"},
+        "body": dumps(body) if body is not None else None,
+        "isBase64Encoded": False,
+    }
+    if name in AUTHORIZED_HANDLERS:
+        event["headers"]["Authorization"] = "Bearer coldstart"
+        event["requestContext"]["authorizer"] = {"claims": dict(CLAIMS)}
+    return event
+
+
+def event_label(name: str, events: dict[str, dict[str, Any]]) -> str:
+    """Describe the event a handler was profiled with."""
+    if name in events:
+        return "custom"
+    if name in AUTHORIZED_HANDLERS:
+        return "authorized"
+    return "default" if name in DEFAULT_REQUESTS else "anonymous"
+
+
+def probe(lambdas_path: str, name: str, event: dict[str, Any]) -> dict[str, Any]:
+    """Cold start a handler in a fresh interpreter.
+
+    The AWS variables not set already point the clients at the local endpoint,
+    with a single attempt, so an endpoint that is down fails fast.
+
+    Raises:
+        RuntimeError: If the interpreter fails.
+    """
+    result = run(  # nosec B603
+        [sys.executable, "-c", PROBE, lambdas_path, name, dumps(event)],
+        capture_output=True,
+        text=True,
+        timeout=PROBE_TIMEOUT,
+        env={**PROBE_ENVIRONMENT, **environ},
+        check=False,
+    )
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        raise RuntimeError(f"{name} failed: {result.stderr.strip()}")
+    return dict(loads(lines[-1]))
+
+
+def profile(
+    lambdas_path: str,
+    handlers: list[str],
+    events: dict[str, dict[str, Any]],
+    runs: int,
+) -> dict[str, Any]:
+    """Profile the cold starts of the handlers.
+
+    Args:
+        lambdas_path (str): The directory of the handlers.
+        handlers (list[str]): The handler modules.
+        events (dict[str, dict[str, Any]]): The event of each handler, by
+            default one taking its real path (see `default_event`).
+        runs (int): The number of cold starts of each handler.
+
+    Returns:
+        dict[str, Any]: The median timings of each handler, in milliseconds.
+    """
+    report: dict[str, Any] = {"runs": runs, "handlers": {}}
+    for name in handlers:
+        event = events.get(name, default_event(name))
+        samples = [probe(lambdas_path, name, event) for _ in range(runs)]
+        result: dict[str, Any] = {
+            timing: round(median(sample[timing] for sample in samples), 3)
+            for timing in TIMINGS
+        }
+        result["cold_start_ms"] = round(
+            result["import_ms"] + result["first_invocation_ms"], 3
+        )
+        result["event"] = event_label(name, events)
+        result["status"] = samples[-1]["status"]
+        result["imported"] = samples[-1]["imported"]
+        result["imported_on_invocation"] = samples[-1]["imported_on_invocation"]
+        report["handlers"][name] = result
+    return report
+
+
+parser: ArgumentParser = ArgumentParser(
+    description="Profile the cold starts of the lambda handlers"
+)
+parser.add_argument(
+    "--lambdas-path",
+    type=str,
+    default=None,
+    help="The directory of the handlers",
+)
+parser.add_argument(
+    "--handlers",
+    type=str,
+    nargs="+",
+    default=list(HANDLERS),
+    help="The handler modules to profile; post_data and register need --events",
+)
+parser.add_argument(
+    "--events",
+    type=str,
+    default=None,
+    help="A JSON file with the event of each handler, by handler name",
+)
+parser.add_argument(
+    "--runs",
+    type=int,
+    default=5,
+    help="The number of cold starts of each handler",
+)
+parser.add_argument(
+    "--output",
+    type=str,
+    default=None,
+    help="Where to write the JSON report, instead of the standard output",
+)
+
+
+def main(args: Namespace) -> int:
+    """Run the profiler.
+
+    Returns:
+        int: 0.
+    """
+    events: dict[str, dict[str, Any]] = {}
+    if args.events is not None:
+        with open(args.events, "r", encoding="utf-8") as handle:
+            events = loads(handle.read())
+    for name in args.handlers:
+        if name in MUTATING_HANDLERS and name not in events:
+            parser.error(f"{name} changes the backend, give its event with --events")
+    report = profile(
+        lambdas_directory(args.lambdas_path), args.handlers, events, args.runs
+    )
+    output = dumps(report, indent=2)
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(output)
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,211 @@
+"""API Gateway style content encoding, with minimumCompressionSize semantics"""
+import zlib
+from asyncio import get_running_loop
+from contextlib import suppress
+from fnmatch import fnmatch
+from os import environ
+from typing import Any, Callable
+from fastapi import Request, Response
+from .body import RequestTooLongException
+from .validation import BadRequestException
+
+try:
+    import brotli
+except ImportError:  # The `brotli` extra
+    brotli = None
+
+# Compressing or decompressing bodies above this size would stall the event loop
+OFFLOAD_BYTES: int = 64 * 1024
+GZIP_LEVEL: int = 6
+BROTLI_QUALITY: int = 4
+# Media types whose content is compressed already
+COMPRESSED_MEDIA_TYPES: tuple[str, ...] = (
+    "image/png",
+    "image/jpeg",
+    "image/gif",
+    "image/webp",
+    "image/avif",
+    "video/*",
+    "audio/*",
+    "font/woff",
+    "font/woff2",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/x-bzip2",
+    "application/x-xz",
+    "application/x-7z-compressed",
+    "application/zstd",
+)
+UNCOMPRESSED_STATUS: tuple[int, ...] = (204, 206, 304)
+
+
+def _gzip(body: bytes) -> bytes:
+    """Compress a body with gzip."""
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(body) + compressor.flush()
+
+
+def _brotli(body: bytes) -> bytes:
+    """Compress a body with brotli."""
+    return bytes(brotli.compress(body, quality=BROTLI_QUALITY))
+
+
+def encoders() -> dict[str, Callable[[bytes], bytes]]:
+    """Get the available encoders, by preference."""
+    available: dict[str, Callable[[bytes], bytes]] = {}
+    if brotli is not None:
+        available["br"] = _brotli
+    available["gzip"] = _gzip
+    return available
+
+
+def minimum_compression_size() -> int | None:
+    """Get the minimum compressed response size, None if compression is disabled"""
+    size = environ.get("GATEWAY_MINIMUM_COMPRESSION_SIZE", "").strip()
+    return int(size) if size != "" else None
+
+
+def accepted_encoding(accept_encoding: str, available: list[str]) -> str | None:
+    """Choose the preferred encoding of the client among the available ones.
+
+    Args:
+        accept_encoding (str): The `Accept-Encoding` header, with `q` values.
+        available (list[str]): The encodings, by preference of the gateway.
+
+    Returns:
+        str | None: The encoding, or None to answer uncompressed.
+    """
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        weight = 1.0
+        if params.strip().startswith("q="):
+            with suppress(ValueError):
+                weight = float(params.strip()[2:])
+        weights[name.strip().lower()] = weight
+    best: str | None = None
+    for encoding in available:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > 0 and (best is None or weight > weights.get(best, 0.0)):
+            best = encoding
+    return best
+
+
+def _decompress(body: bytes, encoding: str, max_bytes: int) -> bytes:
+    """Decompress a request body, without inflating it above the limit.
+
+    Raises:
+        RequestTooLongException: If the body is above the limit once inflated.
+        BadRequestException: If the body is not valid for its encoding.
+    """
+    try:
+        if encoding == "br":
+            # The output stops growing past the limit, like zlib max_length
+            inflated = bytes(
+                brotli.Decompressor().process(body, output_buffer_limit=max_bytes + 1)
+            )
+        else:
+            wbits = 16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS
+            inflated = zlib.decompressobj(wbits).decompress(body, max_bytes + 1)
+    except Exception as err:  # zlib.error or brotli.error
+        raise BadRequestException() from err
+    if len(inflated) > max_bytes:
+        raise RequestTooLongException()
+    return inflated
+
+
+def describe_inflated(payload: dict[str, Any], size: int) -> None:
+    """Make the headers of an event describe its inflated body, as API Gateway.
+
+    Args:
+        payload (dict[str, Any]): The event, with lowercase header names.
+        size (int): The size of the inflated body, in bytes.
+    """
+    for headers in (payload["headers"], payload["multiValueHeaders"]):
+        headers.pop("content-encoding", None)
+    if "content-length" in payload["headers"]:
+        payload["headers"]["content-length"] = str(size)
+        payload["multiValueHeaders"]["content-length"] = [str(size)]
+
+
+class Compression:
+    """Content encoding of the gateway, enabled by `minimumCompressionSize`.
+
+    Responses above the minimum size are compressed for the clients accepting
+    it, and compressed request bodies are inflated before the event is built.
+    """
+
+    minimum_size: int
+    _encoders: dict[str, Callable[[bytes], bytes]]
+
+    def __init__(self, minimum_size: int) -> None:
+        """Initialize the compression.
+
+        Args:
+            minimum_size (int): The smallest response body to compress, in
+                bytes, as the API Gateway `minimumCompressionSize`.
+        """
+        self.minimum_size = minimum_size
+        self._encoders = encoders()
+
+    @staticmethod
+    async def _run(function: Callable[[], bytes], size: int) -> bytes:
+        """Run a compression function, in a thread for large bodies."""
+        if size < OFFLOAD_BYTES:
+            return function()
+        return await get_running_loop().run_in_executor(None, function)
+
+    def decodable(self, encoding: str) -> bool:
+        """Check if a request content encoding can be decompressed."""
+        return encoding in ("gzip", "deflate") or encoding in self._encoders
+
+    async def decompress(self, request: Request, body: bytes, max_bytes: int) -> bytes:
+        """Decompress a request body, as its `Content-Encoding` says.
+
+        Unknown encodings are passed through, for the lambda to handle.
+
+        Raises:
+            RequestTooLongException: If the body is above the limit once inflated.
+            BadRequestException: If the body is not valid for its encoding.
+        """
+        encoding = request.headers.get("content-encoding", "").strip().lower()
+        if len(body) == 0 or not self.decodable(encoding):
+            return body
+        return await self._run(
+            lambda: _decompress(body, encoding, max_bytes), len(body)
+        )
+
+    def compressible(self, request: Request, response: Response) -> bool:
+        """Check if a response is worth compressing."""
+        if request.method == "HEAD" or response.status_code in UNCOMPRESSED_STATUS:
+            return False
+        if len(response.body) < self.minimum_size:
+            return False
+        if "content-encoding" in response.headers:
+            return False
+        media_type = (
+            response.headers.get("content-type", "").split(";", 1)[0].strip().lower()
+        )
+        return not any(fnmatch(media_type, val) for val in COMPRESSED_MEDIA_TYPES)
+
+    async def compress(self, request: Request, response: Response) -> Response:
+        """Compress a response with the encoding preferred by the client.
+
+        Returns:
+            Response: The response, compressed in place if worth it.
+        """
+        if not self.compressible(request, response):
+            return response
+        response.headers.append("vary", "Accept-Encoding")
+        encoding = accepted_encoding(
+            request.headers.get("accept-encoding", ""), list(self._encoders)
+        )
+        if encoding is None:
+            return response
+        body = bytes(response.body)
+        encoder = self._encoders[encoding]
+        response.body = await self._run(lambda: encoder(body), len(body))
+        response.headers["content-encoding"] = encoding
+        response.headers["content-length"] = str(len(response.body))
+        return response
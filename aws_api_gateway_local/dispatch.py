@@ -0,0 +1,252 @@
+"""Asynchronous (Event) invocations, dispatched from a bounded queue"""
+from asyncio import (
+    CancelledError,
+    Queue,
+    QueueFull,
+    Task,
+    TimerHandle,
+    create_task,
+    get_running_loop,
+    sleep,
+)
+from contextlib import suppress
+from os import environ
+from random import random
+from time import monotonic, time
+from typing import Any, Callable, Coroutine
+from .codec import codec
+from .exceptions import TooManyRequestsException
+from .logs import logger
+from .metrics import Counter, Gauge, Histogram
+from .routing import Route
+
+DEFAULT_QUEUE_SIZE: int = 1000
+DEFAULT_DISPATCHERS: int = 4
+DEFAULT_RETRIES: int = 2
+DEFAULT_BACKOFF: float = 1.0
+DRAIN_TIMEOUT: float = 30.0
+DRAIN_POLL_INTERVAL: float = 0.05
+FAILED_STATUS: int = 500
+
+# Invoke the lambda of a route with an event, returning its response
+Invoke = Callable[[Route, Any], Coroutine[Any, Any, dict[str, Any]]]
+
+
+def failure(response: dict[str, Any]) -> str | None:
+    """Get why a lambda response is a failure, None if it succeeded."""
+    if "errorMessage" in response or "errorType" in response:
+        return str(response.get("errorMessage", response.get("errorType")))
+    if "statusCode" not in response:
+        return "No status code"
+    status = int(response["statusCode"])
+    if status >= FAILED_STATUS:
+        return f"Status {status}"
+    return None
+
+
+class _Event:
+    """A queued invocation."""
+
+    __slots__ = ("request_id", "route", "payload", "attempts", "due")
+
+    request_id: str
+    route: Route
+    payload: Any
+    attempts: int
+    due: float
+
+    def __init__(self, request_id: str, route: Route, payload: Any) -> None:
+        """Initialize the invocation, due now."""
+        self.request_id = request_id
+        self.route = route
+        self.payload = payload
+        self.attempts = 0
+        self.due = monotonic()
+
+
+class EventDispatcher:
+    """Invoke lambdas in the background, with retries and a dead-letter file.
+
+    Requests are answered as soon as their event is queued. The queue is
+    bounded, so a backlog throttles new requests instead of growing without
+    limit. Failed invocations are queued again after an exponential backoff,
+    and written to the dead-letter file once the retries are spent.
+    """
+
+    max_retries: int
+    backoff: float
+    dead_letter_path: str | None
+    dispatched: int
+    retried: int
+    dead_letters: int
+    lag: Histogram
+    _invoke: Invoke
+    _queue: "Queue[_Event]"
+    _workers: int
+    _tasks: list["Task[None]"]
+    _retries: dict[_Event, TimerHandle]
+    _active: int
+
+    def __init__(
+        self,
+        invoke: Invoke,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        workers: int = DEFAULT_DISPATCHERS,
+    ) -> None:
+        """Initialize the dispatcher.
+
+        Retries, backoff and the dead-letter file are read from the environment.
+
+        Args:
+            invoke (Invoke): Invokes the lambda of a route.
+            queue_size (int): The maximum number of queued invocations.
+            workers (int): The number of concurrent dispatchers.
+        """
+        self.max_retries = int(environ.get("GATEWAY_EVENT_RETRIES", DEFAULT_RETRIES))
+        self.backoff = float(environ.get("GATEWAY_EVENT_BACKOFF", DEFAULT_BACKOFF))
+        self.dead_letter_path = environ.get("GATEWAY_EVENT_DEAD_LETTER") or None
+        self.dispatched = 0
+        self.retried = 0
+        self.dead_letters = 0
+        self.lag = Histogram(
+            "gateway_event_lag_seconds",
+            "Time between an event being due and its dispatch.",
+            ("lambda",),
+        )
+        self._invoke = invoke
+        self._queue = Queue(queue_size)
+        self._workers = workers
+        self._tasks = []
+        self._retries = {}
+        self._active = 0
+
+    def submit(self, request_id: str, route: Route, payload: Any) -> None:
+        """Queue an invocation, starting the dispatchers on the first one.
+
+        Raises:
+            TooManyRequestsException: If the queue is full.
+        """
+        if not self._tasks:
+            self._tasks = [
+                create_task(self._dispatch(), name=f"event-dispatcher-{i}")
+                for i in range(self._workers)
+            ]
+        try:
+            self._queue.put_nowait(_Event(request_id, route, payload))
+        except QueueFull as err:
+            raise TooManyRequestsException("Event queue full") from err
+
+    def pending(self) -> int:
+        """Count the invocations not done yet."""
+        return self._queue.qsize() + len(self._retries) + self._active
+
+    async def _dispatch(self) -> None:
+        """Invoke the queued events until cancelled."""
+        while True:
+            event = await self._queue.get()
+            self._active += 1
+            try:
+                await self._attempt(event)
+            except CancelledError:
+                self._dead_letter(event, "Gateway stopped")
+                raise
+            finally:
+                self._active -= 1
+                self._queue.task_done()
+
+    async def _attempt(self, event: _Event) -> None:
+        """Invoke an event once, and retry or dead-letter it if it failed."""
+        self.lag.observe((event.route.lambda_name,), monotonic() - event.due)
+        event.attempts += 1
+        try:
+            error = failure(await self._invoke(event.route, event.payload))
+        except Exception as err:  # pylint: disable=broad-except
+            error = f"{type(err).__name__}: {err}"
+        self.dispatched += 1
+        if error is None:
+            return
+        if event.attempts > self.max_retries:
+            self._dead_letter(event, error)
+            return
+        self.retried += 1
+        # Exponential backoff with jitter, so retries do not come in waves
+        delay = self.backoff * 2 ** (event.attempts - 1) * (0.5 + random())
+        self._retries[event] = get_running_loop().call_later(
+            delay, self._requeue, event
+        )
+
+    def _requeue(self, event: _Event) -> None:
+        """Queue a retry once its backoff is over."""
+        self._retries.pop(event, None)
+        event.due = monotonic()
+        try:
+            self._queue.put_nowait(event)
+        except QueueFull:
+            self._dead_letter(event, "Event queue full")
+
+    def _dead_letter(self, event: _Event, error: str) -> None:
+        """Give up on an event, writing it to the dead-letter file."""
+        self.dead_letters += 1
+        logger.error(
+            "Event %s to %s failed after %d attempts: %s",
+            event.request_id,
+            event.route.lambda_name,
+            event.attempts,
+            error,
+        )
+        if self.dead_letter_path is None:
+            return
+        record = {
+            "requestId": event.request_id,
+            "time": time(),
+            "lambda": event.route.lambda_name,
+            "attempts": event.attempts,
+            "error": error,
+            "event": event.payload,
+        }
+        with open(self.dead_letter_path, "a", encoding="utf-8") as handle:
+            handle.write(codec.dumps(record).decode("utf-8") + "\n")
+
+    async def stop(self, timeout: float = DRAIN_TIMEOUT) -> None:
+        """Wait for the pending invocations, then stop the dispatchers.
+
+        Invocations still pending after the timeout are dead-lettered.
+        """
+        deadline = monotonic() + timeout
+        while self.pending() > 0 and monotonic() < deadline:
+            await sleep(DRAIN_POLL_INTERVAL)
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with suppress(CancelledError):
+                await task
+        for event, handle in list(self._retries.items()):
+            handle.cancel()
+            self._dead_letter(event, "Gateway stopped")
+        self._retries.clear()
+        while not self._queue.empty():
+            self._dead_letter(self._queue.get_nowait(), "Gateway stopped")
+
+    def render_metrics(self) -> list[str]:
+        """Render the queue metrics in the Prometheus text format."""
+        lines: list[str] = []
+        gauge = Gauge(
+            "gateway_event_queue_depth", "Events waiting for a dispatcher.", ()
+        )
+        gauge.set((), self._queue.qsize())
+        lines.extend(gauge.render())
+        gauge = Gauge(
+            "gateway_event_retries_pending", "Failed events waiting to be retried.", ()
+        )
+        gauge.set((), len(self._retries))
+        lines.extend(gauge.render())
+        for name, description, value in (
+            ("dispatched", "Event invocations attempted.", self.dispatched),
+            ("retried", "Failed event invocations retried.", self.retried),
+            ("dead_letters", "Events given up after their retries.", self.dead_letters),
+        ):
+            counter = Counter(f"gateway_event_{name}_total", description, ())
+            counter.inc((), value)
+            lines.extend(counter.render())
+        lines.extend(self.lag.render())
+        return lines
@@ -0,0 +1,24 @@
+"""Gateway exceptions"""
+
+
+class GatewayException(Exception):
+    """Gateway exception, answered before or instead of the lambda."""
+
+    message: str
+    code: int
+    error_type: str
+
+    def __init__(self, message: str, code: int, error_type: str) -> None:
+        """Initialize the gateway exception."""
+        self.message = message
+        self.code = code
+        self.error_type = error_type
+        super().__init__(message)
+
+
+class TooManyRequestsException(GatewayException):
+    """The concurrency of a function is exhausted."""
+
+    def __init__(self, message: str = "Rate exceeded") -> None:
+        """Initialize the exception."""
+        super().__init__(message, 429, "TooManyRequestsException")
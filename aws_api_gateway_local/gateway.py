@@ -0,0 +1,554 @@
+"""The gateway, from the request to the integration and back"""
+from contextlib import suppress
+from json import loads
+from os import environ
+from os.path import exists
+from time import perf_counter
+from typing import Any, cast
+from uuid import uuid4
+from fastapi import HTTPException, Request, Response
+from .authorizer import (
+    DEFAULT_MAX_ENTRIES as DEFAULT_AUTHORIZER_ENTRIES,
+    CognitoAuthorizer,
+)
+from .body import (
+    binary_media_types,
+    decode_body,
+    encode_body,
+    max_payload_bytes,
+    read_body,
+)
+from .cache import DEFAULT_MAX_BYTES, DEFAULT_MAX_ENTRIES, ResponseCache
+from .coalescing import Coalescer
+from .compression import Compression, describe_inflated, minimum_compression_size
+from .codec import codec
+from .dispatch import DEFAULT_DISPATCHERS, DEFAULT_QUEUE_SIZE, EventDispatcher
+from .exceptions import GatewayException
+from .inprocess import InProcessInvoker
+from .invoker import (
+    DEFAULT_MAX_CONCURRENCY,
+    UNBOUNDED_QUEUE,
+    ConcurrencyLimiter,
+    Integration,
+    LambdaInvoker,
+)
+from .logs import AccessLog, logger
+from .metrics import Metrics
+from .openapi import openapi_routes, read_document
+from .processpool import ProcessInvoker
+from .recording import Recorder, Replayer
+from .reloader import DEFAULT_INTERVAL as DEFAULT_RELOAD_INTERVAL, RouteWatcher
+from .routing import INTEGRATIONS, Route, RouteTable
+from .throttling import ThrottlePolicy, Throttler, read_usage_plans
+
+with suppress(ImportError):
+    from aws_lambda_typing.events import APIGatewayProxyEventV1
+
+# pylint: disable=broad-except
+
+
+async def get_payload(
+    request: Request,
+    route: Route,
+    path_parameters: dict[str, str],
+    raw_body: bytes,
+    media_types: list[str],
+) -> "APIGatewayProxyEventV1":
+    """Convert the request to a payload"""
+    body, is_base64_encoded = encode_body(
+        raw_body,
+        request.headers.get("content-type"),
+        media_types,
+    )
+    payload: "APIGatewayProxyEventV1" = {
+        "body": body,
+        "headers": dict(request.headers),
+        "httpMethod": request.method,
+        "isBase64Encoded": is_base64_encoded,
+        "path": request.url.path,
+        "queryStringParameters": dict(request.query_params),
+        "requestContext": {
+            "httpMethod": request.method.strip().upper(),
+            "resourcePath": route.resource,
+            "path": request.url.path,
+        },  # dict(request.scope),  # TODO: Add request context
+        "resource": route.resource,
+        "stageVariables": None,  # dict(request.scope),
+        "pathParameters": path_parameters,
+        "multiValueQueryStringParameters": {
+            key: request.query_params.getlist(key)
+            for key in request.query_params.keys()
+        },
+        "multiValueHeaders": {
+            key: request.headers.getlist(key) for key in request.headers.keys()
+        },
+    }
+    return payload
+
+
+def error_response(err: GatewayException) -> Response:
+    """Answer with a gateway error"""
+    return Response(
+        codec.dumps({"message": err.message}),
+        status_code=err.code,
+        headers={"x-amzn-ErrorType": err.error_type},
+        media_type="application/json",
+    )
+
+
+async def run_lambda(
+    route: Route,
+    payload: "APIGatewayProxyEventV1",
+    integration: Integration,
+) -> dict[str, Any]:
+    """Run the lambda"""
+    return await integration.invoke(route, cast(dict[str, Any], payload))
+
+
+def lambda_response(response: dict[str, Any]) -> Response:
+    """Convert the lambda response to a response.
+
+    Function errors and responses without a status code are answered 502, as
+    API Gateway does for a malformed proxy integration response.
+    """
+    if (
+        "errorMessage" in response
+        or "errorType" in response
+        or "statusCode" not in response
+    ):
+        logger.error("Malformed Lambda proxy response: %s", response)
+        return error_response(
+            GatewayException(
+                "Internal server error", 502, "InternalServerErrorException"
+            )
+        )
+    result = Response(
+        decode_body(response),
+        status_code=response["statusCode"],
+        headers=response.get("headers") or {},
+    )
+    for key, values in (response.get("multiValueHeaders") or {}).items():
+        for value in values:
+            result.headers.append(key, str(value))
+    return result
+
+
+def routes_paths() -> tuple[str, str]:
+    """Get the paths of the routes file and of the OpenAPI document, if any."""
+    return (
+        environ.get("GATEWAY_ROUTES", "./routes.json"),
+        environ.get("GATEWAY_OPENAPI", ""),
+    )
+
+
+def read_routes(path: str | None = None, missing_ok: bool = True) -> RouteTable:
+    """Read and build the route table.
+
+    With `GATEWAY_OPENAPI`, the routes are the operations of the OpenAPI
+    document, and the routes file maps them to lambdas.
+
+    Args:
+        path (str): The routes file, `GATEWAY_ROUTES` by default.
+        missing_ok (bool): Whether a missing routes file means no routes.
+
+    Raises:
+        Exception: If the routes file is missing and required, or if it or
+            the document is invalid.
+    """
+    routes_path, document = routes_paths()
+    if path is None:
+        path = routes_path
+    definitions: list[dict[str, Any]] = []
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            definitions = loads(handle.read())
+    except FileNotFoundError:
+        if not missing_ok:
+            raise
+    if document != "":
+        definitions = openapi_routes(read_document(document), definitions)
+    return RouteTable(definitions)
+
+
+def load_routes(path: str | None = None) -> RouteTable:
+    """Load the route table, empty if the routes file cannot be read."""
+    try:
+        return read_routes(path)
+    except Exception as err:
+        logger.error("Cannot load the routes: %s", err)
+    return RouteTable([])
+
+
+def function_limits(route_table: RouteTable) -> dict[str, int]:
+    """Get the concurrency limit of each lambda from the routes"""
+    limits: dict[str, int] = {}
+    for route in route_table.routes:
+        with suppress(KeyError):
+            limits[route.lambda_name] = int(route.options["concurrency"])
+    return limits
+
+
+def function_queues(route_table: RouteTable) -> dict[str, int | None]:
+    """Get how many requests can wait for each limited lambda from the routes"""
+    queues: dict[str, int | None] = {}
+    for route in route_table.routes:
+        if "queue" not in route.options:
+            continue
+        queue = route.options["queue"]
+        queues[route.lambda_name] = None if queue == UNBOUNDED_QUEUE else int(queue)
+    return queues
+
+
+def throttler() -> Throttler:
+    """Build the stage throttle and the usage plans from the environment."""
+    rate = environ.get("GATEWAY_THROTTLE_RATE", "")
+    stage: ThrottlePolicy | None = None
+    if rate != "":
+        burst = environ.get("GATEWAY_THROTTLE_BURST", "")
+        stage = ThrottlePolicy(
+            {"rate": rate, "burst": burst} if burst != "" else {"rate": rate}
+        )
+    plans = environ.get("GATEWAY_USAGE_PLANS", "")
+    workers = int(environ.get("GATEWAY_WORKERS", "1"))
+    if workers > 1 and (stage is not None or plans != ""):
+        logger.warning(
+            "Each of the %d workers throttles and counts quotas on its own", workers
+        )
+    return Throttler(stage, read_usage_plans(plans) if plans != "" else None)
+
+
+class Invocation:
+    """The outcome of a request."""
+
+    response: Response
+    integration_time: float
+    request_bytes: int
+
+    def __init__(
+        self, response: Response, integration_time: float = 0.0, request_bytes: int = 0
+    ) -> None:
+        """Initialize the invocation.
+
+        Args:
+            response (Response): The response.
+            integration_time (float): The time spent in the integration.
+            request_bytes (int): The size of the request body.
+        """
+        self.response = response
+        self.integration_time = integration_time
+        self.request_bytes = request_bytes
+
+
+class Gateway:
+    """The state of the gateway in a worker process.
+
+    Settings are read from the environment, so every worker process builds its
+    own clients and route table.
+    """
+
+    route_table: RouteTable
+    routes_file_found: bool
+    integrations: dict[str, Integration]
+    cache: ResponseCache
+    coalescer: Coalescer
+    authorizer: CognitoAuthorizer
+    throttler: Throttler
+    metrics: Metrics
+    access_log: AccessLog
+    media_types: list[str]
+    max_payload: int
+    compression: Compression | None
+    dispatcher: EventDispatcher
+    recorder: Recorder | None
+    limiter: ConcurrencyLimiter | None
+    processes: ProcessInvoker | None
+    watcher: RouteWatcher | None
+
+    def __init__(self, integration: Integration | None = None) -> None:
+        """Build the route table and the integrations.
+
+        Args:
+            integration (Integration): An integration serving every route, like
+                a stub, instead of the configured ones.
+        """
+        self.route_table = load_routes()
+        self.routes_file_found = exists(routes_paths()[0])
+        self.metrics = Metrics()
+        replay = environ.get("GATEWAY_REPLAY", "")
+        if integration is None and replay != "":
+            integration = Replayer(
+                replay, environ.get("GATEWAY_REPLAY_LATENCY", "0") == "1"
+            )
+        self.limiter = None
+        self.processes = None
+        if integration is not None:
+            self.integrations = {name: integration for name in INTEGRATIONS}
+        else:
+            max_concurrency = int(
+                environ.get("GATEWAY_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)
+            )
+            self.limiter = ConcurrencyLimiter(
+                max_concurrency,
+                function_limits(self.route_table),
+                function_queues(self.route_table),
+            )
+            self.processes = ProcessInvoker(self.limiter, self.route_table.routes)
+            self.integrations = {
+                "lambda": LambdaInvoker(self.limiter, max_concurrency),
+                "inprocess": InProcessInvoker(self.limiter, max_concurrency),
+                "process": self.processes,
+            }
+            self.metrics.collect(self.processes.render_metrics)
+        self.cache = ResponseCache(
+            int(environ.get("GATEWAY_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            int(environ.get("GATEWAY_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+        )
+        self.metrics.collect(self.cache.render_metrics)
+        self.coalescer = Coalescer()
+        self.metrics.collect(self.coalescer.render_metrics)
+        self.authorizer = CognitoAuthorizer(
+            int(
+                environ.get(
+                    "GATEWAY_AUTHORIZER_CACHE_MAX_ENTRIES", DEFAULT_AUTHORIZER_ENTRIES
+                )
+            )
+        )
+        self.metrics.collect(self.authorizer.render_metrics)
+        self.throttler = throttler()
+        self.metrics.collect(self.throttler.render_metrics)
+        self.access_log = AccessLog()
+        self.media_types = binary_media_types()
+        self.max_payload = max_payload_bytes()
+        minimum_size = minimum_compression_size()
+        self.compression = (
+            Compression(minimum_size) if minimum_size is not None else None
+        )
+        record = environ.get("GATEWAY_RECORD", "")
+        self.recorder = Recorder(record) if record != "" else None
+        self.dispatcher = EventDispatcher(
+            self.run,
+            int(environ.get("GATEWAY_EVENT_QUEUE_SIZE", DEFAULT_QUEUE_SIZE)),
+            int(environ.get("GATEWAY_EVENT_DISPATCHERS", DEFAULT_DISPATCHERS)),
+        )
+        self.metrics.collect(self.dispatcher.render_metrics)
+        interval = float(
+            environ.get("GATEWAY_ROUTES_RELOAD_INTERVAL", DEFAULT_RELOAD_INTERVAL)
+        )
+        self.watcher = (
+            RouteWatcher(
+                [path for path in routes_paths() if path != ""], self.reload, interval
+            )
+            if interval > 0
+            else None
+        )
+
+    def start(self) -> None:
+        """Start the background work."""
+        self.access_log.start()
+        if self.recorder is not None:
+            self.recorder.start()
+        if self.watcher is not None:
+            self.watcher.start()
+
+    def reload(self) -> None:
+        """Rebuild the route table from the route files and swap it in.
+
+        The table is built aside, so requests keep being routed by the old one
+        until the swap, and requests already routed finish on their old route.
+        An invalid file, or a routes file gone missing, is logged and ignored,
+        keeping the current routes. Worker pools of new or changed `process`
+        functions are spawned before the swap, and the pools they replace or
+        no longer routed are shut down after it.
+        """
+        try:
+            # Missing while being saved, or deleted: keep the current routes
+            route_table = read_routes(missing_ok=not self.routes_file_found)
+        except Exception as err:
+            logger.error("Ignoring the changed routes: %s", err)
+            self.metrics.route_reloads.inc(("rejected",))
+            return
+        if self.limiter is not None:
+            self.limiter.update(
+                function_limits(route_table), function_queues(route_table)
+            )
+        if self.processes is not None:
+            self.processes.spawn(route_table.routes)
+        self.route_table = route_table
+        if self.processes is not None:
+            self.processes.retire(route_table.routes)
+        # Once found, the routes file stays required
+        if not self.routes_file_found:
+            self.routes_file_found = exists(routes_paths()[0])
+        self.metrics.route_reloads.inc(("applied",))
+        logger.info("Reloaded %d routes", len(route_table.routes))
+
+    async def drain(self) -> None:
+        """Finish the queued event invocations, before closing."""
+        await self.dispatcher.stop()
+
+    def close(self) -> None:
+        """Release the integrations and flush the log."""
+        if self.watcher is not None:
+            self.watcher.stop()
+        for integration in self.integrations.values():
+            integration.close()
+        self.authorizer.close()
+        if self.recorder is not None:
+            self.recorder.stop()
+        self.access_log.stop()
+
+    def resolve(self, request: Request) -> tuple[Route, dict[str, str]]:
+        """Find the route of a request.
+
+        Raises:
+            HTTPException: If no route matches.
+        """
+        resolved = self.route_table.resolve(request.url.path)
+        if resolved is None:
+            raise HTTPException(status_code=404, detail="Not found")
+        methods, path_parameters = resolved
+        route = methods.get(request.method, methods.get("ANY"))
+        if route is None:
+            raise HTTPException(status_code=405, detail="Method not allowed")
+        return route, path_parameters
+
+    async def invoke(
+        self, request: Request, route: Route, path_parameters: dict[str, str]
+    ) -> Invocation:
+        """Answer the request, from the cache or the integration.
+
+        Requests are throttled, then authorized, so neither the cache nor the
+        lambda is reached above the limits or without a valid token.
+        """
+        self.throttler.check(route, request.method, request.headers.get("x-api-key"))
+        claims: dict[str, str] | None = None
+        if route.authorizer is not None:
+            claims = await self.authorizer.authorize(route.authorizer, request)
+        if route.validator is not None:
+            route.validator.validate_parameters(request, path_parameters)
+        key: str | None = None
+        if route.cache is not None and self.cache.cacheable(request):
+            key = self.cache.key(route.cache, route.resource, request)
+            cached = None if self.cache.invalidates(request) else self.cache.get(key)
+            if cached is not None:
+                return Invocation(cached)
+        raw_body = await read_body(request, self.max_payload)
+        body = raw_body
+        if self.compression is not None:
+            body = await self.compression.decompress(request, body, self.max_payload)
+        payload = await get_payload(
+            request, route, path_parameters, body, self.media_types
+        )
+        # The body is passed through as it is when it was not compressed
+        if body is not raw_body:
+            describe_inflated(cast(dict[str, Any], payload), len(body))
+        if claims is not None:
+            payload["requestContext"]["authorizer"] = {"claims": claims}
+        if route.validator is not None:
+            route.validator.validate_body(body, request.headers.get("content-type"))
+        started = perf_counter()
+        result = await self.call(request, route, payload)
+        integration_time = perf_counter() - started
+        response = lambda_response(result)
+        if key is not None and route.cache is not None:
+            self.cache.put(key, response, route.cache.ttl)
+        return Invocation(response, integration_time, len(body))
+
+    async def call(
+        self, request: Request, route: Route, payload: "APIGatewayProxyEventV1"
+    ) -> dict[str, Any]:
+        """Invoke the lambda, once for the identical requests of coalescing routes.
+
+        Event routes queue the invocation and answer 202 at once.
+        """
+        if route.invocation == "event":
+            return self.accept(route, payload)
+        if route.coalesce is None or not self.coalescer.coalescable(request):
+            return await self.run(route, payload)
+        return await self.coalescer.run(
+            self.coalescer.key(route.coalesce, request),
+            lambda: self.run(route, payload),
+        )
+
+    def accept(self, route: Route, payload: "APIGatewayProxyEventV1") -> dict[str, Any]:
+        """Queue an event invocation, answering like the Lambda API.
+
+        Raises:
+            TooManyRequestsException: If the event queue is full.
+        """
+        request_id = str(uuid4())
+        self.dispatcher.submit(request_id, route, payload)
+        return {
+            "statusCode": 202,
+            "headers": {"x-amzn-RequestId": request_id},
+            "body": None,
+        }
+
+    async def run(
+        self, route: Route, payload: "APIGatewayProxyEventV1"
+    ) -> dict[str, Any]:
+        """Invoke the lambda and record the invocation."""
+        started = perf_counter()
+        result = await run_lambda(route, payload, self.integrations[route.integration])
+        if self.recorder is not None:
+            self.recorder.record(
+                cast(dict[str, Any], payload), result, perf_counter() - started
+            )
+        return result
+
+    async def handle(self, request: Request) -> Response:
+        """Handle a request to any route."""
+        started = perf_counter()
+        route, path_parameters = self.resolve(request)
+        labels = (route.resource, route.lambda_name)
+        self.metrics.in_flight.inc(labels)
+        try:
+            invocation = await self.invoke(request, route, path_parameters)
+        except GatewayException as err:
+            invocation = Invocation(error_response(err))
+        except Exception as err:
+            logger.exception(err)
+            invocation = Invocation(Response(str(err), status_code=500))
+        finally:
+            self.metrics.in_flight.dec(labels)
+        if self.compression is not None:
+            invocation.response = await self.compression.compress(
+                request, invocation.response
+            )
+        self.observe(request, route, invocation, perf_counter() - started)
+        return invocation.response
+
+    def observe(
+        self, request: Request, route: Route, invocation: Invocation, total: float
+    ) -> None:
+        """Record the metrics and the access log of a request."""
+        labels = (route.resource, route.lambda_name)
+        status = invocation.response.status_code
+        response_bytes = len(invocation.response.body)
+        self.metrics.requests.inc(
+            (route.resource, request.method, route.lambda_name, str(status))
+        )
+        self.metrics.latency.observe(
+            (*labels, "gateway"), total - invocation.integration_time
+        )
+        if invocation.integration_time > 0:
+            self.metrics.latency.observe(
+                (*labels, "integration"), invocation.integration_time
+            )
+        self.metrics.request_bytes.observe(labels, invocation.request_bytes)
+        self.metrics.response_bytes.observe(labels, response_bytes)
+        self.access_log.log(
+            method=request.method,
+            path=request.url.path,
+            route=route.resource,
+            function=route.lambda_name,
+            status=status,
+            duration_ms=round(total * 1000, 3),
+            integration_ms=round(invocation.integration_time * 1000, 3),
+            request_bytes=invocation.request_bytes,
+            response_bytes=response_bytes,
+        )
+
+    async def render_metrics(self, _: Request) -> Response:
+        """The metrics endpoint"""
+        return Response(self.metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,149 @@
+"""In-process Lambda execution"""
+import sys
+from asyncio import get_running_loop
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from importlib import import_module
+from os import environ
+from os.path import abspath
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable, cast
+from uuid import uuid4
+from .invoker import ConcurrencyLimiter
+from .routing import Route
+
+DEFAULT_LAMBDAS_PATH: str = "./aws/lambdas"
+DEFAULT_TIMEOUT: int = 3
+DEFAULT_MEMORY: int = 128
+
+Handler = Callable[[dict[str, Any], "Context"], dict[str, Any]]
+
+
+def lambdas_directory(lambdas_path: str | None = None) -> str:
+    """Get the absolute directory of the handler modules."""
+    if lambdas_path is None:
+        lambdas_path = environ.get("LAMBDAS_PATH", DEFAULT_LAMBDAS_PATH)
+    return abspath(lambdas_path)
+
+
+class Context:
+    """Lambda context synthesized for in-process invocations."""
+
+    function_name: str
+    function_version: str
+    invoked_function_arn: str
+    memory_limit_in_mb: int
+    aws_request_id: str
+    log_group_name: str
+    log_stream_name: str
+    _deadline: float
+
+    def __init__(self, function_name: str, timeout: float, memory: int) -> None:
+        """Initialize the context.
+
+        Args:
+            function_name (str): The name of the Lambda.
+            timeout (float): The timeout of the Lambda, in seconds.
+            memory (int): The memory of the Lambda, in MB.
+        """
+        region = environ.get("AWS_DEFAULT_REGION", "us-east-1")
+        self.function_name = function_name
+        self.function_version = "$LATEST"
+        self.invoked_function_arn = (
+            f"arn:aws:lambda:{region}:000000000000:function:{function_name}"
+        )
+        self.memory_limit_in_mb = memory
+        self.aws_request_id = str(uuid4())
+        self.log_group_name = f"/aws/lambda/{function_name}"
+        self.log_stream_name = "inprocess"
+        self._deadline = monotonic() + timeout
+
+    def get_remaining_time_in_millis(self) -> int:
+        """Get the remaining execution time, in milliseconds."""
+        return max(0, int((self._deadline - monotonic()) * 1000))
+
+
+class InProcessInvoker:
+    """Run Lambda handlers inside the gateway process.
+
+    Handler modules are imported once from the lambdas directory and called from
+    a worker pool, so module-level state stays warm across invocations.
+    """
+
+    limiter: ConcurrencyLimiter
+    lambdas_path: str
+    _handlers: dict[str, Handler]
+    _lock: Lock
+    _executor: ThreadPoolExecutor
+
+    def __init__(
+        self,
+        limiter: ConcurrencyLimiter,
+        max_concurrency: int,
+        lambdas_path: str | None = None,
+    ) -> None:
+        """Initialize the invoker.
+
+        Args:
+            limiter (ConcurrencyLimiter): The concurrency limits to respect.
+            max_concurrency (int): The number of workers.
+            lambdas_path (str): The directory containing the handler modules.
+        """
+        self.limiter = limiter
+        self.lambdas_path = lambdas_directory(lambdas_path)
+        self._handlers = {}
+        self._lock = Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency,
+            thread_name_prefix="lambda-inprocess",
+        )
+
+    def handler(self, name: str) -> Handler:
+        """Import a handler, like `get_data.lambda_handler`, once.
+
+        Args:
+            name (str): The module and the function of the handler.
+
+        Returns:
+            Handler: The handler function.
+        """
+        with suppress(KeyError):
+            return self._handlers[name]
+        with self._lock:
+            if name not in self._handlers:
+                if self.lambdas_path not in sys.path:
+                    sys.path.insert(0, self.lambdas_path)
+                module, _, function = name.rpartition(".")
+                self._handlers[name] = cast(
+                    Handler, getattr(import_module(module), function)
+                )
+            return self._handlers[name]
+
+    def _invoke(self, route: Route, event: dict[str, Any]) -> dict[str, Any]:
+        """Call the handler synchronously."""
+        context = Context(
+            route.lambda_name,
+            float(route.options.get("timeout", DEFAULT_TIMEOUT)),
+            int(route.options.get("memory", DEFAULT_MEMORY)),
+        )
+        return self.handler(route.handler)(event, context)
+
+    async def invoke(self, route: Route, event: dict[str, Any]) -> dict[str, Any]:
+        """Call the handler of the route on the worker pool.
+
+        Args:
+            route (Route): The route.
+            event (dict[str, Any]): The event.
+
+        Returns:
+            dict[str, Any]: The response of the handler.
+        """
+        async with self.limiter.acquire(route.lambda_name):
+            return await get_running_loop().run_in_executor(
+                self._executor, self._invoke, route, event
+            )
+
+    def close(self) -> None:
+        """Release the worker threads."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,213 @@
+"""Non-blocking Lambda invocation"""
+from asyncio import Semaphore, get_running_loop
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, suppress
+from os import environ
+from typing import IO, Any, AsyncIterator, Protocol, cast
+from boto3 import client
+from botocore.config import Config
+from .codec import codec
+from .exceptions import TooManyRequestsException
+from .routing import Route
+
+with suppress(ImportError):
+    from boto3_type_annotations.lambda_.client import Client as LambdaClient
+
+DEFAULT_MAX_CONCURRENCY: int = 64
+# Requests over the reserved concurrency are throttled at once, as by Lambda
+DEFAULT_FUNCTION_QUEUE: int = 0
+# The `queue` of a route letting any number of requests wait
+UNBOUNDED_QUEUE: str = "unbounded"
+
+
+class _FunctionLimit:
+    """The reserved concurrency of a function."""
+
+    __slots__ = ("limit", "semaphore", "queue_size", "waiting")
+
+    limit: int
+    semaphore: Semaphore
+    queue_size: int | None
+    waiting: int
+
+    def __init__(self, limit: int, queue_size: int | None) -> None:
+        """Initialize the limit."""
+        self.limit = limit
+        self.semaphore = Semaphore(limit)
+        self.queue_size = queue_size
+        self.waiting = 0
+
+
+class ConcurrencyLimiter:
+    """Gateway-wide and per-function concurrency limits.
+
+    When the reserved concurrency of a function is exhausted, requests wait in
+    its queue, empty by default; once the queue is full they are throttled.
+    """
+
+    _gateway: Semaphore
+    _functions: dict[str, _FunctionLimit]
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        function_limits: dict[str, int],
+        function_queues: dict[str, int | None] | None = None,
+    ) -> None:
+        """Initialize the limiter.
+
+        Args:
+            max_concurrency (int): The maximum number of in-flight invocations.
+            function_limits (dict[str, int]): The limit for each function, if any.
+            function_queues (dict[str, int | None]): The number of requests that
+                can wait for each limited function, None for any number, and
+                `DEFAULT_FUNCTION_QUEUE` if missing.
+        """
+        self._gateway = Semaphore(max_concurrency)
+        self._functions = {}
+        self.update(function_limits, function_queues)
+
+    def update(
+        self,
+        function_limits: dict[str, int],
+        function_queues: dict[str, int | None] | None = None,
+    ) -> None:
+        """Replace the limits of the functions, as when the routes are reloaded.
+
+        Unchanged limits are kept, with their in-flight invocations; invocations
+        of changed limits finish under the old ones.
+
+        Args:
+            function_limits (dict[str, int]): The limit for each function, if any.
+            function_queues (dict[str, int | None]): The number of requests that
+                can wait for each limited function, None for any number, and
+                `DEFAULT_FUNCTION_QUEUE` if missing.
+        """
+        queues = function_queues or {}
+        functions: dict[str, _FunctionLimit] = {}
+        for name, limit in function_limits.items():
+            queue_size = queues.get(name, DEFAULT_FUNCTION_QUEUE)
+            current = self._functions.get(name)
+            if (
+                current is not None
+                and current.limit == limit
+                and current.queue_size == queue_size
+            ):
+                functions[name] = current
+            else:
+                functions[name] = _FunctionLimit(limit, queue_size)
+        self._functions = functions
+
+    @asynccontextmanager
+    async def acquire(self, function_name: str) -> AsyncIterator[None]:
+        """Hold a slot for the function and for the gateway.
+
+        Raises:
+            TooManyRequestsException: If the function queue is full.
+        """
+        function = self._functions.get(function_name)
+        if function is None:
+            async with self._gateway:
+                yield
+            return
+        if (
+            function.semaphore.locked()
+            and function.queue_size is not None
+            and function.waiting >= function.queue_size
+        ):
+            raise TooManyRequestsException()
+        function.waiting += 1
+        try:
+            await function.semaphore.acquire()
+        finally:
+            function.waiting -= 1
+        try:
+            async with self._gateway:
+                yield
+        finally:
+            function.semaphore.release()
+
+
+class Integration(Protocol):
+    """An integration running the lambda of a route."""
+
+    async def invoke(self, route: Route, event: dict[str, Any]) -> dict[str, Any]:
+        """Invoke the lambda of the route with the event and return its response."""
+
+    def close(self) -> None:
+        """Release the resources of the integration."""
+
+
+class LambdaInvoker:
+    """Invoke Lambdas through the Lambda API from a dedicated thread pool.
+
+    boto3 is synchronous, so every call runs on an executor sized to the
+    concurrency limit, sharing one client with a keep-alive connection pool.
+    """
+
+    client: "LambdaClient"
+    limiter: ConcurrencyLimiter
+    _executor: ThreadPoolExecutor
+
+    def __init__(self, limiter: ConcurrencyLimiter, max_concurrency: int) -> None:
+        """Initialize the invoker.
+
+        Args:
+            limiter (ConcurrencyLimiter): The concurrency limits to respect.
+            max_concurrency (int): The maximum number of in-flight invocations.
+        """
+        self.client = client(
+            "lambda",
+            region_name=environ.get("AWS_DEFAULT_REGION", None),
+            aws_access_key_id=environ.get("AWS_ACCESS_KEY_ID", None),
+            aws_secret_access_key=environ.get("AWS_SECRET_ACCESS_KEY", None),
+            endpoint_url=environ.get("AWS_ENDPOINT_URL", None),
+            config=Config(
+                max_pool_connections=max_concurrency,
+                tcp_keepalive=True,
+            ),
+        )
+        self.limiter = limiter
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency,
+            thread_name_prefix="lambda-invoke",
+        )
+
+    def _invoke(self, function_name: str, event: dict[str, Any]) -> dict[str, Any]:
+        """Invoke the function synchronously.
+
+        Function errors are returned as the `errorType` and `errorMessage`
+        payload of the Lambda API, even when the function returned no such
+        payload.
+        """
+        res = self.client.invoke(
+            FunctionName=function_name,
+            InvocationType="RequestResponse",
+            Payload=codec.dumps(event),
+        )
+        payload = codec.loads(cast(IO[bytes], res["Payload"]).read())
+        function_error = res.get("FunctionError")
+        if function_error is not None and not (
+            isinstance(payload, dict) and "errorMessage" in payload
+        ):
+            return {"errorType": function_error, "errorMessage": str(payload)}
+        return cast(dict[str, Any], payload)
+
+    async def invoke(self, route: Route, event: dict[str, Any]) -> dict[str, Any]:
+        """Invoke the lambda of the route without blocking the event loop.
+
+        Args:
+            route (Route): The route.
+            event (dict[str, Any]): The event.
+
+        Returns:
+            dict[str, Any]: The response of the lambda.
+        """
+        async with self.limiter.acquire(route.lambda_name):
+            return await get_running_loop().run_in_executor(
+                self._executor, self._invoke, route.lambda_name, event
+            )
+
+    def close(self) -> None:
+        """Release the worker threads."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,70 @@
+"""Structured, asynchronous and sampled access log"""
+from logging import INFO, Formatter, Logger, LogRecord, StreamHandler, getLogger
+from logging.handlers import QueueHandler, QueueListener
+from os import environ
+from queue import SimpleQueue
+from random import random
+from time import time
+from typing import Any
+from .codec import codec
+
+logger: Logger = getLogger("aws_api_gateway_local")
+if not logger.handlers:
+    logger.addHandler(StreamHandler())
+    logger.setLevel(INFO)
+
+
+class _JsonFormatter(Formatter):
+    """Format the access records as JSON lines."""
+
+    def format(self, record: LogRecord) -> str:
+        """Format the record."""
+        entry = getattr(record, "access", None)
+        if entry is None:
+            return super().format(record)
+        return codec.dumps(entry).decode("utf-8")
+
+
+class AccessLog:
+    """Access log written by a background thread.
+
+    Only a sample of the requests is logged, so the log costs close to nothing
+    on the hot path when load testing.
+    """
+
+    sample_rate: float
+    _logger: Logger
+    _listener: QueueListener
+
+    def __init__(self, sample_rate: float | None = None) -> None:
+        """Initialize the access log.
+
+        Args:
+            sample_rate (float): The fraction of the requests to log.
+        """
+        if sample_rate is None:
+            sample_rate = float(environ.get("GATEWAY_ACCESS_LOG_SAMPLE_RATE", "1"))
+        self.sample_rate = sample_rate
+        queue: "SimpleQueue[Any]" = SimpleQueue()
+        handler = StreamHandler()
+        handler.setFormatter(_JsonFormatter())
+        self._listener = QueueListener(queue, handler)
+        self._logger = getLogger("aws_api_gateway_local.access")
+        self._logger.setLevel(INFO)
+        self._logger.propagate = False
+        self._logger.handlers = [QueueHandler(queue)]
+
+    def start(self) -> None:
+        """Start writing the log."""
+        self._listener.start()
+
+    def stop(self) -> None:
+        """Flush and stop writing the log."""
+        self._listener.stop()
+
+    def log(self, **entry: Any) -> None:
+        """Log a request, if sampled."""
+        if self.sample_rate < 1 and random() >= self.sample_rate:
+            return
+        entry["time"] = time()
+        self._logger.info("", extra={"access": entry})
@@ -0,0 +1,211 @@
+"""Prometheus metrics"""
+from bisect import bisect_left
+from typing import Callable
+
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+SIZE_BUCKETS: tuple[float, ...] = (
+    128,
+    1024,
+    8 * 1024,
+    64 * 1024,
+    512 * 1024,
+    1024 * 1024,
+    6 * 1024 * 1024,
+    10 * 1024 * 1024,
+)
+
+Labels = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    """Escape a label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Labels, values: Labels, extra: str = "") -> str:
+    """Format the labels of a sample."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra != "":
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    """Format the value of a sample."""
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class Counter:
+    """A monotonically increasing value for each set of labels."""
+
+    name: str
+    help: str
+    label_names: Labels
+    _values: dict[Labels, float]
+
+    def __init__(self, name: str, description: str, label_names: Labels) -> None:
+        """Initialize the counter."""
+        self.name = name
+        self.help = description
+        self.label_names = label_names
+        self._values = {}
+
+    def inc(self, labels: Labels, value: float = 1) -> None:
+        """Increment the counter."""
+        self._values[labels] = self._values.get(labels, 0) + value
+
+    def render(self) -> list[str]:
+        """Render the counter in the text format."""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(
+                f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+            )
+        return lines
+
+
+class Gauge(Counter):
+    """A value that goes up and down for each set of labels."""
+
+    def dec(self, labels: Labels, value: float = 1) -> None:
+        """Decrement the gauge."""
+        self.inc(labels, -value)
+
+    def set(self, labels: Labels, value: float) -> None:
+        """Set the gauge."""
+        self._values[labels] = value
+
+    def render(self) -> list[str]:
+        """Render the gauge in the text format."""
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    """The distribution of observed values for each set of labels."""
+
+    name: str
+    help: str
+    label_names: Labels
+    buckets: tuple[float, ...]
+    _counts: dict[Labels, list[int]]
+    _sums: dict[Labels, float]
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label_names: Labels,
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        """Initialize the histogram."""
+        self.name = name
+        self.help = description
+        self.label_names = label_names
+        self.buckets = buckets
+        self._counts = {}
+        self._sums = {}
+
+    def observe(self, labels: Labels, value: float) -> None:
+        """Observe a value."""
+        counts = self._counts.get(labels)
+        if counts is None:
+            counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+            self._sums[labels] = 0.0
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[labels] += value
+
+    def render(self) -> list[str]:
+        """Render the histogram in the text format."""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, counts in self._counts.items():
+            total = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                total += count
+                bucket = "+Inf" if bound == float("inf") else _number(bound)
+                label_text = _labels(self.label_names, labels, f'le="{bucket}"')
+                lines.append(f"{self.name}_bucket{label_text} {total}")
+            label_text = _labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_text} {_number(self._sums[labels])}")
+            lines.append(f"{self.name}_count{label_text} {total}")
+        return lines
+
+
+class Metrics:
+    """The metrics of the gateway, by route and lambda."""
+
+    requests: Counter
+    latency: Histogram
+    in_flight: Gauge
+    request_bytes: Histogram
+    response_bytes: Histogram
+    route_reloads: Counter
+    _collectors: list[Callable[[], list[str]]]
+
+    def __init__(self) -> None:
+        """Initialize the metrics."""
+        self.requests = Counter(
+            "gateway_requests_total",
+            "Requests by route, lambda and status code.",
+            ("route", "method", "lambda", "status"),
+        )
+        self.latency = Histogram(
+            "gateway_request_duration_seconds",
+            "Request latency split in gateway overhead and integration latency.",
+            ("route", "lambda", "phase"),
+        )
+        self.in_flight = Gauge(
+            "gateway_requests_in_flight",
+            "Requests being handled.",
+            ("route", "lambda"),
+        )
+        self.request_bytes = Histogram(
+            "gateway_request_payload_bytes",
+            "Size of the request bodies.",
+            ("route", "lambda"),
+            SIZE_BUCKETS,
+        )
+        self.response_bytes = Histogram(
+            "gateway_response_payload_bytes",
+            "Size of the response bodies.",
+            ("route", "lambda"),
+            SIZE_BUCKETS,
+        )
+        self.route_reloads = Counter(
+            "gateway_route_reloads_total",
+            "Reloads of the route files, applied or rejected.",
+            ("result",),
+        )
+        self._collectors = []
+
+    def collect(self, collector: Callable[[], list[str]]) -> None:
+        """Add a function rendering more metrics when scraped."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Render all the metrics in the Prometheus text format."""
+        lines: list[str] = []
+        lines.extend(self.requests.render())
+        lines.extend(self.latency.render())
+        lines.extend(self.in_flight.render())
+        lines.extend(self.request_bytes.render())
+        lines.extend(self.response_bytes.render())
+        lines.extend(self.route_reloads.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
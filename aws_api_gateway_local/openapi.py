@@ -0,0 +1,166 @@
+"""Route definitions from an OpenAPI document"""
+from copy import deepcopy
+from json import loads
+from typing import Any
+from .logs import logger
+from .routing import HTTP_METHODS
+
+try:
+    import yaml
+except ImportError:  # The `yaml` extra
+    yaml = None
+
+# The header-based security schemes handled by the Cognito authorizer
+HEADER_SCHEMES: tuple[str, ...] = ("apiKey", "http", "oauth2", "openIdConnect")
+INTEGRATION_EXTENSION: str = "x-amazon-apigateway-integration"
+API_KEY_HEADER: str = "x-api-key"
+
+
+def read_document(path: str) -> dict[str, Any]:
+    """Read an OpenAPI document, in YAML if PyYAML is installed, or in JSON.
+
+    Raises:
+        RuntimeError: If the document is YAML and PyYAML is not installed.
+    """
+    with open(path, "r", encoding="utf-8") as handle:
+        text = handle.read()
+    if path.endswith(".json"):
+        return dict(loads(text))
+    if yaml is None:
+        raise RuntimeError(
+            "PyYAML is required to read YAML OpenAPI documents, see the yaml extra"
+        )
+    return dict(yaml.safe_load(text))
+
+
+def resolve_refs(
+    node: Any, document: dict[str, Any], seen: tuple[str, ...] = ()
+) -> Any:
+    """Replace the local `$ref`s of a node with what they point to.
+
+    Raises:
+        ValueError: If a reference is external or recursive.
+    """
+    if isinstance(node, list):
+        return [resolve_refs(item, document, seen) for item in node]
+    if not isinstance(node, dict):
+        return node
+    ref = node.get("$ref")
+    if ref is None:
+        return {key: resolve_refs(val, document, seen) for key, val in node.items()}
+    if not str(ref).startswith("#/"):
+        raise ValueError(f"Only local references are supported: {ref}")
+    if ref in seen:
+        raise ValueError(f"Recursive reference: {ref}")
+    target: Any = document
+    for part in str(ref)[2:].split("/"):
+        target = target[part.replace("~1", "/").replace("~0", "~")]
+    return resolve_refs(target, document, (*seen, ref))
+
+
+def _lambda_name(operation: dict[str, Any]) -> str | None:
+    """Get the lambda of an operation from its API Gateway integration."""
+    uri = str(operation.get(INTEGRATION_EXTENSION, {}).get("uri", ""))
+    # arn:aws:apigateway:{region}:lambda:path/2015-03-31/functions/{arn}/invocations
+    if ":function:" not in uri:
+        return None
+    return uri.split(":function:", 1)[1].split("/", 1)[0].split(":", 1)[0]
+
+
+def _security_schemes(
+    operation: dict[str, Any], document: dict[str, Any]
+) -> list[dict[str, Any]]:
+    """Get the security schemes required by an operation."""
+    schemes = document.get("components", {}).get("securitySchemes", {})
+    return [
+        schemes.get(name, {})
+        for requirement in operation.get("security", document.get("security", []))
+        for name in requirement
+    ]
+
+
+def _is_api_key(scheme: dict[str, Any]) -> bool:
+    """Whether a security scheme is the API Gateway API key."""
+    return (
+        scheme.get("type") == "apiKey"
+        and scheme.get("in") == "header"
+        and str(scheme.get("name", "")).lower() == API_KEY_HEADER
+    )
+
+
+def _authorizer(
+    operation: dict[str, Any], document: dict[str, Any]
+) -> dict[str, Any] | None:
+    """Get the authorizer of an operation from its security requirements."""
+    for scheme in _security_schemes(operation, document):
+        if scheme.get("type") not in HEADER_SCHEMES or _is_api_key(scheme):
+            continue
+        if scheme.get("type") == "apiKey" and scheme.get("in") != "header":
+            continue
+        return {"header": scheme.get("name", "Authorization")}
+    return None
+
+
+def _operation_routes(
+    path: str, method: str, operation: dict[str, Any], document: dict[str, Any]
+) -> dict[str, Any]:
+    """Get the route keys described by an operation."""
+    keys: dict[str, Any] = {
+        "request": {
+            "parameters": operation.get("parameters", []),
+            "requestBody": operation.get("requestBody"),
+        }
+    }
+    if any(_is_api_key(scheme) for scheme in _security_schemes(operation, document)):
+        keys["apiKeyRequired"] = True
+    authorizer = _authorizer(operation, document)
+    if authorizer is not None:
+        keys["authorizer"] = authorizer
+    lambda_name = _lambda_name(operation)
+    if lambda_name is not None:
+        keys["lambda"] = lambda_name
+    return {"path": path, "method": method, **keys}
+
+
+def openapi_routes(
+    document: dict[str, Any], mapping: list[dict[str, Any]]
+) -> list[dict[str, Any]]:
+    """Build route definitions from an OpenAPI document and an integration mapping.
+
+    Args:
+        document (dict[str, Any]): The OpenAPI document.
+        mapping (list[dict[str, Any]]): Route definitions as in routes.json,
+            giving the lambda and settings of operations. Their keys take
+            precedence over the document.
+
+    Returns:
+        list[dict[str, Any]]: One route definition per operation with a lambda.
+    """
+    mapped: dict[tuple[str, str], dict[str, Any]] = {}
+    for definition in mapping:
+        methods = definition["method"]
+        for method in methods if isinstance(methods, list) else [methods]:
+            path = "/" + str(definition["path"]).strip("/")
+            mapped[(str(method).upper(), path)] = definition
+    routes: list[dict[str, Any]] = []
+    for path, path_item in document.get("paths", {}).items():
+        resolved = resolve_refs(path_item, document)
+        shared = resolved.get("parameters", [])
+        for method, operation in resolved.items():
+            if method.upper() not in HTTP_METHODS:
+                continue
+            parameters = shared + operation.get("parameters", [])
+            route = _operation_routes(
+                path, method.upper(), {**operation, "parameters": parameters}, document
+            )
+            key = (method.upper(), "/" + path.strip("/"))
+            route.update(deepcopy(mapped.pop(key, {})))
+            route["method"] = method.upper()
+            if "lambda" not in route:
+                logger.warning("No lambda for %s %s, skipping it", *key)
+                continue
+            routes.append(route)
+    # Routes missing from the document are served without validation
+    for (method, _), definition in mapped.items():
+        routes.append({**definition, "method": method})
+    return routes
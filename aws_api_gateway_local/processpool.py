@@ -0,0 +1,247 @@
+"""Warm worker processes per Lambda"""
+import sys
+from asyncio import get_running_loop
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import suppress
+from importlib import import_module
+from json import dumps
+from multiprocessing import get_context
+from multiprocessing.queues import Queue
+from os import getpid
+from queue import Empty
+from time import perf_counter, time
+from typing import Any, cast
+from .inprocess import (
+    DEFAULT_MEMORY,
+    DEFAULT_TIMEOUT,
+    Context,
+    Handler,
+    lambdas_directory,
+)
+from .invoker import ConcurrencyLimiter
+from .logs import logger
+from .metrics import Gauge
+from .routing import Route
+
+SPAWN_TIMEOUT: float = 60.0
+# How often a spawn checks for workers that failed to start
+SPAWN_POLL_INTERVAL: float = 0.1
+
+# The handler imported by this worker process
+_worker: dict[str, Handler] = {}
+
+
+def _initialize(
+    lambdas_path: str,
+    handler: str,
+    function_name: str,
+    spawned_at: float,
+    cold_starts: "Queue[dict[str, Any]]",
+) -> None:
+    """Import the handler once when the worker starts."""
+    started_at = time()
+    start = perf_counter()
+    if lambdas_path not in sys.path:
+        sys.path.insert(0, lambdas_path)
+    module, _, function = handler.rpartition(".")
+    _worker["handler"] = cast(Handler, getattr(import_module(module), function))
+    cold_starts.put(
+        {
+            "function": function_name,
+            "pid": getpid(),
+            "spawn_ms": round((started_at - spawned_at) * 1000, 3),
+            "import_ms": round((perf_counter() - start) * 1000, 3),
+        }
+    )
+
+
+def _workers(route: Route) -> int:
+    """Get the number of workers of a process route."""
+    return int(route.options.get("workers", route.options.get("concurrency", 1)))
+
+
+def _invoke(
+    event: dict[str, Any], function_name: str, timeout: float, memory: int
+) -> dict[str, Any]:
+    """Call the handler of the worker."""
+    return _worker["handler"](event, Context(function_name, timeout, memory))
+
+
+class ProcessInvoker:
+    """Run Lambda handlers in pools of pre-spawned worker processes.
+
+    Each function gets its own pool, whose workers import the handler when
+    they start. Spawn and import times are recorded separately as cold starts.
+    """
+
+    limiter: ConcurrencyLimiter
+    lambdas_path: str
+    cold_starts: list[dict[str, Any]]
+    _cold_starts: "Queue[dict[str, Any]]"
+    _pools: dict[str, ProcessPoolExecutor]
+    _specs: dict[str, tuple[str, int]]
+    _retired: list[ProcessPoolExecutor]
+
+    def __init__(
+        self,
+        limiter: ConcurrencyLimiter,
+        routes: list[Route],
+        lambdas_path: str | None = None,
+    ) -> None:
+        """Spawn the workers of each function with a process route.
+
+        Args:
+            limiter (ConcurrencyLimiter): The concurrency limits to respect.
+            routes (list[Route]): The routes of the gateway.
+            lambdas_path (str): The directory containing the handler modules.
+        """
+        self.limiter = limiter
+        self.lambdas_path = lambdas_directory(lambdas_path)
+        self.cold_starts = []
+        self._cold_starts = get_context("spawn").Queue()
+        self._pools = {}
+        self._specs = {}
+        self._retired = []
+        self.spawn(routes)
+
+    def spawn(self, routes: list[Route]) -> None:
+        """Spawn the workers of each function with a new or changed process route.
+
+        Called again when the routes are reloaded: a function whose handler or
+        number of workers changed gets a new pool, and the pool it replaces is
+        shut down by `retire`. Waits up to `SPAWN_TIMEOUT` in all for the new
+        workers to import their handler.
+
+        Args:
+            routes (list[Route]): The routes of the gateway.
+        """
+        context = get_context("spawn")
+        spawned: dict[str, tuple[tuple[str, int], ProcessPoolExecutor]] = {}
+        started: dict[str, list["Future[int]"]] = {}
+        for route in routes:
+            if route.integration != "process" or route.lambda_name in spawned:
+                continue
+            spec = (route.handler, _workers(route))
+            if self._specs.get(route.lambda_name) == spec:
+                continue
+            pool = ProcessPoolExecutor(
+                max_workers=spec[1],
+                mp_context=context,
+                initializer=_initialize,
+                initargs=(
+                    self.lambdas_path,
+                    route.handler,
+                    route.lambda_name,
+                    time(),
+                    self._cold_starts,
+                ),
+            )
+            # Every submission made while no worker is idle spawns a new one
+            started[route.lambda_name] = [pool.submit(getpid) for _ in range(spec[1])]
+            spawned[route.lambda_name] = (spec, pool)
+        self._wait(started)
+        for name, (spec, pool) in spawned.items():
+            if name in self._pools:
+                self._retired.append(self._pools[name])
+            self._pools[name] = pool
+            self._specs[name] = spec
+
+    def _wait(self, started: dict[str, list["Future[int]"]]) -> None:
+        """Record the cold starts of the workers being spawned.
+
+        Returns once every worker reported, or once every submission is done
+        without more reports, as when the handler fails to import; late
+        reports are recorded with the metrics.
+
+        Args:
+            started (dict[str, list[Future[int]]]): The submissions that spawned
+                the workers of each function.
+        """
+        futures = [future for submitted in started.values() for future in submitted]
+        expected = len(futures)
+        deadline = perf_counter() + SPAWN_TIMEOUT
+        while expected > 0 and perf_counter() < deadline:
+            try:
+                self._record(self._cold_starts.get(timeout=SPAWN_POLL_INTERVAL))
+            except Empty:
+                if all(future.done() for future in futures):
+                    break
+                continue
+            expected -= 1
+        for name, submitted in started.items():
+            errors = [
+                future.exception()
+                for future in submitted
+                if future.done() and future.exception() is not None
+            ]
+            if errors:
+                logger.error("Workers of %s failed to start: %s", name, errors[0])
+
+    def _record(self, cold_start: dict[str, Any]) -> None:
+        """Record the cold start of a worker."""
+        self.cold_starts.append(cold_start)
+        logger.info("Cold start %s", dumps(cold_start))
+
+    def retire(self, routes: list[Route]) -> None:
+        """Shut down the replaced pools and those of functions no longer routed.
+
+        Called once the reloaded routes are swapped in; busy workers finish the
+        invocations already submitted before they exit.
+
+        Args:
+            routes (list[Route]): The routes of the gateway.
+        """
+        routed = {
+            route.lambda_name for route in routes if route.integration == "process"
+        }
+        for name in [name for name in self._pools if name not in routed]:
+            self._retired.append(self._pools.pop(name))
+            del self._specs[name]
+        for pool in self._retired:
+            pool.shutdown(wait=False)
+        self._retired = []
+
+    def render_metrics(self) -> list[str]:
+        """Render the cold starts in the Prometheus text format."""
+        gauge = Gauge(
+            "gateway_cold_start_seconds",
+            "Spawn and import time of the worker processes.",
+            ("lambda", "pid", "phase"),
+        )
+        with suppress(Empty):
+            while True:
+                self._record(self._cold_starts.get_nowait())
+        for cold_start in self.cold_starts:
+            for phase in ("spawn", "import"):
+                gauge.set(
+                    (cold_start["function"], str(cold_start["pid"]), phase),
+                    cold_start[f"{phase}_ms"] / 1000,
+                )
+        return gauge.render()
+
+    async def invoke(self, route: Route, event: dict[str, Any]) -> dict[str, Any]:
+        """Call the handler of the route on one of its workers.
+
+        Args:
+            route (Route): The route.
+            event (dict[str, Any]): The event.
+
+        Returns:
+            dict[str, Any]: The response of the handler.
+        """
+        async with self.limiter.acquire(route.lambda_name):
+            return await get_running_loop().run_in_executor(
+                self._pools[route.lambda_name],
+                _invoke,
+                event,
+                route.lambda_name,
+                float(route.options.get("timeout", DEFAULT_TIMEOUT)),
+                int(route.options.get("memory", DEFAULT_MEMORY)),
+            )
+
+    def close(self) -> None:
+        """Stop the workers."""
+        for pool in [*self._pools.values(), *self._retired]:
+            pool.shutdown(wait=False, cancel_futures=True)
+        self._cold_starts.close()
+        self._cold_starts.join_thread()
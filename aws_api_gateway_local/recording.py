@@ -0,0 +1,190 @@
+"""Record lambda invocations, and replay them without any backend"""
+import gzip
+from asyncio import sleep
+from glob import escape as glob_escape, glob
+from hashlib import sha256
+from itertools import cycle
+from os import environ, getpid
+from os.path import exists, splitext
+from queue import SimpleQueue
+from threading import Thread
+from time import time
+from typing import IO, Any, Iterator, cast
+from .codec import codec
+from .exceptions import GatewayException
+from .logs import logger
+from .routing import Route
+
+
+def _open(path: str, mode: str) -> IO[str]:
+    """Open a recording, compressed if its name ends with `.gz`."""
+    if path.endswith(".gz"):
+        return cast(IO[str], gzip.open(path, mode + "t", encoding="utf-8"))
+    return open(path, mode, encoding="utf-8")  # pylint: disable=consider-using-with
+
+
+def _split_recording(path: str) -> tuple[str, str]:
+    """Split a recording path in its stem and extension, like `.jsonl.gz`."""
+    compressed = path.endswith(".gz")
+    stem, extension = splitext(path[:-3] if compressed else path)
+    return stem, extension + (".gz" if compressed else "")
+
+
+def worker_recording(path: str) -> str:
+    """Get the recording file of this worker process.
+
+    With several workers (`GATEWAY_WORKERS`), each one appends to its own file,
+    named after its pid, as processes appending to one file interleave their
+    lines and corrupt gzip streams.
+    """
+    if int(environ.get("GATEWAY_WORKERS", "1")) <= 1:
+        return path
+    stem, extension = _split_recording(path)
+    return f"{stem}.{getpid()}{extension}"
+
+
+def recording_files(path: str) -> list[str]:
+    """Get the files of a recording: the file itself, and those of the workers."""
+    stem, extension = _split_recording(path)
+    files = [path] if exists(path) else []
+    for candidate in sorted(glob(f"{glob_escape(stem)}.*{extension}")):
+        pid = candidate[len(stem) + 1 : len(candidate) - len(extension)]
+        if pid.isdigit():
+            files.append(candidate)
+    return files
+
+
+def recording_key(event: dict[str, Any]) -> str:
+    """Build the key of an event from its method, path, query and body hash."""
+    query = event.get("multiValueQueryStringParameters") or {}
+    body = event.get("body") or ""
+    return "\n".join(
+        [
+            str(event.get("httpMethod", "")).upper(),
+            str(event.get("path", "")),
+            "&".join(
+                f"{key}={value}"
+                for key in sorted(query)
+                for value in sorted(query[key])
+            ),
+            sha256(body.encode("utf-8")).hexdigest(),
+        ]
+    )
+
+
+class Recorder:
+    """Append invocations to a JSONL file, gzip compressed if it ends with `.gz`.
+
+    Lines are written by a background thread, off the event loop.
+    """
+
+    path: str
+    _queue: "SimpleQueue[dict[str, Any] | None]"
+    _thread: Thread
+
+    def __init__(self, path: str) -> None:
+        """Initialize the recorder.
+
+        Args:
+            path (str): The recording file.
+        """
+        self.path = worker_recording(path)
+        self._queue = SimpleQueue()
+        self._thread = Thread(target=self._write, name="recorder", daemon=True)
+
+    def start(self) -> None:
+        """Start writing."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Write what is left and close the file."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def record(
+        self, event: dict[str, Any], response: dict[str, Any], latency: float
+    ) -> None:
+        """Record an invocation.
+
+        Args:
+            event (dict[str, Any]): The event sent to the lambda.
+            response (dict[str, Any]): The response of the lambda.
+            latency (float): The integration latency, in seconds.
+        """
+        self._queue.put(
+            {
+                "key": recording_key(event),
+                "time": time(),
+                "latency": latency,
+                "event": event,
+                "response": response,
+            }
+        )
+
+    def _write(self) -> None:
+        """Write the records until stopped."""
+        with _open(self.path, "a") as handle:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    return
+                handle.write(codec.dumps(record).decode("utf-8") + "\n")
+                if self._queue.empty():
+                    handle.flush()
+
+
+def read_recording(path: str) -> Iterator[dict[str, Any]]:
+    """Read the records of a file, stopping at a truncated end."""
+    with _open(path, "r") as handle:
+        try:
+            for line in handle:
+                if line.strip() != "":
+                    yield codec.loads(line)
+        except (EOFError, ValueError) as err:
+            logger.warning("Recording %s ends early: %s", path, err)
+
+
+class Replayer:
+    """Serve recorded responses instead of invoking any lambda.
+
+    Responses recorded for the same key are served in turn.
+    """
+
+    reproduce_latency: bool
+    _index: dict[str, "Iterator[tuple[dict[str, Any], float]]"]
+
+    def __init__(self, path: str, reproduce_latency: bool = False) -> None:
+        """Index a recording, with the files of every worker that recorded it.
+
+        Args:
+            path (str): The recording file.
+            reproduce_latency (bool): Whether to wait as long as the recorded
+                invocations took.
+        """
+        self.reproduce_latency = reproduce_latency
+        recorded: dict[str, list[tuple[dict[str, Any], float]]] = {}
+        records = (
+            record for name in recording_files(path) for record in read_recording(name)
+        )
+        for record in records:
+            recorded.setdefault(record["key"], []).append(
+                (record["response"], float(record["latency"]))
+            )
+        self._index = {key: cycle(values) for key, values in recorded.items()}
+
+    async def invoke(self, route: Route, event: dict[str, Any]) -> dict[str, Any]:
+        """Answer with the recorded response of the event.
+
+        Raises:
+            GatewayException: If nothing was recorded for the event.
+        """
+        responses = self._index.get(recording_key(event))
+        if responses is None:
+            raise GatewayException("No recorded response", 502, "ReplayMissException")
+        response, latency = next(responses)
+        if self.reproduce_latency:
+            await sleep(latency)
+        return response
+
+    def close(self) -> None:
+        """Nothing to release."""
@@ -0,0 +1,76 @@
+"""Watch the route files and reload them when they change"""
+from os import stat
+from threading import Event, Thread
+from typing import Callable
+from .logs import logger
+
+DEFAULT_INTERVAL: float = 1.0
+
+# The modification time and size of a file, None if it does not exist
+Signature = tuple[int, int] | None
+
+
+def signature(path: str) -> Signature:
+    """Get what identifies a version of a file."""
+    try:
+        status = stat(path)
+    except OSError:
+        return None
+    return (status.st_mtime_ns, status.st_size)
+
+
+class RouteWatcher:
+    """Poll files from a background thread, calling back when one changes.
+
+    Polling costs one `stat` per file and interval, and works the same on
+    every platform and on files mounted in containers.
+    """
+
+    paths: list[str]
+    interval: float
+    _reload: Callable[[], None]
+    _signatures: list[Signature]
+    _stopped: Event
+    _thread: Thread
+
+    def __init__(
+        self,
+        paths: list[str],
+        reload: Callable[[], None],
+        interval: float = DEFAULT_INTERVAL,
+    ) -> None:
+        """Initialize the watcher.
+
+        Args:
+            paths (list[str]): The files to watch.
+            reload (Callable[[], None]): Called from the thread when a file changes.
+            interval (float): The polling interval, in seconds.
+        """
+        self.paths = paths
+        self.interval = interval
+        self._reload = reload
+        self._signatures = [signature(path) for path in paths]
+        self._stopped = Event()
+        self._thread = Thread(target=self._watch, name="route-watcher", daemon=True)
+
+    def start(self) -> None:
+        """Start watching."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop watching."""
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _watch(self) -> None:
+        """Poll the files until stopped."""
+        while not self._stopped.wait(self.interval):
+            signatures = [signature(path) for path in self.paths]
+            if signatures == self._signatures:
+                continue
+            self._signatures = signatures
+            try:
+                self._reload()
+            except Exception as err:  # pylint: disable=broad-except
+                logger.exception(err)
@@ -0,0 +1,235 @@
+"""Route table compiled from routes.json"""
+from typing import Any
+from .authorizer import AuthorizerPolicy
+from .cache import CachePolicy
+from .coalescing import CoalescePolicy
+from .throttling import ThrottlePolicy
+from .validation import RequestValidator
+
+HTTP_METHODS: list[str] = ["GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"]
+INTEGRATIONS: tuple[str, ...] = ("lambda", "inprocess", "process")
+INVOCATION_TYPES: tuple[str, ...] = ("request", "event")
+
+
+class Route:
+    """A route of the gateway."""
+
+    resource: str
+    methods: list[str]
+    lambda_name: str
+    integration: str
+    invocation: str
+    handler: str
+    cache: CachePolicy | None
+    coalesce: CoalescePolicy | None
+    authorizer: AuthorizerPolicy | None
+    validator: RequestValidator | None
+    throttle: ThrottlePolicy | None
+    api_key_required: bool
+    options: dict[str, Any]
+
+    def __init__(self, definition: dict[str, Any]) -> None:
+        """Initialize the route from its routes.json definition.
+
+        Args:
+            definition (dict[str, Any]): The route as defined in routes.json.
+        """
+        method = definition["method"]
+        self.resource = "/" + str(definition["path"]).strip("/")
+        self.methods = [
+            str(val).strip().upper()
+            for val in (method if isinstance(method, list) else [method])
+        ]
+        self.lambda_name = str(definition["lambda"])
+        self.integration = str(definition.get("integration", "lambda"))
+        if self.integration not in INTEGRATIONS:
+            raise ValueError(f"Unknown integration: {self.integration}")
+        self.invocation = str(definition.get("invocation", "request")).lower()
+        if self.invocation not in INVOCATION_TYPES:
+            raise ValueError(f"Unknown invocation type: {self.invocation}")
+        self.handler = str(
+            definition.get("handler", f"{self.lambda_name}.lambda_handler")
+        )
+        self.authorizer = (
+            AuthorizerPolicy(definition["authorizer"])
+            if definition.get("authorizer")
+            else None
+        )
+        self.cache = (
+            CachePolicy(
+                definition["cache"],
+                self.authorizer.header if self.authorizer is not None else None,
+            )
+            if "cache" in definition
+            else None
+        )
+        self.coalesce = (
+            CoalescePolicy(definition["coalesce"])
+            if definition.get("coalesce")
+            else None
+        )
+        self.validator = (
+            RequestValidator(definition["request"]) if "request" in definition else None
+        )
+        self.throttle = (
+            ThrottlePolicy(definition["throttle"]) if "throttle" in definition else None
+        )
+        self.api_key_required = bool(definition.get("apiKeyRequired", False))
+        self.options = definition
+
+    def __repr__(self) -> str:
+        """Represent the route."""
+        return f"Route({self.methods} {self.resource} -> {self.lambda_name})"
+
+
+class _Node:
+    """A node of the route trie, one per path segment."""
+
+    __slots__ = ("static", "param", "param_name", "greedy_name", "greedy", "methods")
+
+    static: dict[str, "_Node"]
+    param: "_Node | None"
+    param_name: str
+    greedy: "dict[str, Route] | None"
+    greedy_name: str
+    methods: dict[str, Route]
+
+    def __init__(self) -> None:
+        """Initialize the node."""
+        self.static = {}
+        self.param = None
+        self.param_name = ""
+        self.greedy = None
+        self.greedy_name = ""
+        self.methods = {}
+
+
+def _segments(path: str) -> list[str]:
+    """Split a path in its segments."""
+    return [segment for segment in path.split("/") if segment != ""]
+
+
+class RouteTable:
+    """Route table matching requests in time proportional to the path depth.
+
+    Supports API Gateway templates: static segments, `{param}` segments and a
+    trailing greedy `{proxy+}` segment. Static segments take precedence over
+    parameters, and parameters over greedy segments.
+    """
+
+    routes: list[Route]
+    _root: _Node
+
+    def __init__(self, definitions: list[dict[str, Any]]) -> None:
+        """Build the table.
+
+        Args:
+            definitions (list[dict[str, Any]]): The routes as defined in routes.json.
+
+        Raises:
+            ValueError: If a route template is invalid or conflicts with another.
+        """
+        self.routes = []
+        self._root = _Node()
+        for definition in definitions:
+            self.add(Route(definition))
+
+    @staticmethod
+    def _param_node(node: _Node, name: str, resource: str) -> _Node:
+        """Get the parameter child of a node, creating it if needed."""
+        if node.param is not None and node.param_name != name:
+            raise ValueError(f"Conflicting parameter name: {resource}")
+        if node.param is None:
+            node.param = _Node()
+        node.param_name = name
+        return node.param
+
+    @staticmethod
+    def _greedy_methods(node: _Node, name: str, resource: str) -> dict[str, Route]:
+        """Get the greedy methods of a node, creating them if needed."""
+        if node.greedy is not None and node.greedy_name != name:
+            raise ValueError(f"Conflicting parameter name: {resource}")
+        if node.greedy is None:
+            node.greedy = {}
+        node.greedy_name = name
+        return node.greedy
+
+    def add(self, route: Route) -> None:
+        """Add a route to the table."""
+        node = self._root
+        segments = _segments(route.resource)
+        target: dict[str, Route]
+        for i, segment in enumerate(segments):
+            if segment.startswith("{") and segment.endswith("+}"):
+                if i != len(segments) - 1:
+                    raise ValueError(f"Greedy parameter must be last: {route.resource}")
+                target = self._greedy_methods(node, segment[1:-2], route.resource)
+                break
+            if segment.startswith("{") and segment.endswith("}"):
+                node = self._param_node(node, segment[1:-1], route.resource)
+            else:
+                node = node.static.setdefault(segment, _Node())
+        else:
+            target = node.methods
+        for method in route.methods:
+            if method in target:
+                raise ValueError(f"Duplicate route: {method} {route.resource}")
+            target[method] = route
+        self.routes.append(route)
+
+    def _find(
+        self, node: _Node, segments: list[str], index: int, params: dict[str, str]
+    ) -> dict[str, Route] | None:
+        """Find the methods of the most specific template matching the segments."""
+        if index == len(segments):
+            return node.methods if node.methods else None
+        segment = segments[index]
+        child = node.static.get(segment)
+        if child is not None:
+            found = self._find(child, segments, index + 1, params)
+            if found is not None:
+                return found
+        if node.param is not None:
+            found = self._find(node.param, segments, index + 1, params)
+            if found is not None:
+                params[node.param_name] = segment
+                return found
+        if node.greedy is not None:
+            params[node.greedy_name] = "/".join(segments[index:])
+            return node.greedy
+        return None
+
+    def resolve(self, path: str) -> tuple[dict[str, Route], dict[str, str]] | None:
+        """Find the routes for a path.
+
+        Args:
+            path (str): The request path.
+
+        Returns:
+            tuple[dict[str, Route], dict[str, str]] | None: The routes by method
+                and the path parameters, or None if no template matches.
+        """
+        params: dict[str, str] = {}
+        found = self._find(self._root, _segments(path), 0, params)
+        if found is None:
+            return None
+        return found, params
+
+    def match(self, method: str, path: str) -> tuple[Route, dict[str, str]] | None:
+        """Match a request.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The request path.
+
+        Returns:
+            tuple[Route, dict[str, str]] | None: The route and the path parameters.
+        """
+        resolved = self.resolve(path)
+        if resolved is None:
+            return None
+        methods, params = resolved
+        route = methods.get(method.upper(), methods.get("ANY"))
+        if route is None:
+            return None
+        return route, params
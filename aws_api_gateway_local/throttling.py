@@ -0,0 +1,337 @@
+"""API Gateway style throttling, with token buckets and usage plans"""
+from datetime import datetime, timezone
+from json import loads
+from time import monotonic
+from typing import TYPE_CHECKING, Any
+from .exceptions import GatewayException, TooManyRequestsException
+from .metrics import Counter
+
+if TYPE_CHECKING:
+    from .routing import Route
+
+CLEANUP_INTERVAL: float = 60.0
+QUOTA_PERIODS: tuple[str, ...] = ("DAY", "WEEK", "MONTH")
+THROTTLE_REASONS: tuple[str, ...] = ("stage", "route", "key", "quota")
+
+
+class ForbiddenException(GatewayException):
+    """The route needs an API key, and the request has none or an unknown one."""
+
+    def __init__(self, message: str = "Forbidden") -> None:
+        """Initialize the exception."""
+        super().__init__(message, 403, "ForbiddenException")
+
+
+class ThrottlePolicy:
+    """A steady request rate, with bursts above it."""
+
+    rate: float
+    burst: int
+
+    def __init__(self, settings: dict[str, Any]) -> None:
+        """Initialize the policy from a `throttle` setting.
+
+        Args:
+            settings (dict[str, Any]): The `rate` in requests per second, and
+                the `burst` of requests allowed at once (default the rate).
+
+        Raises:
+            ValueError: If the rate or the burst is not positive.
+        """
+        self.rate = float(settings["rate"])
+        self.burst = int(settings.get("burst", max(1, round(self.rate))))
+        if self.rate <= 0 or self.burst <= 0:
+            raise ValueError(f"Invalid throttle: {settings}")
+
+
+class QuotaPolicy:
+    """A number of requests per calendar period, in UTC."""
+
+    limit: int
+    period: str
+
+    def __init__(self, settings: dict[str, Any]) -> None:
+        """Initialize the policy from a `quota` setting.
+
+        Args:
+            settings (dict[str, Any]): The `limit` of requests per `period`,
+                `DAY`, `WEEK` or `MONTH`.
+
+        Raises:
+            ValueError: If the period is unknown.
+        """
+        self.limit = int(settings["limit"])
+        self.period = str(settings.get("period", "DAY")).upper()
+        if self.period not in QUOTA_PERIODS:
+            raise ValueError(f"Unknown quota period: {self.period}")
+
+    def current_period(self, now: datetime) -> str:
+        """Identify the period of a time."""
+        if self.period == "DAY":
+            return now.strftime("%Y-%m-%d")
+        if self.period == "WEEK":
+            year, week, _ = now.isocalendar()
+            return f"{year}-W{week}"
+        return now.strftime("%Y-%m")
+
+
+class UsagePlan:
+    """The throttle and quota of a set of API keys."""
+
+    name: str
+    throttle: ThrottlePolicy | None
+    quota: QuotaPolicy | None
+
+    def __init__(self, settings: dict[str, Any]) -> None:
+        """Initialize the plan.
+
+        Args:
+            settings (dict[str, Any]): The `name` of the plan, and optionally
+                its `throttle` and `quota`.
+        """
+        self.name = str(settings.get("name", ""))
+        self.throttle = (
+            ThrottlePolicy(settings["throttle"]) if "throttle" in settings else None
+        )
+        self.quota = QuotaPolicy(settings["quota"]) if "quota" in settings else None
+
+
+def read_usage_plans(path: str) -> dict[str, UsagePlan]:
+    """Read the usage plans, by API key.
+
+    Args:
+        path (str): A JSON list of plans, each with its `keys`.
+
+    Returns:
+        dict[str, UsagePlan]: The plan of each API key.
+
+    Raises:
+        ValueError: If a key belongs to several plans.
+    """
+    with open(path, "r", encoding="utf-8") as handle:
+        definitions: list[dict[str, Any]] = loads(handle.read())
+    plans: dict[str, UsagePlan] = {}
+    for definition in definitions:
+        plan = UsagePlan(definition)
+        for key in definition.get("keys", []):
+            if key in plans:
+                raise ValueError(f"API key in several usage plans: {key}")
+            plans[str(key)] = plan
+    return plans
+
+
+class TokenBucket:
+    """Tokens refilled at a steady rate up to the burst, one per request.
+
+    The bucket is refilled lazily when a token is taken, so its state is two
+    numbers and needs no timer.
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    rate: float
+    burst: int
+    tokens: float
+    updated: float
+
+    def __init__(self, policy: ThrottlePolicy, now: float) -> None:
+        """Initialize a full bucket."""
+        self.rate = policy.rate
+        self.burst = policy.burst
+        self.tokens = float(policy.burst)
+        self.updated = now
+
+    def follows(self, policy: ThrottlePolicy) -> bool:
+        """Whether the bucket was built from this policy."""
+        return self.rate == policy.rate and self.burst == policy.burst
+
+    def _refill(self, now: float) -> None:
+        """Add the tokens earned since the last update."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self, now: float) -> bool:
+        """Whether there is a token to take."""
+        self._refill(now)
+        return self.tokens >= 1
+
+    def take(self, now: float) -> bool:
+        """Take a token, if there is one."""
+        if not self.available(now):
+            return False
+        self.tokens -= 1
+        return True
+
+    def idle(self, now: float) -> bool:
+        """Whether the bucket is full again, so forgetting it changes nothing."""
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+class _Usage:
+    """The requests of an API key in the current quota period."""
+
+    __slots__ = ("period", "used")
+
+    period: str
+    used: int
+
+    def __init__(self, period: str) -> None:
+        """Start a period."""
+        self.period = period
+        self.used = 0
+
+
+class Throttler:
+    """Throttle requests stage-wide, per route and per API key, and count quotas.
+
+    Buckets are created on first use and forgotten once full again, and usages
+    once their period is over, so memory follows the active keys only.
+    They live in the memory of the process: each gateway worker throttles and
+    counts its own requests.
+    """
+
+    stage: TokenBucket | None
+    plans: dict[str, UsagePlan]
+    throttled: dict[str, int]
+    _routes: dict[tuple[str, str], TokenBucket]
+    _keys: dict[str, TokenBucket]
+    _usages: dict[str, _Usage]
+    _cleaned: float
+
+    def __init__(
+        self,
+        stage: ThrottlePolicy | None = None,
+        plans: dict[str, UsagePlan] | None = None,
+    ) -> None:
+        """Initialize the throttler.
+
+        Args:
+            stage (ThrottlePolicy): The throttle of the whole gateway, if any.
+            plans (dict[str, UsagePlan]): The usage plan of each API key.
+        """
+        now = monotonic()
+        self.stage = TokenBucket(stage, now) if stage is not None else None
+        self.plans = plans or {}
+        self.throttled = {reason: 0 for reason in THROTTLE_REASONS}
+        self._routes = {}
+        self._keys = {}
+        self._usages = {}
+        self._cleaned = now
+
+    @staticmethod
+    def _bucket(
+        buckets: dict[Any, TokenBucket], key: Any, policy: ThrottlePolicy, now: float
+    ) -> TokenBucket:
+        """Get the bucket of a key, new if its policy changed."""
+        bucket = buckets.get(key)
+        if bucket is None or not bucket.follows(policy):
+            bucket = buckets[key] = TokenBucket(policy, now)
+        return bucket
+
+    def _reject(self, reason: str, message: str = "Too Many Requests") -> None:
+        """Count a throttled request.
+
+        Raises:
+            TooManyRequestsException: Always.
+        """
+        self.throttled[reason] += 1
+        raise TooManyRequestsException(message)
+
+    def _usage(self, api_key: str, quota: QuotaPolicy) -> _Usage:
+        """Get the usage of a key in the current period of its quota.
+
+        Raises:
+            TooManyRequestsException: If the quota is exhausted.
+        """
+        period = quota.current_period(datetime.now(timezone.utc))
+        usage = self._usages.get(api_key)
+        if usage is None or usage.period != period:
+            usage = self._usages[api_key] = _Usage(period)
+        if usage.used >= quota.limit:
+            self._reject("quota", "Limit Exceeded")
+        return usage
+
+    def _buckets(
+        self, route: "Route", method: str, api_key: str | None, now: float
+    ) -> list[tuple[str, TokenBucket]]:
+        """Get the buckets of a request, by throttle reason."""
+        buckets: list[tuple[str, TokenBucket]] = []
+        plan = self.plans.get(api_key) if api_key is not None else None
+        if api_key is not None and plan is not None and plan.throttle is not None:
+            buckets.append(
+                ("key", self._bucket(self._keys, api_key, plan.throttle, now))
+            )
+        if route.throttle is not None:
+            key = (method, route.resource)
+            buckets.append(
+                ("route", self._bucket(self._routes, key, route.throttle, now))
+            )
+        if self.stage is not None:
+            buckets.append(("stage", self.stage))
+        return buckets
+
+    def check(self, route: "Route", method: str, api_key: str | None) -> None:
+        """Let a request through, or throttle it.
+
+        Every limit is checked before any token is taken, so a throttled
+        request costs nothing to the other buckets or the quota.
+
+        Args:
+            route (Route): The route of the request.
+            method (str): The HTTP method of the request.
+            api_key (str | None): The `x-api-key` of the request.
+
+        Raises:
+            ForbiddenException: If the route needs a known API key.
+            TooManyRequestsException: If a bucket is empty or the quota is spent.
+        """
+        plan = self.plans.get(api_key) if api_key is not None else None
+        if route.api_key_required and plan is None:
+            raise ForbiddenException()
+        now = monotonic()
+        if now - self._cleaned >= CLEANUP_INTERVAL:
+            self.cleanup(now)
+        buckets = self._buckets(route, method, api_key, now)
+        for reason, bucket in buckets:
+            if not bucket.available(now):
+                self._reject(reason)
+        usage: _Usage | None = None
+        if api_key is not None and plan is not None and plan.quota is not None:
+            usage = self._usage(api_key, plan.quota)
+        for _, bucket in buckets:
+            bucket.take(now)
+        if usage is not None:
+            usage.used += 1
+
+    @staticmethod
+    def _forget_idle(buckets: dict[Any, TokenBucket], now: float) -> None:
+        """Forget the buckets that are full again."""
+        for key in [key for key, bucket in buckets.items() if bucket.idle(now)]:
+            del buckets[key]
+
+    def cleanup(self, now: float) -> None:
+        """Forget the full buckets and the usages of past periods."""
+        self._cleaned = now
+        self._forget_idle(self._routes, now)
+        self._forget_idle(self._keys, now)
+        utc_now = datetime.now(timezone.utc)
+        for api_key in list(self._usages):
+            plan = self.plans.get(api_key)
+            usage = self._usages[api_key]
+            if (
+                plan is None
+                or plan.quota is None
+                or usage.period != plan.quota.current_period(utc_now)
+            ):
+                del self._usages[api_key]
+
+    def render_metrics(self) -> list[str]:
+        """Render the throttled requests in the Prometheus text format."""
+        counter = Counter(
+            "gateway_throttled_requests_total",
+            "Requests answered 429 before the lambda, by limit.",
+            ("reason",),
+        )
+        for reason, value in self.throttled.items():
+            counter.inc((reason,), value)
+        return counter.render()
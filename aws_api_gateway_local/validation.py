@@ -0,0 +1,331 @@
+"""Request validation, compiled once from OpenAPI schemas"""
+import re
+from typing import Any, Callable
+from fastapi import Request
+from .codec import codec
+from .exceptions import GatewayException
+
+# Validate a value at a location, returning the error or None
+Check = Callable[[Any, str], str | None]
+
+JSON_TYPES: dict[str, tuple[type, ...]] = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "array": (list,),
+    "object": (dict,),
+}
+TRUE_VALUES: tuple[str, ...] = ("true", "1")
+FALSE_VALUES: tuple[str, ...] = ("false", "0")
+
+
+class BadRequestException(GatewayException):
+    """The request does not match its model."""
+
+    def __init__(self, message: str = "Invalid request body") -> None:
+        """Initialize the exception."""
+        super().__init__(message, 400, "BadRequestException")
+
+
+def _all(checks: list[Check]) -> Check:
+    """Combine checks, stopping at the first error."""
+
+    def check(value: Any, where: str) -> str | None:
+        for item in checks:
+            error = item(value, where)
+            if error is not None:
+                return error
+        return None
+
+    return check
+
+
+def _type_check(name: str) -> Check:
+    """Check the JSON type of a value."""
+    types = JSON_TYPES[name]
+
+    def check(value: Any, where: str) -> str | None:
+        # bool is an int in Python, but not in JSON
+        if isinstance(value, bool) and name != "boolean":
+            return f"{where} must be {name}"
+        if not isinstance(value, types):
+            return f"{where} must be {name}"
+        if name == "integer" and isinstance(value, float):
+            return f"{where} must be integer"
+        return None
+
+    return check
+
+
+def _bound(
+    key: str, limit: float, measure: Callable[[Any], float], above: bool
+) -> Check:
+    """Check that a measure of a value is within a limit."""
+
+    def check(value: Any, where: str) -> str | None:
+        if above and measure(value) < limit:
+            return f"{where} is below {key} {limit}"
+        if not above and measure(value) > limit:
+            return f"{where} is above {key} {limit}"
+        return None
+
+    return check
+
+
+def _string_checks(schema: dict[str, Any]) -> list[Check]:
+    """Compile the string keywords."""
+    checks: list[Check] = []
+    if "minLength" in schema:
+        checks.append(_bound("minLength", schema["minLength"], len, True))
+    if "maxLength" in schema:
+        checks.append(_bound("maxLength", schema["maxLength"], len, False))
+    if "pattern" in schema:
+        pattern = re.compile(schema["pattern"])
+
+        def check(value: Any, where: str) -> str | None:
+            if pattern.search(value) is None:
+                return f"{where} does not match {pattern.pattern}"
+            return None
+
+        checks.append(check)
+    return checks
+
+
+def _number_checks(schema: dict[str, Any]) -> list[Check]:
+    """Compile the number keywords, with OpenAPI 3.0 boolean exclusive bounds."""
+    checks: list[Check] = []
+    for key, above in (("minimum", True), ("maximum", False)):
+        if key not in schema:
+            continue
+        limit = float(schema[key])
+        exclusive = schema.get("exclusiveMinimum" if above else "exclusiveMaximum")
+        if exclusive is True:
+
+            def check(
+                value: Any, where: str, limit: float = limit, above: bool = above
+            ) -> str | None:
+                if (value <= limit) if above else (value >= limit):
+                    return f"{where} must be {'above' if above else 'below'} {limit}"
+                return None
+
+            checks.append(check)
+        else:
+            checks.append(_bound(key, limit, float, above))
+    return checks
+
+
+def _array_checks(schema: dict[str, Any]) -> list[Check]:
+    """Compile the array keywords."""
+    checks: list[Check] = []
+    if "minItems" in schema:
+        checks.append(_bound("minItems", schema["minItems"], len, True))
+    if "maxItems" in schema:
+        checks.append(_bound("maxItems", schema["maxItems"], len, False))
+    if "items" in schema:
+        items = compile_schema(schema["items"])
+
+        def check(value: Any, where: str) -> str | None:
+            for index, item in enumerate(value):
+                error = items(item, f"{where}[{index}]")
+                if error is not None:
+                    return error
+            return None
+
+        checks.append(check)
+    return checks
+
+
+def _object_checks(schema: dict[str, Any]) -> list[Check]:
+    """Compile the object keywords."""
+    properties = {
+        name: compile_schema(value)
+        for name, value in schema.get("properties", {}).items()
+    }
+    required: list[str] = list(schema.get("required", []))
+    additional = schema.get("additionalProperties", True)
+    extra = compile_schema(additional) if isinstance(additional, dict) else None
+
+    def check(value: Any, where: str) -> str | None:
+        for name in required:
+            if name not in value:
+                return f"{where}.{name} is required"
+        for name, item in value.items():
+            check_item = properties.get(name, extra)
+            if check_item is None and additional is False:
+                return f"{where}.{name} is not allowed"
+            if check_item is not None:
+                error = check_item(item, f"{where}.{name}")
+                if error is not None:
+                    return error
+        return None
+
+    return [check]
+
+
+def _combinator_checks(schema: dict[str, Any]) -> list[Check]:
+    """Compile allOf, anyOf and oneOf."""
+    checks: list[Check] = [compile_schema(item) for item in schema.get("allOf", [])]
+    for key, exactly_one in (("anyOf", False), ("oneOf", True)):
+        if key not in schema:
+            continue
+        options = [compile_schema(item) for item in schema[key]]
+
+        def check(
+            value: Any,
+            where: str,
+            options: list[Check] = options,
+            exactly_one: bool = exactly_one,
+            key: str = key,
+        ) -> str | None:
+            valid = sum(1 for option in options if option(value, where) is None)
+            if valid == 0 or (exactly_one and valid > 1):
+                return f"{where} does not match {key}"
+            return None
+
+        checks.append(check)
+    return checks
+
+
+TYPE_CHECKS: dict[str, Callable[[dict[str, Any]], list[Check]]] = {
+    "string": _string_checks,
+    "integer": _number_checks,
+    "number": _number_checks,
+    "array": _array_checks,
+    "object": _object_checks,
+}
+
+
+def compile_schema(schema: dict[str, Any]) -> Check:
+    """Compile an OpenAPI schema, with references already resolved.
+
+    Args:
+        schema (dict[str, Any]): The schema.
+
+    Returns:
+        Check: A function returning the first error of a value, or None.
+    """
+    checks: list[Check] = []
+    if "enum" in schema:
+        allowed = list(schema["enum"])
+        checks.append(
+            lambda value, where: None
+            if value in allowed
+            else f"{where} must be one of {allowed}"
+        )
+    schema_type = schema.get("type")
+    if schema_type in JSON_TYPES:
+        checks.append(_type_check(schema_type))
+    if schema_type in TYPE_CHECKS:
+        checks.extend(TYPE_CHECKS[schema_type](schema))
+    checks.extend(_combinator_checks(schema))
+    check = _all(checks)
+    if not schema.get("nullable", False):
+        return check
+    return lambda value, where: None if value is None else check(value, where)
+
+
+def coerce(value: str, schema: dict[str, Any]) -> Any:
+    """Convert a parameter to the type of its schema, as far as possible."""
+    schema_type = schema.get("type")
+    try:
+        if schema_type == "integer":
+            return int(value)
+        if schema_type == "number":
+            return float(value)
+    except ValueError:
+        return value
+    if schema_type == "boolean" and value.lower() in TRUE_VALUES + FALSE_VALUES:
+        return value.lower() in TRUE_VALUES
+    return value
+
+
+class _Parameter:
+    """A compiled parameter."""
+
+    __slots__ = ("name", "location", "required", "schema", "check")
+
+    name: str
+    location: str
+    required: bool
+    schema: dict[str, Any]
+    check: Check
+
+    def __init__(self, definition: dict[str, Any]) -> None:
+        """Compile the parameter."""
+        self.name = str(definition["name"])
+        self.location = str(definition["in"])
+        self.required = bool(definition.get("required", self.location == "path"))
+        self.schema = dict(definition.get("schema", {}))
+        self.check = compile_schema(self.schema)
+
+
+class RequestValidator:
+    """The request model of a route, compiled once."""
+
+    parameters: list[_Parameter]
+    body_required: bool
+    body: Check | None
+
+    def __init__(self, definition: dict[str, Any]) -> None:
+        """Compile the `request` key of a route.
+
+        Args:
+            definition (dict[str, Any]): The OpenAPI `parameters` and
+                `requestBody` of the operation, with references resolved.
+        """
+        self.parameters = [_Parameter(val) for val in definition.get("parameters", [])]
+        request_body = definition.get("requestBody") or {}
+        self.body_required = bool(request_body.get("required", False))
+        schema = request_body.get("content", {}).get("application/json", {})
+        self.body = compile_schema(schema["schema"]) if "schema" in schema else None
+
+    def validate_parameters(
+        self, request: Request, path_parameters: dict[str, str]
+    ) -> None:
+        """Validate the parameters of a request.
+
+        Raises:
+            BadRequestException: If a parameter is missing or invalid.
+        """
+        sources: dict[str, Any] = {
+            "query": request.query_params,
+            "header": request.headers,
+            "path": path_parameters,
+            "cookie": request.cookies,
+        }
+        missing: list[str] = []
+        for parameter in self.parameters:
+            value = sources.get(parameter.location, {}).get(parameter.name)
+            if value is None:
+                if parameter.required:
+                    missing.append(f"{parameter.location}.{parameter.name}")
+                continue
+            error = parameter.check(coerce(value, parameter.schema), parameter.name)
+            if error is not None:
+                raise BadRequestException(f"Invalid request parameter: {error}")
+        if missing:
+            raise BadRequestException(
+                f"Missing required request parameters: [{', '.join(missing)}]"
+            )
+
+    def validate_body(self, body: bytes, content_type: str | None) -> None:
+        """Validate a request body against the JSON model.
+
+        Raises:
+            BadRequestException: If the body is missing or invalid.
+        """
+        if len(body) == 0:
+            if self.body_required:
+                raise BadRequestException()
+            return
+        media_type = (content_type or "application/json").split(";", 1)[0].strip()
+        if self.body is None or not media_type.lower().endswith("json"):
+            return
+        try:
+            value = codec.loads(body)
+        except ValueError as err:
+            raise BadRequestException() from err
+        error = self.body(value, "body")
+        if error is not None:
+            raise BadRequestException(f"Invalid request body: {error}")
@@ -0,0 +1,84 @@
+"""Make the gateway and the lambda `common` package importable in the tests."""
+import json
+import sys
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+for path in (ROOT, ROOT / "aws" / "lambdas"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+# pylint: disable=wrong-import-position
+from fastapi.testclient import TestClient  # noqa: E402
+from aws_api_gateway_local import Gateway, create_app  # noqa: E402
+
+
+class StubIntegration:
+    """Answer every route with `respond`, recording the events."""
+
+    def __init__(self) -> None:
+        self.events: list[dict[str, Any]] = []
+        self.respond: Callable[
+            [Any, dict[str, Any]], dict[str, Any]
+        ] = lambda route, event: {"statusCode": 200, "body": "ok"}
+
+    async def invoke(self, route: Any, event: dict[str, Any]) -> dict[str, Any]:
+        self.events.append(event)
+        return self.respond(route, event)
+
+    def close(self) -> None:
+        pass
+
+
+class FakeCognito:
+    """A Cognito client answering GetUser for a fixed set of tokens."""
+
+    def __init__(self, users: dict[str, str]) -> None:
+        self.users = users
+        self.calls = 0
+
+    def get_user(self, AccessToken: str) -> dict[str, Any]:  # noqa: N803
+        from botocore.exceptions import ClientError  # pylint: disable=C0415
+
+        self.calls += 1
+        if AccessToken not in self.users:
+            raise ClientError({"Error": {"Code": "NotAuthorizedException"}}, "GetUser")
+        sub = self.users[AccessToken]
+        return {
+            "Username": sub,
+            "UserAttributes": [
+                {"Name": "sub", "Value": sub},
+                {"Name": "email", "Value": f"{sub}@example.com"},
+            ],
+        }
+
+
+@pytest.fixture
+def make_client(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> Iterator[Callable[..., tuple[TestClient, StubIntegration, Gateway]]]:
+    """Start a gateway over a stub integration, with routes and settings."""
+    clients: list[TestClient] = []
+
+    def make(
+        routes: list[dict[str, Any]], **settings: str
+    ) -> tuple[TestClient, StubIntegration, Gateway]:
+        path = tmp_path / "routes.json"
+        path.write_text(json.dumps(routes), encoding="utf-8")
+        monkeypatch.setenv("GATEWAY_ROUTES", str(path))
+        monkeypatch.setenv("GATEWAY_ACCESS_LOG_SAMPLE_RATE", "0")
+        for name, value in settings.items():
+            monkeypatch.setenv(name, value)
+        stub = StubIntegration()
+        gateway = Gateway(stub)
+        client = TestClient(create_app(gateway))
+        client.__enter__()  # pylint: disable=unnecessary-dunder-call
+        clients.append(client)
+        return client, stub, gateway
+
+    yield make
+    for client in clients:
+        client.__exit__(None, None, None)
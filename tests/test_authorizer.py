@@ -0,0 +1,81 @@
+"""The Cognito user pool authorizer."""
+from typing import Any, Callable
+
+import pytest
+from conftest import FakeCognito
+
+ROUTE = {"path": "/items", "method": "GET", "lambda": "items"}
+
+
+def _client(
+    make_client: Callable[..., Any], authorizer: Any = "CognitoUserPool", **settings
+) -> tuple[Any, Any, FakeCognito]:
+    client, stub, gateway = make_client(
+        [{**ROUTE, "authorizer": authorizer}], **settings
+    )
+    cognito = FakeCognito({"token-a": "alice", "token-b": "bob"})
+    gateway.authorizer._client = cognito
+    stub.respond = lambda route, event: {
+        "statusCode": 200,
+        "body": event["requestContext"]["authorizer"]["claims"]["email"],
+    }
+    return client, stub, cognito
+
+
+def _get(client: Any, token: str, header: str = "Authorization") -> Any:
+    return client.get("/items", headers={header: token})
+
+
+@pytest.mark.parametrize("token", ["", "Bearer ", "bearer", "   "])
+def test_missing_token(make_client: Callable[..., Any], token: str) -> None:
+    client, stub, cognito = _client(make_client)
+    response = _get(client, token)
+    assert response.status_code == 401
+    assert response.headers["x-amzn-errortype"] == "UnauthorizedException"
+    assert client.get("/items").status_code == 401
+    assert (stub.events, cognito.calls) == ([], 0)
+
+
+def test_claims(make_client: Callable[..., Any]) -> None:
+    client, stub, _ = _client(make_client)
+    assert _get(client, "Bearer token-a").text == "alice@example.com"
+    assert _get(client, "token-b").text == "bob@example.com"
+    claims = stub.events[0]["requestContext"]["authorizer"]["claims"]
+    assert claims == {
+        "sub": "alice",
+        "email": "alice@example.com",
+        "cognito:username": "alice",
+    }
+
+
+def test_results_cached(make_client: Callable[..., Any]) -> None:
+    client, stub, cognito = _client(make_client)
+    for _ in range(3):
+        assert _get(client, "Bearer token-a").status_code == 200
+        assert _get(client, "Bearer token-x").status_code == 403
+    # One round trip for the valid token and one for the rejected one
+    assert cognito.calls == 2
+    assert len(stub.events) == 3
+    metrics = client.get("/metrics").text
+    assert "gateway_authorizer_cache_hits_total 4" in metrics
+    assert "gateway_authorizer_cache_misses_total 2" in metrics
+
+
+def test_cache_disabled(make_client: Callable[..., Any]) -> None:
+    client, _, cognito = _client(make_client, {"ttl": 0})
+    for _ in range(2):
+        assert _get(client, "Bearer token-a").status_code == 200
+    assert cognito.calls == 2
+
+
+def test_cache_evicts_least_recent(make_client: Callable[..., Any]) -> None:
+    client, _, cognito = _client(make_client, GATEWAY_AUTHORIZER_CACHE_MAX_ENTRIES="1")
+    for token in ("token-a", "token-b", "token-a"):
+        assert _get(client, token).status_code == 200
+    assert cognito.calls == 3
+
+
+def test_custom_header(make_client: Callable[..., Any]) -> None:
+    client, _, _ = _client(make_client, {"header": "X-Token"})
+    assert _get(client, "Bearer token-a").status_code == 401
+    assert _get(client, "Bearer token-a", "X-Token").status_code == 200
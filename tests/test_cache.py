@@ -0,0 +1,97 @@
+"""The stage response cache."""
+from typing import Any
+
+import pytest
+from starlette.requests import Request
+from aws_api_gateway_local.cache import ResponseCache
+
+ROUTES = [{"path": "/items", "method": "GET", "lambda": "items", "cache": True}]
+
+
+def _request(cache_control: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/items",
+            "query_string": b"",
+            "headers": [(b"cache-control", cache_control.encode())],
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    ("cache_control", "invalidates"),
+    [
+        ("max-age=0", True),
+        ("no-store, Max-Age = 0", True),
+        ('max-age="0"', True),
+        ("max-age=00", True),
+        ("max-age=0123", False),
+        ("s-maxage=0", False),
+        ("max-age=60", False),
+        ("max-age", False),
+        ("max-age=zero", False),
+        ("", False),
+    ],
+)
+def test_invalidates(cache_control: str, invalidates: bool) -> None:
+    assert ResponseCache.invalidates(_request(cache_control)) is invalidates
+
+
+def test_max_age_zero_refreshes_the_entry(make_client: Any) -> None:
+    client, stub, _ = make_client(ROUTES)
+    versions = iter(["v1", "v2", "v3"])
+    stub.respond = lambda route, event: {"statusCode": 200, "body": next(versions)}
+    assert client.get("/items").text == "v1"
+    assert client.get("/items").text == "v1"
+    assert client.get("/items", headers={"Cache-Control": "s-maxage=0"}).text == "v1"
+    assert client.get("/items", headers={"Cache-Control": "max-age=0"}).text == "v2"
+    assert client.get("/items").text == "v2"
+    assert len(stub.events) == 2
+
+
+def test_bounded_in_entries_and_bytes() -> None:
+    from fastapi import Response  # pylint: disable=import-outside-toplevel
+
+    cache = ResponseCache(max_entries=2, max_bytes=1000)
+    for key in ("a", "b", "c"):
+        cache.put(key, Response(b"x" * 100), 60)
+    assert cache.get("a") is None
+    assert cache.get("b") is not None and cache.get("c") is not None
+    cache.put("big", Response(b"x" * 2000), 60)
+    assert cache.get("big") is None
+    cache.put("error", Response(b"x", status_code=500), 60)
+    assert cache.get("error") is None
+    cache.put("expired", Response(b"x"), 0)
+    assert cache.get("expired") is None
+    assert cache.evictions == 1
+    assert cache.size <= cache.max_bytes
+
+
+def test_authorized_routes_cached_per_token(make_client: Any) -> None:
+    from conftest import FakeCognito  # pylint: disable=import-outside-toplevel
+
+    client, stub, gateway = make_client(
+        [{**ROUTES[0], "authorizer": "CognitoUserPool"}]
+    )
+    gateway.authorizer._client = FakeCognito({"token-a": "alice", "token-b": "bob"})
+    stub.respond = lambda route, event: {
+        "statusCode": 200,
+        "body": event["requestContext"]["authorizer"]["claims"]["sub"],
+    }
+    for token, user in (("token-a", "alice"), ("token-b", "bob"), ("token-a", "alice")):
+        response = client.get("/items", headers={"Authorization": f"Bearer {token}"})
+        assert response.text == user
+    assert len(stub.events) == 2
+
+
+def test_listed_headers_replace_the_default(make_client: Any) -> None:
+    from aws_api_gateway_local.routing import Route  # pylint: disable=C0415
+
+    route = Route({**ROUTES[0], "authorizer": {"header": "X-Token"}})
+    assert route.cache is not None and route.cache.headers == ["x-token"]
+    route = Route({**ROUTES[0], "cache": {"headers": ["Accept"]}, "authorizer": True})
+    assert route.cache is not None and route.cache.headers == ["accept"]
+    route = Route(ROUTES[0])
+    assert route.cache is not None and route.cache.headers == []
@@ -0,0 +1,101 @@
+"""Coalescing identical concurrent requests."""
+from asyncio import Event, create_task, gather, run, sleep
+from typing import Any
+
+import pytest
+from starlette.requests import Request
+from aws_api_gateway_local.coalescing import CoalescePolicy, Coalescer
+
+
+def _request(method: str, query: bytes, **headers: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": method,
+            "path": "/items",
+            "query_string": query,
+            "headers": [(k.encode(), v.encode()) for k, v in headers.items()],
+        }
+    )
+
+
+class _Lambda:
+    """A lambda answering once released, counting its invocations."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.released = Event()
+
+    async def invoke(self) -> dict[str, Any]:
+        self.calls += 1
+        await self.released.wait()
+        return {"statusCode": 200, "body": str(self.calls)}
+
+
+def test_identical_requests_share_one_invocation() -> None:
+    async def main() -> None:
+        coalescer = Coalescer()
+        function = _Lambda()
+        requests = [create_task(coalescer.run("a", function.invoke)) for _ in range(3)]
+        other = create_task(coalescer.run("b", function.invoke))
+        await sleep(0)
+        function.released.set()
+        responses = await gather(*requests, other)
+        assert function.calls == 2
+        assert all(response is responses[0] for response in responses[:3])
+        assert (coalescer.leaders, coalescer.followers) == (2, 2)
+        # Once answered, the next request starts a new invocation
+        await coalescer.run("a", function.invoke)
+        assert function.calls == 3
+
+    run(main())
+
+
+def test_followers_outlive_a_cancelled_leader() -> None:
+    async def main() -> None:
+        coalescer = Coalescer()
+        function = _Lambda()
+        leader = create_task(coalescer.run("a", function.invoke))
+        await sleep(0)
+        follower = create_task(coalescer.run("a", function.invoke))
+        await sleep(0)
+        leader.cancel()
+        await sleep(0)
+        function.released.set()
+        assert (await follower)["statusCode"] == 200
+        assert leader.cancelled()
+
+    run(main())
+
+
+def test_errors_reach_every_request() -> None:
+    async def fail() -> dict[str, Any]:
+        await sleep(0)
+        raise RuntimeError("failed")
+
+    async def main() -> None:
+        coalescer = Coalescer()
+        results = await gather(
+            coalescer.run("a", fail), coalescer.run("a", fail), return_exceptions=True
+        )
+        assert [str(result) for result in results] == ["failed", "failed"]
+        assert coalescer.followers == 1
+
+    run(main())
+
+
+def test_key() -> None:
+    policy = CoalescePolicy(True)
+    key = Coalescer.key(policy, _request("GET", b"b=2&a=1", authorization="t"))
+    assert key == Coalescer.key(policy, _request("GET", b"a=1&b=2", authorization="t"))
+    assert key != Coalescer.key(policy, _request("GET", b"a=1&b=2", authorization="u"))
+    assert key != Coalescer.key(policy, _request("HEAD", b"a=1&b=2", authorization="t"))
+    # Headers not listed are not part of the key
+    assert key == Coalescer.key(
+        policy, _request("GET", b"a=1&b=2", authorization="t", accept="text/html")
+    )
+
+
+@pytest.mark.parametrize(("method", "coalescable"), [("GET", True), ("POST", False)])
+def test_coalescable(method: str, coalescable: bool) -> None:
+    assert Coalescer.coalescable(_request(method, b"")) is coalescable
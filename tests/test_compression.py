@@ -0,0 +1,83 @@
+"""Content encoding of the gateway, with minimumCompressionSize semantics."""
+import gzip
+import zlib
+from typing import Any, Callable
+
+import pytest
+
+ROUTES = [{"path": "/data", "method": ["GET", "POST"], "lambda": "data"}]
+
+
+@pytest.mark.parametrize(
+    ("encoding", "compress"),
+    [("gzip", gzip.compress), ("deflate", zlib.compress)],
+)
+def test_inflated_request_headers(
+    make_client: Callable[..., Any], encoding: str, compress: Callable[[bytes], bytes]
+) -> None:
+    client, stub, _ = make_client(ROUTES, GATEWAY_MINIMUM_COMPRESSION_SIZE="1000")
+    body = b'{"hello": "world"}' * 10
+    response = client.post(
+        "/data",
+        content=compress(body),
+        headers={"content-encoding": encoding, "content-type": "application/json"},
+    )
+    assert response.status_code == 200
+    event = stub.events[-1]
+    assert event["body"] == body.decode()
+    assert "content-encoding" not in event["headers"]
+    assert "content-encoding" not in event["multiValueHeaders"]
+    assert event["headers"]["content-length"] == str(len(body))
+    assert event["multiValueHeaders"]["content-length"] == [str(len(body))]
+
+
+def test_unknown_encoding_passed_through(make_client: Callable[..., Any]) -> None:
+    client, stub, _ = make_client(ROUTES, GATEWAY_MINIMUM_COMPRESSION_SIZE="1000")
+    client.post("/data", content=b"packed", headers={"content-encoding": "zstd"})
+    event = stub.events[-1]
+    assert event["headers"]["content-encoding"] == "zstd"
+    assert event["headers"]["content-length"] == "6"
+
+
+def _brotli(body: bytes) -> bytes:
+    brotli = pytest.importorskip("brotli")
+    return bytes(brotli.compress(body))
+
+
+@pytest.mark.parametrize(
+    ("encoding", "compress"),
+    [("gzip", gzip.compress), ("deflate", zlib.compress), ("br", _brotli)],
+)
+@pytest.mark.parametrize(("size", "status"), [(1024, 200), (1025, 413)])
+def test_inflate_limit(
+    make_client: Callable[..., Any],
+    encoding: str,
+    compress: Callable[[bytes], bytes],
+    size: int,
+    status: int,
+) -> None:
+    client, stub, _ = make_client(
+        ROUTES,
+        GATEWAY_MINIMUM_COMPRESSION_SIZE="1000",
+        GATEWAY_MAX_PAYLOAD_BYTES="1024",
+    )
+    # A few bytes compressed, above the limit once inflated
+    response = client.post(
+        "/data", content=compress(b"a" * size), headers={"content-encoding": encoding}
+    )
+    assert response.status_code == status
+    assert len(stub.events) == (1 if status == 200 else 0)
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate", "br"])
+def test_invalid_compressed_body(
+    make_client: Callable[..., Any], encoding: str
+) -> None:
+    if encoding == "br":
+        pytest.importorskip("brotli")
+    client, stub, _ = make_client(ROUTES, GATEWAY_MINIMUM_COMPRESSION_SIZE="1000")
+    response = client.post(
+        "/data", content=b"not compressed", headers={"content-encoding": encoding}
+    )
+    assert response.status_code == 400
+    assert stub.events == []
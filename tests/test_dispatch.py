@@ -0,0 +1,130 @@
+"""Asynchronous (Event) invocations."""
+import json
+from asyncio import Event, run, sleep
+from pathlib import Path
+from typing import Any
+
+import pytest
+from aws_api_gateway_local.dispatch import EventDispatcher, failure
+from aws_api_gateway_local.exceptions import TooManyRequestsException
+from aws_api_gateway_local.routing import Route
+
+ROUTE = Route(
+    {"path": "/jobs", "method": "POST", "lambda": "jobs", "invocation": "event"}
+)
+
+
+@pytest.fixture
+def dead_letter(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    path = tmp_path / "dead.jsonl"
+    monkeypatch.setenv("GATEWAY_EVENT_RETRIES", "2")
+    monkeypatch.setenv("GATEWAY_EVENT_BACKOFF", "0.001")
+    monkeypatch.setenv("GATEWAY_EVENT_DEAD_LETTER", str(path))
+    return path
+
+
+def _dispatch(responses: list[Any], events: int = 1) -> tuple[EventDispatcher, int]:
+    """Dispatch events to a lambda answering with the responses in turn.
+
+    Returns:
+        The stopped dispatcher and the number of invocations.
+    """
+    calls = 0
+
+    async def invoke(route: Route, payload: Any) -> dict[str, Any]:
+        nonlocal calls
+        response = responses[min(calls, len(responses) - 1)]
+        calls += 1
+        if isinstance(response, Exception):
+            raise response
+        return dict(response)
+
+    async def main() -> EventDispatcher:
+        dispatcher = EventDispatcher(invoke)
+        for i in range(events):
+            dispatcher.submit(f"request-{i}", ROUTE, {"body": str(i)})
+        await dispatcher.stop(timeout=5)
+        return dispatcher
+
+    return run(main()), calls
+
+
+@pytest.mark.parametrize(
+    ("response", "error"),
+    [
+        ({"statusCode": 200}, None),
+        ({"statusCode": "404"}, None),
+        ({"statusCode": 502}, "Status 502"),
+        ({"body": "ok"}, "No status code"),
+        ({"errorMessage": "boom", "errorType": "ValueError"}, "boom"),
+        ({"errorType": "ValueError"}, "ValueError"),
+    ],
+)
+def test_failure(response: dict[str, Any], error: str | None) -> None:
+    assert failure(response) == error
+
+
+@pytest.mark.parametrize(
+    ("response", "error"),
+    [
+        ({"statusCode": 500}, "Status 500"),
+        ({"body": "no status"}, "No status code"),
+        (RuntimeError("unreachable"), "RuntimeError: unreachable"),
+    ],
+)
+def test_retries_then_dead_letter(dead_letter: Path, response: Any, error: str) -> None:
+    dispatcher, calls = _dispatch([response])
+    assert calls == dispatcher.dispatched == 3
+    assert (dispatcher.retried, dispatcher.dead_letters) == (2, 1)
+    [record] = [json.loads(line) for line in dead_letter.read_text().splitlines()]
+    assert record["requestId"] == "request-0"
+    assert record["lambda"] == "jobs"
+    assert record["attempts"] == 3
+    assert record["error"] == error
+    assert record["event"] == {"body": "0"}
+
+
+def test_retry_succeeds(dead_letter: Path) -> None:
+    dispatcher, calls = _dispatch([{"statusCode": 503}, {"statusCode": 202}])
+    assert calls == 2
+    assert (dispatcher.retried, dispatcher.dead_letters) == (1, 0)
+    assert not dead_letter.exists()
+
+
+def test_queue_full(dead_letter: Path) -> None:
+    async def main() -> None:
+        released = Event()
+
+        async def invoke(route: Route, payload: Any) -> dict[str, Any]:
+            await released.wait()
+            return {"statusCode": 200}
+
+        dispatcher = EventDispatcher(invoke, queue_size=1, workers=1)
+        dispatcher.submit("request-0", ROUTE, {})
+        await sleep(0)
+        dispatcher.submit("request-1", ROUTE, {})
+        with pytest.raises(TooManyRequestsException):
+            dispatcher.submit("request-2", ROUTE, {})
+        released.set()
+        await dispatcher.stop(timeout=5)
+        assert (dispatcher.dispatched, dispatcher.dead_letters) == (2, 0)
+
+    run(main())
+
+
+def test_stop_dead_letters_the_pending(dead_letter: Path) -> None:
+    async def main() -> None:
+        async def invoke(route: Route, payload: Any) -> dict[str, Any]:
+            await sleep(10)
+            return {"statusCode": 200}
+
+        dispatcher = EventDispatcher(invoke, workers=1)
+        for i in range(3):
+            dispatcher.submit(f"request-{i}", ROUTE, {})
+        await sleep(0)
+        await dispatcher.stop(timeout=0.01)
+        assert dispatcher.dead_letters == 3
+
+    run(main())
+    records = [json.loads(line) for line in dead_letter.read_text().splitlines()]
+    assert {record["error"] for record in records} == {"Gateway stopped"}
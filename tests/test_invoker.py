@@ -0,0 +1,77 @@
+"""The concurrency limits of the lambdas."""
+from asyncio import Event, create_task, run, sleep
+
+import pytest
+from aws_api_gateway_local.exceptions import TooManyRequestsException
+from aws_api_gateway_local.gateway import function_queues
+from aws_api_gateway_local.invoker import ConcurrencyLimiter
+from aws_api_gateway_local.routing import RouteTable
+
+
+def _waiters(queue_size: int | None, requests: int) -> tuple[int, int]:
+    """Hold the only slot of a function while more requests arrive.
+
+    Returns:
+        The number of requests that were throttled and that waited.
+    """
+
+    async def main() -> tuple[int, int]:
+        limiter = ConcurrencyLimiter(8, {"items": 1}, {"items": queue_size})
+        release = Event()
+        throttled = 0
+
+        async def hold() -> None:
+            async with limiter.acquire("items"):
+                await release.wait()
+
+        holder = create_task(hold())
+        await sleep(0)
+        waiters = []
+        for _ in range(requests):
+            waiter = create_task(hold())
+            await sleep(0)
+            if waiter.done():
+                with pytest.raises(TooManyRequestsException):
+                    waiter.result()
+                throttled += 1
+            else:
+                waiters.append(waiter)
+        release.set()
+        await holder
+        for waiter in waiters:
+            await waiter
+        return throttled, len(waiters)
+
+    return run(main())
+
+
+def test_throttles_at_once_by_default() -> None:
+    async def main() -> None:
+        limiter = ConcurrencyLimiter(8, {"items": 1})
+        async with limiter.acquire("items"):
+            with pytest.raises(TooManyRequestsException):
+                async with limiter.acquire("items"):
+                    pass
+        async with limiter.acquire("items"):
+            pass
+
+    run(main())
+
+
+@pytest.mark.parametrize(
+    ("queue_size", "throttled", "waited"),
+    [(0, 3, 0), (2, 1, 2), (None, 0, 3)],
+)
+def test_queue(queue_size: int | None, throttled: int, waited: int) -> None:
+    assert _waiters(queue_size, 3) == (throttled, waited)
+
+
+def test_function_queues() -> None:
+    route_table = RouteTable(
+        [
+            {"path": "/a", "method": "GET", "lambda": "a", "concurrency": 1},
+            {"path": "/b", "method": "GET", "lambda": "b", "queue": "4"},
+            {"path": "/c", "method": "GET", "lambda": "c", "queue": "unbounded"},
+        ]
+    )
+    assert function_queues(route_table) == {"b": 4, "c": None}
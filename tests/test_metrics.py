@@ -0,0 +1,26 @@
+"""The Prometheus metrics of the gateway."""
+from typing import Any
+
+
+def _sample(text: str, name: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(name):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{name} not found")
+
+
+def test_request_bytes_of_binary_bodies(make_client: Any) -> None:
+    client, stub, _ = make_client(
+        [{"path": "/upload", "method": "POST", "lambda": "upload"}],
+        GATEWAY_BINARY_MEDIA_TYPES="application/octet-stream",
+    )
+    body = bytes(range(256)) * 4
+    client.post(
+        "/upload", content=body, headers={"content-type": "application/octet-stream"}
+    )
+    # The event carries the body in base64, a third larger
+    assert stub.events[-1]["isBase64Encoded"] is True
+    metrics = client.get("/metrics").text
+    labels = '{route="/upload",lambda="upload"}'
+    assert _sample(metrics, f"gateway_request_payload_bytes_sum{labels}") == len(body)
+    assert _sample(metrics, f"gateway_request_payload_bytes_count{labels}") == 1
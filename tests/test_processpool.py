@@ -0,0 +1,73 @@
+"""The warm worker processes of the lambdas."""
+from asyncio import run
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+import pytest
+from aws_api_gateway_local.invoker import ConcurrencyLimiter
+from aws_api_gateway_local.processpool import SPAWN_TIMEOUT, ProcessInvoker
+from aws_api_gateway_local.routing import Route
+
+HANDLER = """
+from os import getpid
+
+
+def lambda_handler(event, context):
+    return {"statusCode": 200, "body": str(getpid())}
+"""
+
+
+def _route(name: str, **options: Any) -> Route:
+    return Route(
+        {
+            "path": f"/{name}",
+            "method": "GET",
+            "lambda": name,
+            "integration": "process",
+            "handler": "echo.lambda_handler",
+            **options,
+        }
+    )
+
+
+@pytest.fixture
+def lambdas_path(tmp_path: Path) -> str:
+    (tmp_path / "echo.py").write_text(HANDLER)
+    (tmp_path / "broken.py").write_text("raise ImportError('broken')\n")
+    return str(tmp_path)
+
+
+def test_reload_pools(lambdas_path: str) -> None:
+    routes = [_route("a"), _route("b"), _route("c", workers=1)]
+    processes = ProcessInvoker(ConcurrencyLimiter(8, {}), routes, lambdas_path)
+    try:
+        assert len(processes.cold_starts) == 3
+        pools = dict(processes._pools)
+        routes = [_route("a"), _route("c", workers=2)]
+        processes.spawn(routes)
+        processes.retire(routes)
+        assert processes._pools.keys() == {"a", "c"}
+        assert processes._pools["a"] is pools["a"]
+        assert processes._pools["c"] is not pools["c"]
+        assert len(processes.cold_starts) == 5
+        for name in ("b", "c"):
+            # Shut down: no more submissions
+            with pytest.raises(RuntimeError):
+                pools[name].submit(int)
+        response = run(processes.invoke(routes[1], {}))
+        assert response["statusCode"] == 200
+    finally:
+        processes.close()
+
+
+def test_failed_import(lambdas_path: str) -> None:
+    started = perf_counter()
+    processes = ProcessInvoker(
+        ConcurrencyLimiter(8, {}),
+        [_route("broken", handler="broken.lambda_handler")],
+        lambdas_path,
+    )
+    processes.close()
+    assert processes.cold_starts == []
+    assert perf_counter() - started < SPAWN_TIMEOUT / 2
@@ -0,0 +1,98 @@
+"""Recording lambda invocations, and replaying them."""
+import gzip
+from asyncio import run
+from pathlib import Path
+from typing import Any, Callable
+
+import pytest
+from aws_api_gateway_local import recording
+from aws_api_gateway_local.exceptions import GatewayException
+from aws_api_gateway_local.recording import Recorder, Replayer, recording_files
+from aws_api_gateway_local.routing import Route
+
+ROUTE = Route({"path": "/items", "method": ["GET", "POST"], "lambda": "items"})
+
+
+def _event(method: str = "GET", body: str | None = None, **query: str) -> Any:
+    return {
+        "httpMethod": method,
+        "path": "/items",
+        "multiValueQueryStringParameters": {k: [v] for k, v in query.items()} or None,
+        "body": body,
+    }
+
+
+def _record(path: str, invocations: list[tuple[Any, str]]) -> None:
+    recorder = Recorder(path)
+    recorder.start()
+    for event, body in invocations:
+        recorder.record(event, {"statusCode": 200, "body": body}, 0.01)
+    recorder.stop()
+
+
+def _replay(replayer: Replayer, event: Any) -> str:
+    return str(run(replayer.invoke(ROUTE, event))["body"])
+
+
+@pytest.mark.parametrize("name", ["rec.jsonl", "rec.jsonl.gz"])
+def test_replay(tmp_path: Path, name: str) -> None:
+    path = str(tmp_path / name)
+    _record(
+        path,
+        [
+            (_event(), "first"),
+            (_event(), "second"),
+            (_event(page="2"), "page"),
+            (_event("POST", '{"a": 1}'), "posted"),
+        ],
+    )
+    replayer = Replayer(path)
+    # Responses recorded for the same key are served in turn
+    assert [_replay(replayer, _event()) for _ in range(3)] == [
+        "first",
+        "second",
+        "first",
+    ]
+    assert _replay(replayer, _event(page="2")) == "page"
+    assert _replay(replayer, _event("POST", '{"a": 1}')) == "posted"
+    with pytest.raises(GatewayException) as err:
+        _replay(replayer, _event("POST", '{"a": 2}'))
+    assert err.value.code == 502
+
+
+def test_worker_files(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = str(tmp_path / "rec.jsonl.gz")
+    monkeypatch.setenv("GATEWAY_WORKERS", "2")
+    for pid, body in ((1234, "one"), (5678, "two")):
+        monkeypatch.setattr(recording, "getpid", lambda pid=pid: pid)
+        _record(path, [(_event(), body)])
+    (tmp_path / "rec.other.jsonl.gz").write_bytes(gzip.compress(b""))
+    assert recording_files(path) == [
+        str(tmp_path / "rec.1234.jsonl.gz"),
+        str(tmp_path / "rec.5678.jsonl.gz"),
+    ]
+    replayer = Replayer(path)
+    assert [_replay(replayer, _event()) for _ in range(2)] == ["one", "two"]
+
+
+def test_truncated_recording(tmp_path: Path) -> None:
+    path = tmp_path / "rec.jsonl.gz"
+    _record(str(path), [(_event(), "kept"), (_event(page="2"), "lost")])
+    data = path.read_bytes()
+    path.write_bytes(data[: len(data) - 10])
+    replayer = Replayer(str(path))
+    assert _replay(replayer, _event()) == "kept"
+
+
+def test_gateway_records(tmp_path: Path, make_client: Callable[..., Any]) -> None:
+    path = str(tmp_path / "rec.jsonl")
+    client, stub, gateway = make_client(
+        [{"path": "/items", "method": "GET", "lambda": "items"}],
+        GATEWAY_RECORD=path,
+    )
+    stub.respond = lambda route, event: {"statusCode": 200, "body": "recorded"}
+    assert client.get("/items?page=3").status_code == 200
+    gateway.recorder.stop()
+    gateway.recorder = None
+    replayer = Replayer(path)
+    assert _replay(replayer, stub.events[0]) == "recorded"
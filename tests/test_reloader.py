@@ -0,0 +1,70 @@
+"""Reloading the routes without a restart."""
+import json
+from pathlib import Path
+from threading import Event
+from typing import Any, Callable
+
+import pytest
+from aws_api_gateway_local.reloader import RouteWatcher
+
+ROUTES = [{"path": "/items", "method": "GET", "lambda": "items"}]
+ORDERS = [{"path": "/orders", "method": "GET", "lambda": "orders"}]
+
+
+def _reloads(client: Any, result: str) -> str:
+    """Get the number of reloads with a result from the metrics."""
+    prefix = f'gateway_route_reloads_total{{result="{result}"}} '
+    for line in client.get("/metrics").text.splitlines():
+        if line.startswith(prefix):
+            return line[len(prefix) :]
+    return "0"
+
+
+def test_reload_swaps_the_routes(
+    tmp_path: Path, make_client: Callable[..., Any]
+) -> None:
+    client, _, gateway = make_client(ROUTES, GATEWAY_ROUTES_RELOAD_INTERVAL="0")
+    (tmp_path / "routes.json").write_text(json.dumps(ORDERS), encoding="utf-8")
+    gateway.reload()
+    assert client.get("/orders").status_code == 200
+    assert client.get("/items").status_code == 404
+    assert _reloads(client, "applied") == "1"
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "[{",
+        json.dumps([{"path": "/orders", "method": "GET"}]),
+        json.dumps([*ORDERS, *ORDERS]),
+        json.dumps([{**ORDERS[0], "integration": "unknown"}]),
+        None,
+    ],
+)
+def test_bad_file_keeps_the_routes(
+    tmp_path: Path, make_client: Callable[..., Any], content: str | None
+) -> None:
+    client, _, gateway = make_client(ROUTES, GATEWAY_ROUTES_RELOAD_INTERVAL="0")
+    path = tmp_path / "routes.json"
+    if content is None:
+        path.unlink()
+    else:
+        path.write_text(content, encoding="utf-8")
+    gateway.reload()
+    assert client.get("/items").status_code == 200
+    assert client.get("/orders").status_code == 404
+    assert _reloads(client, "rejected") == "1"
+
+
+def test_watcher_calls_back_on_change(tmp_path: Path) -> None:
+    path = tmp_path / "routes.json"
+    path.write_text("[]", encoding="utf-8")
+    changed = Event()
+    watcher = RouteWatcher([str(path)], changed.set, 0.01)
+    watcher.start()
+    try:
+        assert not changed.wait(0.05)
+        path.write_text(json.dumps(ROUTES), encoding="utf-8")
+        assert changed.wait(5)
+    finally:
+        watcher.stop()
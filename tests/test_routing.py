@@ -0,0 +1,82 @@
+"""The route table."""
+from typing import Any, Callable
+
+import pytest
+from aws_api_gateway_local.routing import RouteTable
+
+ROUTES = [
+    {"path": "/items", "method": "GET", "lambda": "list"},
+    {"path": "/items", "method": "POST", "lambda": "create"},
+    {"path": "/items/{id}", "method": ["GET", "PUT"], "lambda": "item"},
+    {"path": "/items/search", "method": "GET", "lambda": "search"},
+    {"path": "/items/{id}/tags/{tag}", "method": "DELETE", "lambda": "untag"},
+    {"path": "/files/{proxy+}", "method": "ANY", "lambda": "files"},
+    {"path": "/files/{proxy+}", "method": "DELETE", "lambda": "delete"},
+    {"path": "/{stage}/health", "method": "GET", "lambda": "health"},
+]
+
+
+@pytest.mark.parametrize(
+    ("method", "path", "lambda_name", "params"),
+    [
+        ("GET", "/items", "list", {}),
+        ("post", "/items/", "create", {}),
+        ("GET", "/items/42", "item", {"id": "42"}),
+        ("PUT", "//items//42", "item", {"id": "42"}),
+        ("GET", "/items/search", "search", {}),
+        ("DELETE", "/items/42/tags/new", "untag", {"id": "42", "tag": "new"}),
+        ("GET", "/files/a/b/c.txt", "files", {"proxy": "a/b/c.txt"}),
+        ("DELETE", "/files/a", "delete", {"proxy": "a"}),
+        ("GET", "/items/health", "item", {"id": "health"}),
+        ("GET", "/prod/health", "health", {"stage": "prod"}),
+    ],
+)
+def test_match(
+    method: str, path: str, lambda_name: str, params: dict[str, str]
+) -> None:
+    matched = RouteTable(ROUTES).match(method, path)
+    assert matched is not None
+    route, path_parameters = matched
+    assert (route.lambda_name, path_parameters) == (lambda_name, params)
+
+
+@pytest.mark.parametrize(
+    ("method", "path"),
+    [
+        ("GET", "/"),
+        ("GET", "/orders"),
+        ("GET", "/files"),
+        ("GET", "/items/42/tags"),
+        ("DELETE", "/items/42"),
+    ],
+)
+def test_no_match(method: str, path: str) -> None:
+    assert RouteTable(ROUTES).match(method, path) is None
+
+
+@pytest.mark.parametrize(
+    "routes",
+    [
+        [{"path": "/{proxy+}/items", "method": "GET", "lambda": "a"}],
+        [
+            {"path": "/items/{id}", "method": "GET", "lambda": "a"},
+            {"path": "/items/{key}", "method": "PUT", "lambda": "b"},
+        ],
+        [
+            {"path": "/items", "method": "GET", "lambda": "a"},
+            {"path": "/items/", "method": ["POST", "GET"], "lambda": "b"},
+        ],
+        [{"path": "/items", "method": "GET", "lambda": "a", "integration": "x"}],
+    ],
+)
+def test_invalid(routes: list[dict[str, Any]]) -> None:
+    with pytest.raises(ValueError):
+        RouteTable(routes)
+
+
+def test_not_found_and_method_not_allowed(make_client: Callable[..., Any]) -> None:
+    client, stub, _ = make_client(ROUTES)
+    assert client.get("/orders").status_code == 404
+    assert client.patch("/items").status_code == 405
+    assert client.get("/items/42").status_code == 200
+    assert stub.events[-1]["pathParameters"] == {"id": "42"}
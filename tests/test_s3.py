@@ -0,0 +1,85 @@
+"""Copying zip members between archives without recompressing them."""
+from io import BytesIO
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile, ZipInfo
+
+import pytest
+from common.s3 import copy_member, spooled_file
+
+MEMBERS = {
+    "data.json": (b'{"a": 1}' * 500, ZIP_DEFLATED),
+    "image.png": (bytes(range(256)) * 40, ZIP_STORED),
+    "empty.txt": (b"", ZIP_DEFLATED),
+}
+
+
+def _archive(stream: bool = False) -> BytesIO:
+    """Build an archive, streamed members having a data descriptor."""
+    buffer = BytesIO()
+    with ZipFile(buffer, "w") as archive:
+        for name, (data, compression) in MEMBERS.items():
+            if stream:
+                with archive.open(ZipInfo(name), "w") as handle:
+                    handle.write(data)
+            else:
+                archive.writestr(name, data, compress_type=compression)
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_copy_members(stream: bool) -> None:
+    target_buffer = BytesIO()
+    with ZipFile(_archive(stream), "r") as source:
+        with ZipFile(target_buffer, "w") as target:
+            target.writestr("new.txt", b"written before")
+            for info in source.infolist():
+                copy_member(source, target, info)
+            target.writestr("last.txt", b"written after")
+            copied = {info.filename: info for info in source.infolist()}
+    target_buffer.seek(0)
+    with ZipFile(target_buffer, "r") as result:
+        assert result.testzip() is None
+        assert result.namelist() == ["new.txt", *MEMBERS, "last.txt"]
+        for name, (data, _) in MEMBERS.items():
+            info = result.getinfo(name)
+            assert result.read(name) == data
+            assert info.compress_type == copied[name].compress_type
+            assert info.compress_size == copied[name].compress_size
+            assert info.flag_bits & 0x08 == 0
+        assert result.read("last.txt") == b"written after"
+
+
+def test_truncated_member() -> None:
+    buffer = _archive()
+    info = ZipFile(buffer).getinfo("data.json")
+    truncated = BytesIO(buffer.getvalue()[: info.header_offset + 40])
+    source = ZipFile(buffer, "r")
+    source.fp = truncated  # The central directory was read already
+    with ZipFile(BytesIO(), "w") as target:
+        with pytest.raises(EOFError, match="data.json"):
+            copy_member(source, target, info)
+
+
+@pytest.mark.parametrize("max_size", [1 << 20, 64])
+def test_archive_in_spooled_file(
+    monkeypatch: pytest.MonkeyPatch, max_size: int
+) -> None:
+    monkeypatch.setenv("S3_SPOOL_MAX_BYTES", str(max_size))
+    buffer = spooled_file()
+    with ZipFile(buffer, "w") as archive:
+        for name, (data, compression) in MEMBERS.items():
+            archive.writestr(name, data, compress_type=compression)
+    assert buffer.rolled is (max_size == 64)  # type: ignore[attr-defined]
+    buffer.seek(0)
+    with ZipFile(buffer, "r") as archive:
+        assert archive.read("data.json") == MEMBERS["data.json"][0]
+        with archive.open("image.png") as member:
+            assert member.read() == MEMBERS["image.png"][0]
+    with ZipFile(buffer, "a") as archive:
+        archive.writestr("added.txt", b"appended")
+    buffer.seek(0)
+    with ZipFile(buffer, "r") as archive:
+        assert archive.testzip() is None
+        assert archive.read("added.txt") == b"appended"
+    buffer.close()
+    assert buffer.closed
@@ -0,0 +1,90 @@
+"""API Gateway style throttling."""
+from typing import Any
+
+import pytest
+from aws_api_gateway_local.exceptions import TooManyRequestsException
+from aws_api_gateway_local.routing import Route
+from aws_api_gateway_local.throttling import (
+    ForbiddenException,
+    ThrottlePolicy,
+    Throttler,
+    UsagePlan,
+)
+
+# Slow enough for no token to be earned during a test
+RATE = 0.001
+
+
+def _route(**options: Any) -> Route:
+    return Route({"path": "/items", "method": "GET", "lambda": "items", **options})
+
+
+def _throttle(burst: int) -> dict[str, Any]:
+    return {"rate": RATE, "burst": burst}
+
+
+def _rejected(throttler: Throttler, route: Route, api_key: str | None = None) -> str:
+    """Get the message of a throttled request."""
+    with pytest.raises(TooManyRequestsException) as err:
+        throttler.check(route, "GET", api_key)
+    return err.value.message
+
+
+def test_stage_rejection_costs_no_key_token() -> None:
+    plan = UsagePlan({"name": "gold", "throttle": _throttle(2)})
+    throttler = Throttler(ThrottlePolicy(_throttle(1)), {"key": plan})
+    route = _route()
+    throttler.check(route, "GET", "key")
+    _rejected(throttler, route, "key")
+    assert throttler.throttled["stage"] == 1
+    assert throttler._keys["key"].tokens == pytest.approx(1, abs=0.01)
+
+
+def test_order_of_the_buckets() -> None:
+    plan = UsagePlan({"name": "gold", "throttle": _throttle(1)})
+    throttler = Throttler(ThrottlePolicy(_throttle(1)), {"key": plan})
+    route = _route(throttle=_throttle(1))
+    throttler.check(route, "GET", "key")
+    # Every bucket is empty: the key is checked first
+    _rejected(throttler, route, "key")
+    assert throttler.throttled == {"stage": 0, "route": 0, "key": 1, "quota": 0}
+
+
+def test_route_buckets_by_method() -> None:
+    throttler = Throttler()
+    route = _route(method=["GET", "POST"], throttle=_throttle(1))
+    throttler.check(route, "GET", None)
+    throttler.check(route, "POST", None)
+    _rejected(throttler, route)
+    assert throttler.throttled["route"] == 1
+
+
+def test_quota() -> None:
+    plan = UsagePlan({"name": "gold", "quota": {"limit": 2, "period": "DAY"}})
+    throttler = Throttler(None, {"key": plan, "other": plan})
+    route = _route()
+    throttler.check(route, "GET", "key")
+    throttler.check(route, "GET", "key")
+    assert _rejected(throttler, route, "key") == "Limit Exceeded"
+    assert throttler.throttled["quota"] == 1
+    # Quotas are counted per key, not per plan
+    throttler.check(route, "GET", "other")
+
+
+def test_throttled_request_spends_no_quota() -> None:
+    plan = UsagePlan({"name": "gold", "throttle": _throttle(1), "quota": {"limit": 2}})
+    throttler = Throttler(None, {"key": plan})
+    route = _route()
+    throttler.check(route, "GET", "key")
+    _rejected(throttler, route, "key")
+    assert throttler._usages["key"].used == 1
+
+
+def test_api_key_required() -> None:
+    throttler = Throttler(None, {"key": UsagePlan({"name": "gold"})})
+    route = _route(apiKeyRequired=True)
+    with pytest.raises(ForbiddenException):
+        throttler.check(route, "GET", None)
+    with pytest.raises(ForbiddenException):
+        throttler.check(route, "GET", "unknown")
+    throttler.check(route, "GET", "key")
@@ -0,0 +1,168 @@
+"""Local verification of access tokens, with a key generated for the tests."""
+import json
+from pathlib import Path
+from time import time
+from typing import Any
+
+import pytest
+
+jwt = pytest.importorskip("jwt")
+rsa = pytest.importorskip("cryptography.hazmat.primitives.asymmetric.rsa")
+
+# pylint: disable=wrong-import-position
+from common.exceptions import LambdaException  # noqa: E402
+from common.tokens import JWKS, TokenCache, verify_token  # noqa: E402
+
+KID = "test-key"
+ISSUER = "https://cognito-idp.eu-west-1.amazonaws.com/eu-west-1_test"
+CLIENT_ID = "test-client"
+
+
+def _private_key() -> Any:
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def _token(key: Any, claims: dict[str, Any], **headers: Any) -> str:
+    return str(
+        jwt.encode(claims, key, algorithm="RS256", headers={"kid": KID, **headers})
+    )
+
+
+def _claims(**overrides: Any) -> dict[str, Any]:
+    return {
+        "sub": "user-sub",
+        "username": "user-sub",
+        "token_use": "access",
+        "iss": ISSUER,
+        "client_id": CLIENT_ID,
+        "exp": int(time()) + 3600,
+        **overrides,
+    }
+
+
+@pytest.fixture(scope="module")
+def key() -> Any:
+    return _private_key()
+
+
+@pytest.fixture
+def jwks(key: Any, tmp_path: Path) -> JWKS:
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(key.public_key()))
+    path = tmp_path / "jwks.json"
+    path.write_text(json.dumps({"keys": [{**jwk, "kid": KID}]}), encoding="utf-8")
+    return JWKS(path.as_uri())
+
+
+def test_valid_token(key: Any, jwks: JWKS) -> None:
+    claims = verify_token(_token(key, _claims()), jwks, ISSUER, CLIENT_ID)
+    assert claims["sub"] == "user-sub"
+
+
+def test_tampered_payload(key: Any, jwks: JWKS) -> None:
+    header, _, signature = _token(key, _claims()).split(".")
+    forged = _token(key, _claims(sub="someone-else")).split(".")[1]
+    with pytest.raises(LambdaException, match="Invalid token signature"):
+        verify_token(f"{header}.{forged}.{signature}", jwks, ISSUER, CLIENT_ID)
+
+
+def test_signature_of_another_key(jwks: JWKS) -> None:
+    token = _token(_private_key(), _claims())
+    with pytest.raises(LambdaException, match="Invalid token signature"):
+        verify_token(token, jwks, ISSUER, CLIENT_ID)
+
+
+def test_unknown_kid(key: Any, jwks: JWKS) -> None:
+    with pytest.raises(LambdaException, match="Unknown signing key"):
+        verify_token(_token(key, _claims(), kid="other-key"), jwks, ISSUER, CLIENT_ID)
+
+
+def test_expired_token(key: Any, jwks: JWKS) -> None:
+    token = _token(key, _claims(exp=int(time()) - 60))
+    with pytest.raises(LambdaException, match="Token expired"):
+        verify_token(token, jwks, ISSUER, CLIENT_ID)
+
+
+def test_unsupported_algorithm(jwks: JWKS) -> None:
+    token = str(
+        jwt.encode(_claims(), "s" * 32, algorithm="HS256", headers={"kid": KID})
+    )
+    with pytest.raises(LambdaException, match="Unsupported token algorithm"):
+        verify_token(token, jwks, ISSUER, CLIENT_ID)
+
+
+def test_wrong_issuer_and_client(key: Any, jwks: JWKS) -> None:
+    with pytest.raises(LambdaException, match="Invalid token issuer"):
+        verify_token(_token(key, _claims(iss="https://evil")), jwks, ISSUER, None)
+    with pytest.raises(LambdaException, match="Invalid token client"):
+        verify_token(_token(key, _claims(client_id="other")), jwks, None, CLIENT_ID)
+
+
+def test_id_token_rejected(key: Any, jwks: JWKS) -> None:
+    with pytest.raises(LambdaException, match="Not an access token"):
+        verify_token(_token(key, _claims(token_use="id")), jwks, ISSUER, CLIENT_ID)
+
+
+def test_cache_never_outlives_token(key: Any) -> None:
+    cache = TokenCache(max_size=1, ttl=300)
+    expired = _token(key, _claims(exp=int(time()) - 1))
+    cache.put(expired, ("user@example.com", "user-sub"))
+    assert cache.get(expired) is None
+    first, second = _token(key, _claims(sub="a")), _token(key, _claims(sub="b"))
+    cache.put(first, ("a@example.com", "a"))
+    cache.put(second, ("b@example.com", "b"))
+    assert cache.get(first) is None
+    assert cache.get(second) == ("b@example.com", "b")
+
+
+class _Client:
+    """A Cognito client answering GetUser for one user."""
+
+    def __init__(self, sub: str) -> None:
+        self.sub = sub
+        self.calls = 0
+
+    def get_user(self, AccessToken: str) -> dict[str, Any]:  # noqa: N803
+        self.calls += 1
+        return {
+            "Username": self.sub,
+            "UserAttributes": [
+                {"Name": "sub", "Value": self.sub},
+                {"Name": "email", "Value": "user@example.com"},
+            ],
+        }
+
+
+@pytest.fixture
+def cognito(jwks: JWKS, monkeypatch: pytest.MonkeyPatch) -> Any:
+    from common import cognito as module  # pylint: disable=import-outside-toplevel
+
+    monkeypatch.setattr(module, "user_pool_keys", lambda: jwks)
+    monkeypatch.setattr(module, "user_pool_issuer", lambda: ISSUER)
+    monkeypatch.setenv("COGNITO_CLIENT_ID", CLIENT_ID)
+    monkeypatch.setattr(module, "token_cache", TokenCache(max_size=8, ttl=300))
+    instance = module.Cognito.__new__(module.Cognito)
+    instance.verify_locally = True
+    instance.client = _Client("user-sub")
+    return instance
+
+
+def test_email_comes_from_get_user(key: Any, cognito: Any) -> None:
+    token = _token(key, _claims())
+    assert cognito.get_user_from_token(f"Bearer {token}") == (
+        "user@example.com",
+        "user-sub",
+    )
+    assert cognito.get_user_from_token(token) == ("user@example.com", "user-sub")
+    assert cognito.client.calls == 1
+
+
+def test_forged_token_never_reaches_cognito(cognito: Any) -> None:
+    with pytest.raises(LambdaException, match="Invalid token signature"):
+        cognito.get_user_from_token(_token(_private_key(), _claims()))
+    assert cognito.client.calls == 0
+
+
+def test_user_of_another_sub(key: Any, cognito: Any) -> None:
+    cognito.client = _Client("other-sub")
+    with pytest.raises(KeyError):
+        cognito.get_user_from_token(_token(key, _claims()))
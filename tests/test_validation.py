@@ -0,0 +1,177 @@
+"""The request validator, compiled from OpenAPI schemas."""
+from typing import Any
+
+import pytest
+from starlette.requests import Request
+from aws_api_gateway_local.validation import (
+    BadRequestException,
+    RequestValidator,
+    coerce,
+    compile_schema,
+)
+
+ITEM = {
+    "type": "object",
+    "required": ["name", "quantity"],
+    "additionalProperties": False,
+    "properties": {
+        "name": {
+            "type": "string",
+            "minLength": 1,
+            "maxLength": 8,
+            "pattern": "^[a-z]+$",
+        },
+        "quantity": {
+            "type": "integer",
+            "minimum": 0,
+            "maximum": 10,
+            "exclusiveMaximum": True,
+        },
+        "price": {"type": "number", "nullable": True},
+        "tags": {"type": "array", "maxItems": 2, "items": {"enum": ["new", "sale"]}},
+        "size": {"oneOf": [{"type": "integer"}, {"type": "string", "maxLength": 2}]},
+    },
+}
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        {"name": "apple", "quantity": 3},
+        {"name": "apple", "quantity": 0, "price": None, "tags": ["new", "sale"]},
+        {"name": "apple", "quantity": 9, "price": 1.5, "size": "XL"},
+    ],
+)
+def test_valid(value: dict[str, Any]) -> None:
+    assert compile_schema(ITEM)(value, "body") is None
+
+
+@pytest.mark.parametrize(
+    ("value", "error"),
+    [
+        ([], "body must be object"),
+        ({"name": "apple"}, "body.quantity is required"),
+        ({"name": "apple", "quantity": 1, "color": "red"}, "body.color is not allowed"),
+        ({"name": "", "quantity": 1}, "body.name is below minLength 1"),
+        ({"name": "Apple", "quantity": 1}, "body.name does not match ^[a-z]+$"),
+        ({"name": "apple", "quantity": 10}, "body.quantity must be below 10.0"),
+        ({"name": "apple", "quantity": -1}, "body.quantity is below minimum 0.0"),
+        ({"name": "apple", "quantity": True}, "body.quantity must be integer"),
+        ({"name": "apple", "quantity": 1.5}, "body.quantity must be integer"),
+        (
+            {"name": "apple", "quantity": 1, "tags": ["old"]},
+            "body.tags[0] must be one of",
+        ),
+        (
+            {"name": "apple", "quantity": 1, "tags": ["new"] * 3},
+            "body.tags is above maxItems 2",
+        ),
+        (
+            {"name": "apple", "quantity": 1, "size": "XXL"},
+            "body.size does not match oneOf",
+        ),
+    ],
+)
+def test_invalid(value: Any, error: str) -> None:
+    result = compile_schema(ITEM)(value, "body")
+    assert result is not None and result.startswith(error)
+
+
+def test_any_of_and_all_of() -> None:
+    check = compile_schema(
+        {
+            "allOf": [{"type": "integer"}, {"type": "integer", "minimum": 0}],
+            "anyOf": [
+                {"type": "integer", "maximum": 5},
+                {"type": "integer", "minimum": 10},
+            ],
+        }
+    )
+    assert check(3, "value") is None
+    assert check(12, "value") is None
+    assert check(7, "value") == "value does not match anyOf"
+    assert check(-1, "value") == "value is below minimum 0.0"
+
+
+def test_coerce() -> None:
+    assert coerce("12", {"type": "integer"}) == 12
+    assert coerce("1.5", {"type": "number"}) == 1.5
+    assert coerce("TRUE", {"type": "boolean"}) is True
+    assert coerce("abc", {"type": "integer"}) == "abc"
+
+
+def _request(query: str = "", headers: dict[str, str] | None = None) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/items",
+            "query_string": query.encode(),
+            "headers": [
+                (k.lower().encode(), v.encode()) for k, v in (headers or {}).items()
+            ],
+        }
+    )
+
+
+VALIDATOR = RequestValidator(
+    {
+        "parameters": [
+            {"name": "id", "in": "path", "schema": {"type": "integer"}},
+            {
+                "name": "limit",
+                "in": "query",
+                "schema": {"type": "integer", "maximum": 50},
+            },
+            {"name": "x-tenant", "in": "header", "required": True},
+        ],
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": ITEM}},
+        },
+    }
+)
+
+
+def test_parameters() -> None:
+    VALIDATOR.validate_parameters(_request("limit=5", {"X-Tenant": "a"}), {"id": "7"})
+    with pytest.raises(BadRequestException, match=r"\[path.id, header.x-tenant\]"):
+        VALIDATOR.validate_parameters(_request("limit=5"), {})
+    with pytest.raises(BadRequestException, match="limit is above maximum"):
+        VALIDATOR.validate_parameters(
+            _request("limit=99", {"X-Tenant": "a"}), {"id": "7"}
+        )
+    with pytest.raises(BadRequestException, match="id must be integer"):
+        VALIDATOR.validate_parameters(_request("", {"X-Tenant": "a"}), {"id": "seven"})
+
+
+def test_body() -> None:
+    VALIDATOR.validate_body(b'{"name": "apple", "quantity": 1}', "application/json")
+    # Only JSON bodies are checked against the model
+    VALIDATOR.validate_body(b"name=apple", "application/x-www-form-urlencoded")
+    with pytest.raises(BadRequestException, match="Invalid request body$"):
+        VALIDATOR.validate_body(b"", None)
+    with pytest.raises(BadRequestException, match="Invalid request body$"):
+        VALIDATOR.validate_body(b"{not json", "application/json; charset=utf-8")
+    with pytest.raises(BadRequestException, match="body.quantity is required"):
+        VALIDATOR.validate_body(b'{"name": "apple"}', None)
+
+
+def test_gateway_validates_the_raw_body(make_client: Any) -> None:
+    route = {
+        "path": "/items",
+        "method": "POST",
+        "lambda": "items",
+        "request": {"requestBody": {"content": {"application/json": {"schema": ITEM}}}},
+    }
+    # A JSON binary media type is base64 in the event, but validated as sent
+    client, stub, _ = make_client(
+        [route], GATEWAY_BINARY_MEDIA_TYPES="application/json"
+    )
+    valid = client.post("/items", json={"name": "apple", "quantity": 1})
+    assert valid.status_code == 200
+    assert stub.events[-1]["isBase64Encoded"] is True
+    invalid = client.post("/items", json={"name": "apple"})
+    assert invalid.status_code == 400
+    assert invalid.json()["message"].endswith("body.quantity is required")
+    assert len(stub.events) == 1